@@ -0,0 +1,85 @@
+"""
+Benchmarked operations. Each case returns the function to be timed; as multiplication is lazy and the product
+is expanded on first access, the configuration is created again on every run, so that all runs do the same work
+"""
+
+import contextlib
+import io
+import os
+import pathlib
+import tempfile
+from typing import Any, Callable, Dict
+
+from universum import __main__
+from universum.configuration_support import Configuration
+from universum.lib.gravity import construct_component
+from universum.modules.error_state import GlobalErrorState
+from universum.modules.launcher import EnvConditionChecker, StepNameMatcher, check_if_env_set
+from .configs import make_configuration, make_config_file
+
+__all__ = [
+    "CASES",
+    "benchmark_environment"
+]
+
+Case = Callable[[int, int], Callable[[], Any]]
+
+# filter, that selects a single value of the outermost level, e.g. one platform of ten
+SELECTED_PREFIX: str = "level 0 step 1 "
+
+
+def benchmark_environment() -> Dict[str, str]:
+    """
+    Environment variables, enabling all the steps of synthetic configurations
+    """
+    return {f"BENCHMARK_PLATFORM_{index}": "yes" for index in range(10)}
+
+
+def multiply(leaves: int, depth: int) -> Callable[[], Any]:
+    return lambda: make_configuration(leaves, depth)
+
+
+def iterate_all(leaves: int, depth: int) -> Callable[[], Any]:
+    return lambda: sum(1 for _ in make_configuration(leaves, depth).all())
+
+
+def filter_steps(leaves: int, depth: int) -> Callable[[], Any]:
+    def run() -> Configuration:
+        env_checker = EnvConditionChecker()
+        name_matcher = StepNameMatcher([SELECTED_PREFIX], [])
+        return make_configuration(leaves, depth).filter(
+            lambda step: env_checker(step) and name_matcher(step),
+            lambda step, children: env_checker.may_match(step, children) and name_matcher.may_match(step, children))
+    return run
+
+
+def filter_if_env_set(leaves: int, depth: int) -> Callable[[], Any]:
+    return lambda: make_configuration(leaves, depth).filter(check_if_env_set)
+
+
+def dump(leaves: int, depth: int) -> Callable[[], Any]:
+    return lambda: make_configuration(leaves, depth).write_dump(io.StringIO())
+
+
+def process_project_configs(leaves: int, depth: int) -> Callable[[], Any]:
+    def run() -> Configuration:
+        with tempfile.TemporaryDirectory() as work_dir:
+            config_path = pathlib.Path(work_dir) / "configs.py"
+            config_path.write_text(make_config_file(leaves, depth), encoding="utf-8")
+            settings = __main__.define_arguments().parse_args(
+                ["nonci", "-pr", work_dir, "-ad", os.path.join(work_dir, "artifacts"), "-cfg", str(config_path)])
+            with contextlib.redirect_stdout(io.StringIO()):
+                construct_component(GlobalErrorState, settings)
+                launcher = construct_component(settings.main_class, settings)
+                return launcher.process_project_configs()
+    return run
+
+
+CASES: Dict[str, Case] = {
+    "multiply": multiply,
+    "all": iterate_all,
+    "filter": filter_steps,
+    "check_if_env_set": filter_if_env_set,
+    "dump": dump,
+    "process_project_configs": process_project_configs
+}
@@ -0,0 +1,69 @@
+"""
+Generators of synthetic project configurations, used by the benchmarks
+"""
+
+from typing import List
+
+from universum.configuration_support import Configuration, Step
+
+__all__ = [
+    "factor_size",
+    "make_configuration",
+    "make_config_file"
+]
+
+
+def factor_size(leaves: int, depth: int) -> int:
+    """
+    Number of steps in each of `depth` multiplied configurations to get at least `leaves` leaf steps
+
+    >>> factor_size(1000, 3)
+    10
+    >>> factor_size(100000, 2)
+    317
+    """
+    size: int = max(1, round(leaves ** (1 / depth)))
+    while size ** depth < leaves:
+        size += 1
+    return size
+
+
+def make_factor(level: int, size: int) -> Configuration:
+    steps: List[Step] = []
+    for index in range(size):
+        step = Step(name=f"level {level} step {index} ", command=[f"--level-{level}", f"value {index}"],
+                    environment={f"LEVEL_{level}": str(index)}, artifacts=f"level_{level}_{index}" if level else "")
+        if level == 0:  # e.g. platforms, that are only enabled by environment
+            step.if_env_set = f"BENCHMARK_PLATFORM_{index % 10}"
+        elif index % 2:
+            step.if_env_set = f" && BENCHMARK_LEVEL_{level} != disabled"
+        steps.append(step)
+    return Configuration(steps)
+
+
+def make_configuration(leaves: int, depth: int) -> Configuration:
+    """
+    Create configuration of `depth` multiplied levels, that has about `leaves` leaf steps in total
+
+    >>> configs = make_configuration(8, 3)
+    >>> len(list(configs.all()))
+    8
+    >>> next(configs.all()).name
+    'level 0 step 0 level 1 step 0 level 2 step 0 '
+    """
+    size: int = factor_size(leaves, depth)
+    result: Configuration = make_factor(0, size)
+    for level in range(1, depth):
+        result = result * make_factor(level, size)
+    return result
+
+
+def make_config_file(leaves: int, depth: int) -> str:
+    """
+    Text of project configuration file, creating the same configuration as :func:`make_configuration`
+    """
+    return f"""
+from benchmarks.configs import make_configuration
+
+configs = make_configuration({leaves}, {depth})
+"""
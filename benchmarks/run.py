@@ -0,0 +1,120 @@
+"""
+Benchmarks of project configuration processing.
+
+Usage::
+
+    python -m benchmarks.run                                  # measure and print results
+    python -m benchmarks.run --save benchmarks/baseline.json  # store results as a new baseline
+    python -m benchmarks.run --compare benchmarks/baseline.json --tolerance 0.3
+
+In comparison mode the exit code is 1 if any of the cases became slower, or used more memory,
+than the baseline by more than the tolerance. Baseline numbers depend on the machine they are measured on,
+so the baseline should be re-created with ``--save`` on the same machine before comparing results.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from typing_extensions import TypedDict
+
+from .cases import CASES, benchmark_environment
+
+__all__ = [
+    "main"
+]
+
+
+class Result(TypedDict):
+    time: float  # seconds, the best of all repeats
+    peak_memory: int  # bytes, allocated on top of already existing objects
+
+
+def measure(function: Callable[[], Any], repeat: int) -> Result:
+    best: Optional[float] = None
+    for _ in range(repeat):
+        gc.collect()
+        start: float = time.perf_counter()
+        function()
+        elapsed: float = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    assert best is not None
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        peak_memory: int = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"time": best, "peak_memory": peak_memory}
+
+
+def run_cases(names: List[str], sizes: List[int], depth: int, repeat: int) -> Dict[str, Result]:
+    results: Dict[str, Result] = {}
+    for leaves in sizes:
+        for name in names:
+            key: str = f"{name}[{leaves}x{depth}]"
+            results[key] = measure(CASES[name](leaves, depth), repeat)
+            print(f"{key:45} {results[key]['time'] * 1000:12.2f} ms {results[key]['peak_memory'] / 2 ** 20:10.2f} MB")
+    return results
+
+
+def compare(results: Dict[str, Result], baseline: Dict[str, Result], tolerance: float) -> List[str]:
+    regressions: List[str] = []
+    print(f"\n{'case':45} {'time':>10} {'memory':>10}")
+    for key, result in results.items():
+        reference: Optional[Result] = baseline.get(key)
+        if not reference:
+            print(f"{key:45} {'no baseline':>21}")
+            continue
+        ratios: Dict[str, float] = {field: result[field] / reference[field] if reference[field] else 1.0  # type: ignore
+                                    for field in ("time", "peak_memory")}
+        print(f"{key:45} {ratios['time']:10.2f} {ratios['peak_memory']:10.2f}")
+        for field, ratio in ratios.items():
+            if ratio > 1 + tolerance:
+                regressions.append(f"{key}: {field} is {ratio:.2f} times the baseline")
+    return regressions
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.split("\n\n")[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000, 100000],
+                        help="Numbers of leaf steps in generated configurations")
+    parser.add_argument("--depth", type=int, default=3, help="Number of multiplied configuration levels")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs; the best one is reported")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES), help="Cases to run")
+    parser.add_argument("--save", metavar="FILE", help="Store results to JSON file")
+    parser.add_argument("--compare", metavar="FILE", help="Compare results with ones stored in JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed relative increase of time and memory compared to the baseline")
+    settings = parser.parse_args(args)
+
+    os.environ.update(benchmark_environment())
+    print(f"Python {platform.python_version()} on {platform.machine()}")
+    results: Dict[str, Result] = run_cases(settings.cases, settings.sizes, settings.depth, settings.repeat)
+
+    if settings.save:
+        with open(settings.save, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "results": results},
+                      f, indent=2)
+            f.write("\n")
+
+    if settings.compare:
+        with open(settings.compare, encoding="utf-8") as f:
+            baseline: Dict[str, Result] = json.load(f)["results"]
+        regressions: List[str] = compare(results, baseline, settings.tolerance)
+        if regressions:
+            print("\nPerformance regressions found:\n" + "\n".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -26,7 +26,7 @@ setup(
     long_description_content_type='text/markdown',
     author='Ivan Keliukh <i.keliukh@samsung.com>, Kateryna Dovgan <k.dovgan@samsung.com>',
     license='BSD',
-    packages=find_packages(exclude=['tests', 'tests.*']),
+    packages=find_packages(exclude=['tests', 'tests.*', 'benchmarks', 'benchmarks.*']),
     py_modules=['universum'],
     python_requires='>=3.6',
     install_requires=[
@@ -34,7 +34,7 @@ def test_p4_file_diff(docker_main_with_vcs: UniversumRunner):
     log = docker_main_with_vcs.run(get_config(docker_main_with_vcs.environment.python),
                                    vcs_type="p4", environment=[f"SHELVE_CHANGELIST={shelve_cl}"],
                                    additional_parameters=" --p4-force-clean")
-    assert "Module sh got exit code" not in log
+    assert "Process got exit code" not in log
 
     with open(path.join(docker_main_with_vcs.artifact_dir, "output.json"), encoding="utf-8") as f:
         result = json.load(f)
@@ -61,7 +61,7 @@ def test_multiple_p4_file_diff(docker_main_with_vcs: UniversumRunner):
     log = docker_main_with_vcs.run(get_config(docker_main_with_vcs.environment.python),
                                    vcs_type="p4", environment=[f"SHELVE_CHANGELIST={shelve_cl}"],
                                    additional_parameters=" --p4-force-clean")
-    assert "Module sh got exit code" not in log
+    assert "Process got exit code" not in log
 
     with open(path.join(docker_main_with_vcs.artifact_dir, "output.json"), encoding="utf-8") as f:
         result = json.load(f)
@@ -86,7 +86,7 @@ def test_git_file_diff(docker_main_with_vcs: UniversumRunner):
     log = docker_main_with_vcs.run(get_config(docker_main_with_vcs.environment.python), vcs_type="git",
                                    environment=[f"GIT_CHERRYPICK_ID={change}",
                                                 f"GIT_REFSPEC={server.target_branch}"])
-    assert "Module sh got exit code" not in log
+    assert "Process got exit code" not in log
 
     with open(path.join(docker_main_with_vcs.artifact_dir, "output.json"), encoding="utf-8") as f:
         result = json.load(f)
@@ -116,7 +116,7 @@ def test_multiple_git_file_diff(docker_main_with_vcs: UniversumRunner):
     log = docker_main_with_vcs.run(get_config(docker_main_with_vcs.environment.python), vcs_type="git",
                                    environment=[f"GIT_CHERRYPICK_ID={change}",
                                                 f"GIT_REFSPEC={server.target_branch}"])
-    assert "Module sh got exit code" not in log
+    assert "Process got exit code" not in log
 
     with open(path.join(docker_main_with_vcs.artifact_dir, "output.json"), encoding="utf-8") as f:
         result = json.load(f)
@@ -1,3 +1,4 @@
+import importlib.util
 from typing import Union, List, Optional
 import pytest
 
@@ -486,3 +487,51 @@ def test_multiple_errors_poll_p4_params_and_jenkins():
     settings.JenkinsServerForTrigger.trigger_url = None
 
     assert_incorrect_parameter(settings, "port", "user name", "password", "mappings", "Jenkins url for triggering")
+
+
+@pytest.mark.parametrize("jobs", [0, -1])
+def test_wrong_jobs_number(jobs):
+    settings = create_settings("main", "none")
+    settings.Launcher.jobs = jobs
+    assert_incorrect_parameter(settings, "simultaneously executed steps should be positive")
+
+
+def test_wrong_max_background():
+    settings = create_settings("main", "none")
+    settings.Launcher.max_background = -1
+    assert_incorrect_parameter(settings, "weight of background steps should not be negative")
+
+
+def test_wrong_background_output_buffer():
+    settings = create_settings("main", "none")
+    settings.Launcher.background_output_buffer = -1
+    assert_incorrect_parameter(settings, "background step output buffer should not be negative")
+
+
+def test_invalid_step_filter_regex():
+    settings = create_settings("main", "none")
+    settings.Launcher.step_filter = ["/step [/"]
+    assert_incorrect_parameter(settings, "Step filter contains invalid regular expression")
+
+
+def test_wrong_archive_jobs():
+    settings = create_settings("main", "none")
+    settings.ArtifactCollector.archive_jobs = -1
+    assert_incorrect_parameter(settings, "simultaneously archived artifacts should be positive")
+
+
+@pytest.mark.parametrize("archive_format, error_match", [
+    ("rar", "Unknown archive format 'rar'"),
+    ("zip-deflate-10", "Unknown archive format 'zip-deflate-10'"),
+])
+def test_wrong_archive_format(archive_format: str, error_match: str):
+    settings = create_settings("main", "none")
+    settings.ArtifactCollector.archive_format = archive_format
+    assert_incorrect_parameter(settings, error_match)
+
+
+@pytest.mark.skipif(importlib.util.find_spec("zstandard") is not None, reason="'zstandard' package is installed")
+def test_unavailable_archive_format():
+    settings = create_settings("main", "none")
+    settings.ArtifactCollector.archive_format = "tar.zst"
+    assert_incorrect_parameter(settings, "requires Python package 'zstandard'")
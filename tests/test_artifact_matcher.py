@@ -0,0 +1,50 @@
+# pylint: disable = redefined-outer-name
+
+import os
+import pathlib
+from typing import List
+
+import glob2
+import pytest
+
+from universum.lib.artifact_matcher import ArtifactMatcher
+
+
+@pytest.fixture()
+def tree(tmp_path: pathlib.Path) -> pathlib.Path:
+    for path in ["out/bin/app", "out/bin/app.log", "out/lib/lib.so", "out/lib/nested/deep.log", "out/.hidden/x.log",
+                 "out/lib/.cache/y.log", "src/main.c", "src/.git/config", "build.log", ".hidden.log", "[ab].txt"]:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text(path)
+    (tmp_path / "linked").symlink_to(tmp_path / "out" / "lib")
+    (tmp_path / "broken").symlink_to(tmp_path / "no such file")
+    return tmp_path
+
+
+PATTERNS: List[str] = ["out", "out/bin/app", "out/*", "out/*/*.log", "*.log", ".*", "**", "**/*.log", "out/**",
+                       "out/**/*.log", "**/lib", "**/lib/**", "out/**/nested/**", "**/.cache/*", "linked/*",
+                       "broken", "b*", "*/nested", "[ab].txt", "[b]uild.log", "src/?ain.c", "missing/**", "missing"]
+
+
+def test_same_matches_as_glob2(tree: pathlib.Path) -> None:
+    patterns: List[str] = [str(tree / pattern) for pattern in PATTERNS]
+    results = ArtifactMatcher(patterns).match()
+    assert list(results) == patterns
+    for pattern in patterns:
+        assert sorted(results[pattern]) == sorted(set(glob2.glob(pattern))), pattern
+
+
+def test_directories_listed_once(tree: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    listed: List[str] = []
+    scandir = os.scandir
+
+    def counting_scandir(path):
+        listed.append(os.path.relpath(path, tree))
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+    results = ArtifactMatcher([str(tree / "out" / "**" / "*.log"), str(tree / "out" / "*"),
+                               str(tree / "src" / "main.c")]).match()
+    assert results[str(tree / "src" / "main.c")] == [str(tree / "src" / "main.c")]
+    # nothing outside 'out' is listed, and the directories inside it are listed only once for both patterns
+    assert sorted(listed) == ["out", "out/bin", "out/lib", "out/lib/.cache", "out/lib/nested"]
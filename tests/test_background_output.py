@@ -0,0 +1,26 @@
+import re
+
+import pytest
+
+from .test_parallel_steps import run_with_config
+
+verbose_background_config = """
+from universum.configuration_support import Configuration, Step
+
+configs = Configuration([Step(name="Verbose step", background=True,
+                              command=["bash", "-c", "for i in $(seq 1 3000); do echo out $i; echo err $i >&2; done"]),
+                         Step(name="Foreground step", command=["echo", "foreground"])])
+"""
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_background_output_spilled_to_disk(tmp_path, capsys, compress):
+    params = ["--background-output-buffer", "1"]
+    if compress:
+        params.append("--compress-background-output")
+    assert run_with_config(tmp_path, verbose_background_config, *params) == 0
+
+    out = capsys.readouterr().out
+    assert len(re.findall(r"out \d+\n", out)) == 3000
+    assert len(re.findall(r"stderr: \S*err \d+\n", out)) == 3000
+    assert out.index("foreground") < out.index("out 1\n") < out.index("err 1\n") < out.index("out 3000\n")
@@ -0,0 +1,46 @@
+import pytest
+
+from .test_parallel_steps import run_with_trace, max_overlap
+
+background_steps_config = """
+from universum.configuration_support import Configuration, Step
+
+configs = Configuration([Step(name=f"Background {{i}}", command=["sleep", "1"], background=True, weight={weight})
+                         for i in range(4)])
+configs += Configuration([Step(name="Foreground step", command=["echo", "foreground step is executed"])])
+"""
+
+
+@pytest.mark.parametrize("limit, weight, simultaneous", [("2", "0", 2), ("4", "2", 2), ("4", "0", 4), ("1", "3", 1)])
+def test_background_steps_limit(tmp_path, stdout_checker, limit, weight, simultaneous):
+    result, intervals = run_with_trace(tmp_path, background_steps_config.format(weight=weight),
+                                       "--max-background", limit)
+    assert result == 0
+    background = [intervals[f"Background {i}"] for i in range(4)]
+    assert max_overlap(background) == simultaneous
+    # the foreground step is not delayed by the queued ones
+    assert intervals["Foreground step"][0] < min(finish for _, finish in background)
+
+    stdout_checker.assert_has_calls_with_param("foreground step is executed")
+    stdout_checker.assert_has_calls_with_param(r"Background 3 - \S*Success", is_regexp=True)
+    if simultaneous < 4:
+        stdout_checker.assert_has_calls_with_param("This step is queued")
+        stdout_checker.assert_has_calls_with_param("Starting queued background step 'Background 3'")
+    else:
+        stdout_checker.assert_absent_calls_with_param("This step is queued")
+
+
+def test_queued_step_started_during_foreground_step(tmp_path, stdout_checker):
+    config = """
+from universum.configuration_support import Configuration, Step
+
+configs = Configuration([Step(name="Short background step", command=["sleep", "0.5"], background=True),
+                         Step(name="Queued background step", command=["sleep", "0.5"], background=True),
+                         Step(name="Long foreground step", command=["sleep", "2"])])
+"""
+    result, intervals = run_with_trace(tmp_path, config, "--max-background", "1")
+    assert result == 0
+    assert intervals["Short background step"][1] <= intervals["Queued background step"][0]
+    # the freed slot is used without waiting for the foreground step to finish
+    assert intervals["Queued background step"][0] < intervals["Long foreground step"][1]
+    stdout_checker.assert_has_calls_with_param(r"Queued background step - \S*Success", is_regexp=True)
@@ -5,7 +5,7 @@ from typing import Optional
 import pytest
 
 from universum.configuration_support import Configuration
-from universum.modules.launcher import check_if_env_set
+from universum.modules.launcher import check_if_env_set, EnvConditionChecker
 
 
 @pytest.fixture(autouse=True)
@@ -201,3 +201,56 @@ def test_multiplication_filter_all_true():
     assert_equal_multiplication([{'if_env_set': 'VAR_1 == value_1 && VAR_3 == value_3'},
                                  {'if_env_set': 'VAR_2 == value_2 && VAR_3 == value_3'}],
                                 {"VAR_1": "value_1", "VAR_2": "value_2", "VAR_3": "value_3"})
+
+
+##########################################################################
+# if_env_set with '||' operator and grouping
+##########################################################################
+
+@pytest.mark.parametrize("env_vars, expected", [
+    ({}, False),
+    ({"VAR_1": "value_1"}, True),
+    ({"VAR_2": "yes"}, True),
+])
+def test_or_operator(env_vars: dict, expected: bool):
+    assert check("VAR_1 == value_1 || VAR_2", env_vars) is expected
+
+
+def test_and_has_priority_over_or():
+    assert_true("VAR_1 || VAR_2 && VAR_3", {"VAR_1": "y"})
+    assert_false("(VAR_1 || VAR_2) && VAR_3", {"VAR_1": "y"})
+
+
+@pytest.mark.parametrize("env_vars, expected", [
+    ({"VAR_1": "c"}, False),
+    ({"VAR_1": "c", "VAR_3": "true"}, True),
+    ({"VAR_2": "b", "VAR_3": "true"}, True),
+    ({"VAR_2": "a", "VAR_3": "true"}, False),
+])
+def test_nested_groups(env_vars: dict, expected: bool):
+    assert check("VAR_3 && ((VAR_1 == a || VAR_2 == b) || VAR_1 == c)", env_vars) is expected
+
+
+def test_parentheses_in_top_level_value():
+    assert_true("VAR == (value)", {"VAR": "(value)"})
+
+
+@pytest.mark.parametrize("expression", ["(VAR_1 || VAR_2", "VAR_1) && (VAR_2"])
+def test_unbalanced_parentheses(expression: str):
+    with pytest.raises(ValueError, match="Invalid 'if_env_set' expression"):
+        check(expression, None)
+
+
+def test_checker_evaluates_each_expression_once(monkeypatch: pytest.MonkeyPatch):
+    calls = []
+
+    def getenv(name):
+        calls.append(name)
+        return "y"
+
+    monkeypatch.setattr(os, "getenv", getenv)
+    configs = Configuration([dict(if_env_set="VAR_1 && VAR_2"), dict(if_env_set="VAR_1")]) * \
+        Configuration([dict(name=str(index)) for index in range(10)])
+    result = configs.filter(EnvConditionChecker())
+    assert len(list(result.all())) == 20
+    assert calls == ["VAR_1", "VAR_2"]
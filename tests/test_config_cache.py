@@ -0,0 +1,95 @@
+import pathlib
+import sys
+
+import pytest
+
+from .test_parallel_steps import run_with_config
+
+
+config = """
+import os
+
+import helper
+from universum.configuration_support import Configuration, Step
+
+with open("{counter}", "a", encoding="utf-8") as counter:
+    counter.write("executed\\n")
+
+configs = Configuration([Step(name=helper.PREFIX + os.getenv("CACHED_CONFIG_VAR", "unset"), command=["true"])])
+"""
+
+
+class ConfigCacheTestEnv:
+    def __init__(self, tmp_path: pathlib.Path, capsys: pytest.CaptureFixture) -> None:
+        self.tmp_path: pathlib.Path = tmp_path
+        self.capsys: pytest.CaptureFixture = capsys
+        self.counter: pathlib.Path = tmp_path / "counter.txt"
+        self.helper: pathlib.Path = tmp_path / "helper.py"
+        self.helper.write_text("PREFIX = 'Step '\n")
+
+    def run(self) -> str:
+        assert run_with_config(self.tmp_path, config.format(counter=self.counter),
+                               "--config-cache-dir", str(self.tmp_path / "cache")) == 0
+        return self.capsys.readouterr().out
+
+    def execution_count(self) -> int:
+        return self.counter.read_text().count("executed")
+
+
+@pytest.fixture(name="cache_env")
+def fixture_cache_env(tmp_path: pathlib.Path, capsys: pytest.CaptureFixture, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.syspath_prepend(str(tmp_path))  # directories of previous configs are also in 'sys.path'
+    monkeypatch.delitem(sys.modules, "helper", raising=False)
+    monkeypatch.delenv("CACHED_CONFIG_VAR", raising=False)
+    yield ConfigCacheTestEnv(tmp_path, capsys)
+
+
+def test_unchanged_config_is_loaded_from_cache(cache_env: ConfigCacheTestEnv):
+    out: str = cache_env.run()
+    assert "loaded from cache" not in out
+    assert "Step unset" in out
+
+    out = cache_env.run()
+    assert "Project configuration is loaded from cache" in out
+    assert "Step unset" in out
+    assert cache_env.execution_count() == 1
+
+
+def test_environment_variable_change(cache_env: ConfigCacheTestEnv, monkeypatch: pytest.MonkeyPatch):
+    cache_env.run()
+    monkeypatch.setenv("CACHED_CONFIG_VAR", "set")
+    out: str = cache_env.run()
+    assert "loaded from cache" not in out
+    assert "Step set" in out
+    assert cache_env.execution_count() == 2
+
+
+def test_imported_module_change(cache_env: ConfigCacheTestEnv):
+    cache_env.run()
+    cache_env.helper.write_text("PREFIX = 'Changed step '\n")
+    sys.modules.pop("helper")
+    out: str = cache_env.run()
+    assert "loaded from cache" not in out
+    assert "Changed step unset" in out
+    assert cache_env.execution_count() == 2
+
+
+def test_process_environment_is_not_replaced(cache_env: ConfigCacheTestEnv, monkeypatch: pytest.MonkeyPatch):
+    cache_env.helper.write_text("import sys\n"
+                                "is_replaced = type(sys.modules['os'].environ).__name__ == '_RecordingEnviron'\n"
+                                "PREFIX = 'Replaced ' if is_replaced else 'Original '\n")
+    monkeypatch.setenv("CACHED_CONFIG_VAR", "set")
+    out: str = cache_env.run()
+    assert "Original set" in out
+
+    out = cache_env.run()
+    assert "Project configuration is loaded from cache" in out
+    assert cache_env.execution_count() == 1
+
+
+def test_imported_module_reading_environment(cache_env: ConfigCacheTestEnv, monkeypatch: pytest.MonkeyPatch):
+    cache_env.helper.write_text("import os\nPREFIX = os.environ.get('HELPER_VAR', 'Step') + ' '\n")
+    monkeypatch.setenv("HELPER_VAR", "Helper")
+    out: str = cache_env.run()
+    assert "Project configuration is not cached, as the modules it imports may read environment" in out
+    assert "Helper unset" in out
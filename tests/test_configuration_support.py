@@ -0,0 +1,80 @@
+import pickle
+from typing import List
+
+import pytest
+
+from universum.configuration_support import Configuration, Step
+
+
+def names(configuration: Configuration) -> List[str]:
+    return [step.name for step in configuration.all()]
+
+
+def test_operands_edited_after_multiplication():
+    left = Configuration([Step(name="foo"), Step(name="bar")])
+    right = Configuration([Step(name=" baz", command=["baz"])])
+    product = left * right
+    left.configs[0].name = "changed"
+    right.configs[0].command.append("changed")
+    right += Configuration([Step(name=" added")])
+    assert names(product) == ["foo baz", "bar baz"]
+    assert [step.command for step in product.all()] == [["baz"], ["baz"]]
+
+
+def test_children_edited_after_multiplication():
+    product = Configuration([Step(name="foo"), Step(name="bar")]) * Configuration([Step(name=" baz", command=["baz"])])
+    assert product.configs[0].children is not product.configs[1].children
+
+    product.configs[0].children.configs[0].name = " changed"
+    product.configs[1].children.configs[0].command.append("--flag")
+    product.configs[1].children += Configuration([Step(name=" added")])
+    assert names(product) == ["foo changed", "bar baz", "bar added"]
+    assert [step.command for step in product.all()] == [["baz"], ["baz", "--flag"], []]
+
+
+def test_nested_children_edited_after_multiplication():
+    product = Configuration([Step(name="A"), Step(name="B")]) * Configuration([Step(name=" x")]) * \
+        Configuration([Step(name=" 1"), Step(name=" 2", if_succeeded=Configuration([Step(name="then")]))])
+    assert names(product) == ["A x 1", "A x 2", "B x 1", "B x 2"]
+
+    product.configs[1].children.configs[0].children.configs[0].name = " 3"
+    product.configs[1].children.configs[0].children.configs[1].if_succeeded.configs[0].name = "else"
+    assert names(product) == ["A x 1", "A x 2", "B x 3", "B x 2"]
+    assert [step.if_succeeded.configs[0].name for step in product.all() if step.if_succeeded] == ["then", "else"]
+
+
+def test_steps_edited_after_iteration():
+    configuration = Configuration([Step(name="foo")]) * Configuration([Step(name=" bar")])
+    assert names(configuration) == ["foo bar"]
+    assert configuration.dump() == "[{'name': 'foo bar'}]"
+
+    configuration.configs[0].children.configs[0].name = " baz"
+    assert names(configuration) == ["foo baz"]
+    assert configuration.dump() == "[{'name': 'foo baz'}]"
+    assert names(configuration.filter(lambda step: True)) == ["foo baz"]
+
+
+def test_custom_step_attributes():
+    step = Step(name="foo", my_var="bar")
+    step.my_attr = "baz"
+    step.name = "qux"
+    assert not hasattr(step, "__dict__")
+    assert step.my_attr == step["my_attr"] == "baz"
+    assert step.my_var == "bar"
+    assert step.name == "qux"
+    with pytest.raises(AttributeError):
+        step.missing  # pylint: disable = pointless-statement
+
+    merged = Configuration([step]) * Configuration([Step(name=" child", my_attr=" child")])
+    assert [(item.name, item.my_attr, item.my_var) for item in merged.all()] == [("qux child", "baz child", "bar")]
+    step.my_attr = "changed"
+    assert [item.my_attr for item in merged.all()] == ["baz child"]
+
+
+def test_step_pickling():
+    step = Step(name="foo", command=["foo"], environment={"VAR": "foo"}, my_var="bar")
+    step.my_attr = "baz"
+    configuration = Configuration([step]) * Configuration([Step(name=" bar", command=["--bar"])])
+    restored = pickle.loads(pickle.dumps(configuration))
+    assert restored.dump() == configuration.dump()
+    assert [item.my_attr for item in restored.all()] == ["baz"]
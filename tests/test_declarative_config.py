@@ -0,0 +1,110 @@
+import json
+import pathlib
+
+import pytest
+
+from universum import __main__
+from universum.configuration_support import Configuration, Step
+from universum.declarative_config import ConfigurationError, load_configuration
+
+
+yaml_config = """
+configs:
+  - name: "Prepare"
+    command: ["echo", "prepare"]
+    environment: {VAR: value}
+  - matrix:
+      - - name: "Make "
+          command: ["echo", "make"]
+      - - name: "Linux"
+          command: ["--platform", "Linux"]
+        - name: "Windows"
+          command: ["--platform", "Windows"]
+          critical: true
+  - include: "other.yaml"
+  - name: "Group "
+    steps:
+      - name: "child"
+        weight: 2
+"""
+
+other_config = """
+configs:
+  - name: "Included"
+    if_succeeded:
+      - name: "Succeeded branch"
+"""
+
+toml_config = """
+[[configs]]
+name = "Make "
+command = ["echo", "make"]
+
+[[configs.steps]]
+name = "Linux"
+"""
+
+
+def expected_configuration() -> Configuration:
+    group = Step(name="Group ")
+    group.children = Configuration([Step(name="child", weight=2)])
+    return Configuration([Step(name="Prepare", command=["echo", "prepare"], environment={"VAR": "value"})]) + \
+        Configuration([Step(name="Make ", command=["echo", "make"])]) * \
+        Configuration([Step(name="Linux", command=["--platform", "Linux"]),
+                       Step(name="Windows", command=["--platform", "Windows"], critical=True)]) + \
+        Configuration([Step(name="Included", if_succeeded=Configuration([Step(name="Succeeded branch")]))]) + \
+        Configuration([group])
+
+
+def test_yaml_matches_python_configuration(tmp_path: pathlib.Path):
+    (tmp_path / "configs.yaml").write_text(yaml_config)
+    (tmp_path / "other.yaml").write_text(other_config)
+    loaded: Configuration = load_configuration(str(tmp_path / "configs.yaml"))
+    expected: Configuration = expected_configuration()
+    assert loaded == expected and expected == loaded  # comparison of steps only checks non-empty fields
+
+
+def test_json_and_toml(tmp_path: pathlib.Path):
+    config = {"configs": [{"matrix": [[{"name": "Make ", "command": ["echo", "make"]}], [{"name": "Linux"}]]}]}
+    (tmp_path / "configs.json").write_text(json.dumps(config))
+    (tmp_path / "configs.toml").write_text(toml_config)
+    expected = Configuration([Step(name="Make ", command=["echo", "make"])]) * Configuration([Step(name="Linux")])
+    assert load_configuration(str(tmp_path / "configs.json")).dump() == expected.dump()
+    assert load_configuration(str(tmp_path / "configs.toml")).dump() == expected.dump()
+
+
+@pytest.mark.parametrize("text, message", [
+    ("steps: []", "mapping with the only key 'configs'"),
+    ("configs: {name: step}", "configs: expected a list of steps"),
+    ("configs: [{name: step, command: echo}]", "configs[0].command: expected a list of strings"),
+    ("configs: [{name: step, critical: 'yes'}]", "configs[0].critical: expected a boolean"),
+    ("configs: [{name: step, weight: true}]", "configs[0].weight: expected an integer"),
+    ("configs: [{name: step, unknown_key: 1}]", "configs[0]: unknown key 'unknown_key'"),
+    ("configs: [{matrix: [[{name: a}], [{name: b, steps: [1]}]]}]",
+     "configs[0].matrix[1][0].steps[0]: expected a mapping"),
+    ("configs: [{matrix: [], name: a}]", "'matrix' can not be combined with other keys"),
+    ("configs: [{include: configs.yaml}]", "includes itself"),
+    ("configs: [", "while parsing"),
+])
+def test_schema_errors(tmp_path: pathlib.Path, text: str, message: str):
+    config_path = tmp_path / "configs.yaml"
+    config_path.write_text(text)
+    with pytest.raises(ConfigurationError) as error:
+        load_configuration(str(config_path))
+    assert message in str(error.value)
+
+
+def test_declarative_config_execution(tmp_path: pathlib.Path, stdout_checker):
+    config_path = tmp_path / "configs.yml"
+    config_path.write_text(yaml_config)
+    (tmp_path / "other.yaml").write_text(other_config)
+    assert __main__.main(["nonci", "-o", "console", "-cfg", str(config_path), "-f", "Make"]) == 0
+    stdout_checker.assert_has_calls_with_param("==> Adding file")
+    stdout_checker.assert_has_calls_with_param(r"Make Windows - \S*Success", is_regexp=True)
+
+
+def test_invalid_declarative_config(tmp_path: pathlib.Path, stdout_checker):
+    config_path = tmp_path / "configs.json"
+    config_path.write_text('{"configs": [{"name": 1}]}')
+    assert __main__.main(["nonci", "-o", "console", "-cfg", str(config_path)]) != 0
+    stdout_checker.assert_has_calls_with_param("configs[0].name: expected a string")
@@ -0,0 +1,69 @@
+import os
+import signal
+import subprocess
+import time
+
+import pytest
+
+from .test_parallel_steps import run_with_trace
+from .test_run_steps_filter import get_config_file_path
+from .utils import python
+
+fail_fast_config = """
+from universum.configuration_support import Configuration, Step
+
+configs = Configuration([Step(name="Long background step", command=["bash", "-c", "sleep 30 & wait"], background=True),
+                         Step(name="Other background step", command=["sleep", "30"], background=True),
+                         Step(name="Queued background step", command=["sleep", "30"], background=True),
+                         Step(name="Bad critical step", command=["ls", "not_a_file"], critical=True),
+                         Step(name="Extra step", command=["echo", "This shouldn't be in log."])])
+"""
+
+
+def test_fail_fast(tmp_path, stdout_checker):
+    result, intervals = run_with_trace(tmp_path, fail_fast_config, "--fail-fast", "--max-background", "2")
+    assert result == 0
+    # the running steps are stopped by cancellation, instead of being waited for at the end of the run
+    cancellation_finish = intervals["Cancelling background and parallel steps"][1]
+    assert intervals["Long background step"][1] <= cancellation_finish
+    assert intervals["Other background step"][1] <= cancellation_finish
+
+    stdout_checker.assert_has_calls_with_param(r"Long background step - \S*Cancelled", is_regexp=True)
+    stdout_checker.assert_has_calls_with_param(r"Other background step - \S*Cancelled", is_regexp=True)
+    stdout_checker.assert_has_calls_with_param(r"Queued background step - \S*Cancelled", is_regexp=True)
+    stdout_checker.assert_has_calls_with_param("Step 'Queued background step' is cancelled before start")
+    stdout_checker.assert_has_calls_with_param("Cancelling step 'Long background step'")
+    stdout_checker.assert_has_calls_with_param("[Cancelled]")
+    stdout_checker.assert_absent_calls_with_param("This shouldn't be in log.")
+
+
+def is_running(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as stat:
+            return stat.read().rsplit(")", 1)[1].split()[0] != "Z"  # zombies are not reaped in some containers
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.parametrize("signal_number", [signal.SIGINT, signal.SIGTERM], ids=["interrupt", "terminate"])
+def test_interrupted_run_kills_cancellable_steps(tmp_path, signal_number):
+    pid_file = tmp_path / "pid"
+    config = f"""
+from universum.configuration_support import Configuration, Step
+
+configs = Configuration([Step(name="Background step", background=True,
+                              command=["bash", "-c", "sleep 100 & echo $! > {pid_file}.tmp; mv {pid_file}.tmp {pid_file}; wait"]),
+                         Step(name="Long step", command=["sleep", "100"])])
+"""
+    with subprocess.Popen([python(), "-m", "universum", "nonci", "-o", "console", "--fail-fast",
+                           "-cfg", get_config_file_path(tmp_path, config)],
+                          cwd=tmp_path, env=dict(os.environ, PYTHONPATH=os.getcwd()), start_new_session=True) as process:
+        while not pid_file.exists():
+            assert process.poll() is None
+            time.sleep(0.1)
+        assert is_running(int(pid_file.read_text()))
+
+        # same as pressing Ctrl+C in terminal, the signal is sent to all the processes in the foreground group
+        os.killpg(process.pid, signal_number)
+        assert process.wait(timeout=60) == 3
+    assert not is_running(int(pid_file.read_text()))
@@ -62,7 +62,7 @@ configs = Configuration([Step(name="{step_name}", artifacts="output.json",
 
     perforce_environment.run()
     log = (perforce_environment.artifact_dir / f'{step_name}_log.txt').read_text()
-    assert "Module sh got exit code 1" in log
+    assert "Process got exit code 1" in log
     assert "Getting file diff failed due to Perforce server internal error" in log
 
 
@@ -0,0 +1,184 @@
+import json
+import re
+from typing import Dict, Tuple
+
+import pytest
+
+from universum import __main__
+
+from .test_run_steps_filter import get_cli_params, get_config_file_path
+
+
+def run_with_config(tmp_path, config, *additional_params):
+    params = get_cli_params("nonci", tmp_path)
+    params.extend(["-o", "console"])
+    params.extend(additional_params)
+    params.extend(["-cfg", get_config_file_path(tmp_path, config)])
+    return __main__.main(params)
+
+
+def run_with_trace(tmp_path, config, *additional_params) -> Tuple[int, Dict[str, Tuple[float, float]]]:
+    """
+    Run the configuration, recording the trace file
+    :return: exit code and start and finish time (in microseconds) of each step and block by its name
+    """
+    trace_file = tmp_path / "trace.json"
+    result = run_with_config(tmp_path, config, "--trace-file", str(trace_file), *additional_params)
+
+    intervals: Dict[str, Tuple[float, float]] = {}
+    started: Dict[str, float] = {}
+    for event in json.loads(trace_file.read_text())["traceEvents"]:
+        name = re.sub(r"^[\d.]* +(\[[^]]*\] )?", "", event["name"])  # block and step numbering is dropped
+        if event["ph"] == "X":  # background and parallel steps
+            intervals[name] = (event["ts"], event["ts"] + event["dur"])
+        elif event["ph"] == "B":
+            started[name] = event["ts"]
+        elif event["ph"] == "E" and name in started:
+            intervals.setdefault(name, (started.pop(name), event["ts"]))
+    return result, intervals
+
+
+def max_overlap(intervals) -> int:
+    """
+    :return: maximum number of the intervals including the same moment of time
+    """
+    return max(sum(start <= moment < finish for start, finish in intervals) for moment, _ in intervals)
+
+
+independent_steps_config = """
+from universum.configuration_support import Configuration, Step
+
+configs = Configuration([Step(name=f"Sleep {i}", command=["sleep", "1"]) for i in range(4)])
+"""
+
+
+def test_independent_steps_run_simultaneously(tmp_path, stdout_checker):
+    result, intervals = run_with_trace(tmp_path, independent_steps_config, "-j", "4")
+    assert result == 0
+    assert max_overlap([intervals[f"Sleep {i}"] for i in range(4)]) == 4
+
+    stdout_checker.assert_has_calls_with_param("This step is executed in parallel with other steps")
+    stdout_checker.assert_has_calls_with_param("Waiting for parallel step 'Sleep 3' to finish...")
+
+
+def test_sequential_execution_by_default(tmp_path, stdout_checker):
+    result, intervals = run_with_trace(tmp_path, independent_steps_config)
+    assert result == 0
+    assert max_overlap([intervals[f"Sleep {i}"] for i in range(4)]) == 1
+    stdout_checker.assert_absent_calls_with_param("This step is executed in parallel with other steps")
+
+
+dependent_steps_config = """
+from universum.configuration_support import Configuration, Step
+
+configs = Configuration([Step(name="Create file", command=["bash", "-c", "sleep 1; touch {file}"]),
+                         Step(name="Independent step", command=["ls", "{file}"]),
+                         Step(name="Use file", command=["ls", "{file}"], depends_on=["Create file"])])
+"""
+
+
+def test_dependent_step_waits(tmp_path, stdout_checker):
+    config = dependent_steps_config.format(file=tmp_path / "created_file")
+    assert run_with_config(tmp_path, config, "-j", "4") == 0
+    stdout_checker.assert_has_calls_with_param(r"Independent step - \S*Failed", is_regexp=True)
+    stdout_checker.assert_has_calls_with_param(r"Use file - \S*Success", is_regexp=True)
+
+
+def test_dependent_step_does_not_block_next_steps(tmp_path, stdout_checker):
+    config = f"""
+from universum.configuration_support import Configuration, Step
+
+configs = Configuration([Step(name="Long step", command=["sleep", "1"]),
+                         Step(name="Dependent step", command=["ls", "{tmp_path / 'created_file'}"],
+                              depends_on=["Long step"]),
+                         Step(name="Independent step", command=["touch", "{tmp_path / 'created_file'}"])])
+"""
+    assert run_with_config(tmp_path, config, "-j", "2") == 0
+    stdout_checker.assert_has_calls_with_param("Step 'Dependent step' is postponed until the steps it depends on")
+    stdout_checker.assert_has_calls_with_param(r"Independent step - \S*Success", is_regexp=True)
+    stdout_checker.assert_has_calls_with_param(r"Dependent step - \S*Success", is_regexp=True)
+
+
+failed_dependency_config = """
+from universum.configuration_support import Configuration, Step
+
+configs = Configuration([Step(name="Bad step", command=["ls", "not_a_file"]),
+                         Step(name="Dependent step", command=["echo", "should not be executed"],
+                              depends_on=["Bad step"]),
+                         Step(name="Independent step", command=["echo", "executed"])])
+"""
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_failed_dependency_skips_step(tmp_path, stdout_checker, jobs):
+    assert run_with_config(tmp_path, failed_dependency_config, "-j", jobs) == 0
+    stdout_checker.assert_has_calls_with_param("skipped because of unsuccessful step 'Bad step' it depends on")
+    stdout_checker.assert_absent_calls_with_param("should not be executed")
+    stdout_checker.assert_has_calls_with_param("Independent step")
+
+
+def test_unknown_dependency(tmp_path, stdout_checker):
+    config = """
+from universum.configuration_support import Configuration, Step
+
+configs = Configuration([Step(name="Step", command=["echo"], depends_on=["Later step"]),
+                         Step(name="Later step", command=["echo"])])
+"""
+    assert run_with_config(tmp_path, config) == 1
+    stdout_checker.assert_has_calls_with_param("depends on step 'Later step', that is not defined before it")
+
+
+@pytest.mark.parametrize("steps, dependency", [
+    ('Configuration([Step(name="Group")]) * Configuration([Step(name=" step", command=["echo"], '
+     'depends_on=[" other"])])', "Group other"),
+    ('Configuration([Step(name="Conditional", command=["true"], if_succeeded=Configuration([Step(name="Branch", '
+     'command=["echo"], depends_on=["Other"])]))])', "Other")
+])
+def test_unknown_nested_dependency(tmp_path, stdout_checker, steps, dependency):
+    config = f"""
+from universum.configuration_support import Configuration, Step
+
+configs = {steps}
+"""
+    assert run_with_config(tmp_path, config) == 1
+    stdout_checker.assert_has_calls_with_param(f"depends on step '{dependency}', that is not defined before it")
+
+
+matrix_config = """
+from universum.configuration_support import Configuration, Step
+
+platforms = Configuration([Step(name="Linux", command=["{script}", "linux"]),
+                           Step(name="Windows", command=["{script}", "windows"])])
+steps = Configuration([Step(name=" build", command=["touch"]),
+                       Step(name=" test", command=["ls"], depends_on=[" build"])])
+configs = Configuration([Step(name="Prepare", command=["true"])])
+configs += Configuration([Step(depends_on=["Prepare"])]) * platforms * steps
+"""
+
+
+def test_dependencies_in_matrix(tmp_path, stdout_checker):
+    script = tmp_path / "platform.sh"
+    # e.g. 'touch <tmp_path>/linux_built' or 'ls <tmp_path>/linux_built'
+    script.write_text(f"#!/bin/bash\nsleep 1\n$2 {tmp_path}/$1_built\n")
+    script.chmod(0o755)
+    result, intervals = run_with_trace(tmp_path, matrix_config.format(script=script), "-j", "4")
+    assert result == 0
+    for platform in ["Linux", "Windows"]:
+        stdout_checker.assert_has_calls_with_param(rf"{platform} test - \S*Success", is_regexp=True)
+        # each test step waits only for the build step of its own platform
+        assert intervals[f"{platform} build"][1] <= intervals[f"{platform} test"][0]
+        assert intervals["Prepare"][1] <= intervals[f"{platform} build"][0]
+
+
+def test_critical_step_in_parallel_mode(tmp_path, stdout_checker):
+    config = """
+from universum.configuration_support import Configuration, Step
+
+configs = Configuration([Step(name="Long step", command=["sleep", "1"]),
+                         Step(name="Bad critical step", command=["ls", "not_a_file"], critical=True),
+                         Step(name="Extra step", command=["echo", "This shouldn't be in log."])])
+"""
+    assert run_with_config(tmp_path, config, "-j", "4") == 0
+    stdout_checker.assert_has_calls_with_param("'Extra step' skipped because of critical step failure")
+    stdout_checker.assert_absent_calls_with_param("This shouldn't be in log.")
+    stdout_checker.assert_has_calls_with_param("Waiting for parallel step 'Long step' to finish...")
@@ -1,12 +1,17 @@
 # pylint: disable = redefined-outer-name
 
+import concurrent.futures
 import inspect
+import json
+import os
 import pathlib
+import tarfile
 import zipfile
 from typing import Generator
 
 import pytest
 
+from universum.modules.artifact_collector import make_big_archive
 from .utils import LocalTestEnvironment
 from .conftest import FuzzyCallChecker
 
@@ -189,3 +194,107 @@ def test_wildcard(test_env: ArtifactsTestEnvironment) -> None:
     test_env.run()
     test_env.check_artifact_present(test_env.artifact_path)
     test_env.check_artifact_present(test_env.artifact_path_with_suffix)
+
+
+@pytest.mark.parametrize("archive_jobs", [1, 3])
+def test_directories_archived_in_parallel(test_env: ArtifactsTestEnvironment, archive_jobs: int) -> None:
+    config: str = inspect.cleandoc(f"""
+        from universum.configuration_support import Configuration, Step
+        configs = Configuration([Step(
+            name='Step',
+            command=['bash', '-c', 'mkdir {test_env.artifact_name}; '
+                                   'for i in 1 2 3; do mkdir dir_$i; echo "content $i" > dir_$i/file; done'],
+            artifacts='dir_*',
+            report_artifacts='{test_env.artifact_name}',
+            artifact_prebuild_clean=True)])
+    """)
+    test_env.store_config_to_file(config)
+    test_env.settings.ArtifactCollector.archive_jobs = archive_jobs
+    test_env.run()
+    for index in range(1, 4):
+        with zipfile.ZipFile(test_env.artifact_dir / f"dir_{index}.zip") as dir_zip:
+            assert dir_zip.namelist() == ["./", "file"]
+            assert dir_zip.read("file").decode("utf-8") == f"content {index}\n"
+    assert (test_env.artifact_dir / f"{test_env.artifact_name}.zip").exists()
+
+
+def test_make_big_archive_in_threads(tmp_path: pathlib.Path) -> None:
+    for index in range(4):
+        (tmp_path / f"source_{index}" / "nested").mkdir(parents=True)
+        (tmp_path / f"source_{index}" / "nested" / "file").write_text(f"content {index}")
+        (tmp_path / f"source_{index}" / "top").write_text("top")
+    working_directory: str = os.getcwd()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+        archives = list(pool.map(lambda index: make_big_archive(str(tmp_path / "archives" / f"archive_{index}"),
+                                                                str(tmp_path / f"source_{index}")), range(4)))
+    assert os.getcwd() == working_directory
+    for index, archive in enumerate(archives):
+        with zipfile.ZipFile(archive) as dir_zip:
+            assert dir_zip.namelist() == ["./", "nested/", "top", "nested/file"]
+            assert dir_zip.read("nested/file").decode("utf-8") == f"content {index}"
+    with pytest.raises(NotADirectoryError):
+        make_big_archive(str(tmp_path / "archives" / "file"), str(tmp_path / "source_0" / "top"))
+    assert not (tmp_path / "archives" / "file.zip").exists()
+
+
+@pytest.mark.parametrize("archive_format", ["zip-store", "zip-deflate-9", "tar", "tar.gz"])
+def test_archive_format(test_env: ArtifactsTestEnvironment, archive_format: str) -> None:
+    test_env.write_config_file(artifact_prebuild_clean=True)
+    test_env.settings.ArtifactCollector.archive_format = archive_format
+    test_env.run()
+    if archive_format.startswith("zip"):
+        test_env.check_dir_zip_artifact_present()
+        return
+    test_env.check_dir_zip_artifact_absent()
+    with tarfile.open(test_env.artifact_dir / f"{test_env.dir_name}.{archive_format}") as tar:
+        assert tar.getnames() == [".", test_env.artifact_name]
+        member = tar.extractfile(test_env.artifact_name)
+        assert member is not None
+        assert member.read().decode("utf-8").strip() == test_env.artifact_content
+
+
+def test_archive_format_existing_artifact(test_env: ArtifactsTestEnvironment,
+                                         stdout_checker: FuzzyCallChecker) -> None:
+    test_env.write_config_file(artifact_prebuild_clean=True)
+    test_env.settings.ArtifactCollector.archive_format = "tar.gz"
+    (test_env.artifact_dir / f"{test_env.dir_name}.tar.gz").write_text("pre-created artifact content")
+    test_env.run(expect_failure=True)
+    stdout_checker.assert_has_calls_with_param(f"'{test_env.dir_name}.tar.gz' already present in artifact directory")
+
+
+def test_compressed_files_are_stored(tmp_path: pathlib.Path) -> None:
+    source: pathlib.Path = tmp_path / "source"
+    source.mkdir()
+    (source / "image.PNG").write_bytes(b"0" * 1000)
+    (source / "text.txt").write_bytes(b"0" * 1000)
+    with zipfile.ZipFile(make_big_archive(str(tmp_path / "archive"), str(source))) as dir_zip:
+        assert dir_zip.getinfo("image.PNG").compress_type == zipfile.ZIP_STORED
+        assert dir_zip.getinfo("text.txt").compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_async_artifacts(test_env: ArtifactsTestEnvironment, stdout_checker: FuzzyCallChecker) -> None:
+    config: str = inspect.cleandoc(f"""
+        from universum.configuration_support import Configuration, Step
+        configs = Configuration([
+            Step(name='Step with directory',
+                 command=['bash', '-c', 'mkdir {test_env.dir_name}; '
+                                        'echo "{test_env.artifact_content}" > {test_env.dir_name}/{test_env.artifact_name}'],
+                 artifacts='{test_env.dir_name}'),
+            Step(name='Step with missing artifact', command=['true'], artifacts='missing_artifact'),
+            Step(name='Background step', background=True,
+                 command=['bash', '-c', 'echo "{test_env.artifact_content}" > {test_env.artifact_name}'],
+                 report_artifacts='{test_env.artifact_name}')])
+    """)
+    test_env.store_config_to_file(config)
+    test_env.settings.ArtifactCollector.async_artifacts = True
+    test_env.run()
+    test_env.check_dir_zip_artifact_present()
+    test_env.check_artifact_present(test_env.artifact_path)
+    stdout_checker.assert_has_calls_with_param("Artifacts of this step are collected in background")
+    stdout_checker.assert_has_calls_with_param("Waiting for step artifacts to be collected")
+    stdout_checker.assert_has_calls_with_param("No artifacts found!")
+
+    timings = json.loads((test_env.artifact_dir / "STEP_TIMINGS.json").read_text())
+    statuses = {item["name"]: item["status"] for item in timings}
+    assert statuses == {"[ 1/3 ] Step with directory": "Success", "[ 2/3 ] Step with missing artifact": "Failed",
+                        "[ 3/3 ] Background step": "Success"}
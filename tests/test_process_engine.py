@@ -0,0 +1,138 @@
+import json
+import os
+import signal
+import threading
+import time
+from typing import List
+
+import pytest
+
+from universum.lib.process_engine import RunningProcess, start_process
+
+from .utils import LocalTestEnvironment
+
+
+class OutputCollector:
+    def __init__(self) -> None:
+        self.stdout: List[str] = []
+        self.stderr: List[str] = []
+
+    def start(self, *args: str) -> RunningProcess:
+        return start_process(list(args), cwd=os.getcwd(), env=dict(os.environ),
+                             stdout_handler=self.stdout.append, stderr_handler=self.stderr.append)
+
+
+def test_output_is_split_to_lines():
+    collector = OutputCollector()
+    long_line = "x" * 200000
+    process = collector.start("bash", "-c", "echo first; echo error >&2; head -c 200000 /dev/zero | tr '\\0' x; "
+                                            "echo; printf last")
+    assert process.wait() == 0
+    assert not process.is_alive()
+    assert collector.stdout == ["first", long_line, "last"]
+    assert collector.stderr == ["error"]
+
+
+def test_exit_code():
+    process = OutputCollector().start("bash", "-c", "exit 3")
+    assert process.wait() == 3
+    assert process.ran == "bash -c 'exit 3'"
+
+
+def test_done_callback():
+    collector = OutputCollector()
+    process = collector.start("bash", "-c", "sleep 0.2; echo output")
+    finished = threading.Event()
+    output_at_finish = []
+
+    def on_finish():
+        output_at_finish.append(list(collector.stdout))
+        finished.set()
+
+    process.add_done_callback(on_finish)
+    assert finished.wait(timeout=60)
+    assert output_at_finish == [["output"]]  # the output is already handled when the callback is called
+
+    output_at_finish.clear()
+    process.add_done_callback(on_finish)
+    assert output_at_finish == [["output"]]
+
+
+def test_no_such_command():
+    with pytest.raises(OSError):
+        OutputCollector().start("/not/a/command")
+
+
+def test_many_simultaneous_processes():
+    collectors = [OutputCollector() for _ in range(30)]
+    processes = [collector.start("bash", "-c", f"sleep 0.5; echo {i}") for i, collector in enumerate(collectors)]
+    assert [process.wait() for process in processes] == [0] * len(processes)
+    assert [collector.stdout for collector in collectors] == [[str(i)] for i in range(len(collectors))]
+
+
+def test_output_to_file_descriptor(tmp_path):
+    collector = OutputCollector()
+    log_path = tmp_path / "log.txt"
+    with open(log_path, "ab") as log:
+        log.write(b"header\n")
+        log.flush()
+        process = start_process(["bash", "-c", "echo output; echo error >&2; exit 1"], cwd=str(tmp_path),
+                                env=dict(os.environ), stdout_handler=collector.stdout.append,
+                                stderr_handler=collector.stderr.append, output_fd=log.fileno())
+        assert process.wait() == 1
+    assert log_path.read_text() == "header\noutput\nerror\n"
+    assert not collector.stdout and not collector.stderr
+
+
+def test_step_output_is_redirected_to_log_file(tmp_path):
+    env = LocalTestEnvironment(tmp_path, "main")
+    env.configs_file.write_text("""
+from universum.configuration_support import Configuration, Step
+
+configs = Configuration([Step(name="Step", command=["bash", "-c", "echo output; echo error >&2; exit 2"])])
+""")
+    env.settings.Launcher.output = "file"
+    env.run()
+    log = (env.artifact_dir / "Step_log.txt").read_text()
+    assert log.startswith("$ ")
+    assert "\noutput\nerror\nProcess got exit code 2\n" in log
+
+
+def test_resource_usage():
+    process = OutputCollector().start("bash", "-c", "sleep 0.5; head -c 50000000 /dev/zero | tail -c 1 > /dev/null")
+    assert process.wait() == 0
+    usage = process.resource_usage
+    assert usage is not None
+    assert usage["wall_time"] >= 0.5
+    assert usage["user_time"] + usage["system_time"] > 0
+    assert usage["max_rss_upper_bound"] > 0
+
+
+def test_step_timings_artifact(tmp_path, stdout_checker):
+    env = LocalTestEnvironment(tmp_path, "main")
+    env.configs_file.write_text("""
+from universum.configuration_support import Configuration, Step
+
+configs = Configuration([Step(name="Sleeping step", command=["sleep", "0.5"]),
+                         Step(name="Background step", command=["sleep", "0.1"], background=True),
+                         Step(name="Step without command")])
+""")
+    env.run()
+    timings = json.loads((env.artifact_dir / "STEP_TIMINGS.json").read_text())
+    assert [item["name"] for item in timings] == ["[ 1/3 ] Sleeping step", "[ 2/3 ] Background step"]
+    assert timings[0]["status"] == "Success"
+    assert timings[0]["wall_time"] >= 0.5
+    stdout_checker.assert_has_calls_with_param(r"\[ 1/3 \] Sleeping step: wall 0\.\d\d s, CPU", is_regexp=True)
+
+
+def test_cancel_process_group(tmp_path):
+    marker = tmp_path / "marker"
+    process = start_process(["bash", "-c", f"trap '' TERM; (sleep 1; touch {marker}) & sleep 30"],
+                            cwd=str(tmp_path), env=dict(os.environ), stdout_handler=print, stderr_handler=print,
+                            new_process_group=True)
+    time.sleep(0.3)  # let the shell set the trap
+    process.cancel(grace_period=0.2)
+    assert not process.is_alive()
+    assert process.wait() == -signal.SIGKILL
+    time.sleep(1.5)
+    assert not marker.exists()  # descendants are killed as well
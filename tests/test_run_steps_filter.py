@@ -1,6 +1,12 @@
+import gzip
+import os
+from unittest import mock
+
 import pytest
 
 from universum import __main__
+from universum.configuration_support import Configuration, Step
+from universum.modules.launcher import EnvConditionChecker, StepNameMatcher
 
 
 config = """
@@ -32,7 +38,13 @@ filters_parametrize_values = (
     [[""], ["parent 1", "parent 2", "parent 1 step 1", "parent 2 step 1", "parent 1 step 2", "parent 2 step 2"], []],
     [["!"], ["parent 1", "parent 2", "parent 1 step 1", "parent 2 step 1", "parent 1 step 2", "parent 2 step 2"], []],
 
-    [["parent 1:parent 2", "!step 1"], ["parent 1", "step 2", "parent 2"], ["step 1"]]
+    [["parent 1:parent 2", "!step 1"], ["parent 1", "step 2", "parent 2"], ["step 1"]],
+
+    [["parent 1*"], ["parent 1", "step 1", "step 2"], ["parent 2"]],
+    [["*1"], ["parent 1", "parent 2", "step 1"], ["step 2"]],
+    [["*step ?:step ?"], ["parent 1", "parent 2", "step 1", "step 2"], []],
+    [["/^parent [0-9] step 2$/"], ["parent 1", "parent 2", "step 2"], ["step 1"]],
+    [["!/2 step/"], ["parent 1", "step 1", "step 2"], ["parent 2"]]
 )
 
 test_types = ["main", "nonci"]
@@ -93,3 +105,46 @@ def get_cli_params(test_type, tmp_path):
     return ["-vt", "none",
             "-fsd", str(tmp_path),
             "--clean-build"]
+
+
+@pytest.mark.parametrize("params, dump_name", [
+    ([], "CONFIGS_DUMP.txt"),
+    (["--compress-config-dump"], "CONFIGS_DUMP.txt.gz"),
+    (["--no-config-dump"], None),
+])
+def test_config_dump(tmp_path, params, dump_name):
+    artifact_dir = tmp_path / "artifacts"
+    config_file = tmp_path / "configs.py"
+    config_file.write_text(config)
+    assert __main__.main(["nonci", "-o", "console", "-ad", str(artifact_dir), "-cfg", str(config_file)] + params) == 0
+
+    dumps = [path.name for path in artifact_dir.iterdir() if path.name.startswith("CONFIGS_DUMP")]
+    assert dumps == ([dump_name] if dump_name else [])
+    if dump_name:
+        opener = gzip.open if dump_name.endswith(".gz") else open
+        with opener(artifact_dir / dump_name, "rt", encoding="utf-8") as dump_file:
+            text = dump_file.read()
+        assert "{'name': 'parent 2 step 2', 'command': 'bash -c \"echo \"run step\"\"'}" in text
+        assert "WARNING! We have detected space character" in text
+
+
+def test_filter_prunes_groups_before_expansion():
+    platforms = Configuration([Step(name=f"Platform {index} ", if_env_set=f"PLATFORM_{index}") for index in range(10)])
+    configs = platforms * Configuration([Step(name=f"step {index}", if_env_set=" && RUN") for index in range(10)])
+    matcher = StepNameMatcher(["Platform 3", "Platform 1 step 1"], ["step 0"])
+    checked = []
+
+    def checker(step):
+        checked.append(step.name)
+        return matcher(step)
+
+    result = configs.filter(checker, matcher.may_match)
+    assert sorted(step.name for step in result.all()) == \
+        sorted([f"Platform 3 step {index}" for index in range(1, 10)] + ["Platform 1 step 1"])
+    assert len(checked) == 20
+    assert result == configs.filter(matcher)
+
+    env_checker = EnvConditionChecker()
+    with mock.patch.dict(os.environ, {"PLATFORM_3": "yes", "RUN": "yes"}):
+        assert [step.name for step in configs.filter(env_checker, env_checker.may_match).all()] == \
+            [f"Platform 3 step {index}" for index in range(10)]
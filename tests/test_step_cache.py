@@ -0,0 +1,101 @@
+import os
+import pathlib
+
+import pytest
+
+from .utils import LocalTestEnvironment
+
+
+config = """
+from universum.configuration_support import Configuration, Step
+
+configs = Configuration([Step(name="Cached step", inputs=["input.txt"], artifacts="output.txt",
+                              command=["bash", "-c", "echo 'step is executed'; cat input.txt > output.txt"]),
+                         Step(name="Not cached step", command=["echo", "not cached step is executed"])])
+"""
+
+
+class StepCacheTestEnv:
+    def __init__(self, tmp_path: pathlib.Path, capsys: pytest.CaptureFixture) -> None:
+        self.tmp_path: pathlib.Path = tmp_path
+        self.capsys: pytest.CaptureFixture = capsys
+        self.cache_dir: pathlib.Path = tmp_path / "cache"
+        self.run_number: int = 0
+
+    def run(self, input_text: str, cache_size: int = 1024) -> LocalTestEnvironment:
+        self.run_number += 1
+        run_dir: pathlib.Path = self.tmp_path / f"run{self.run_number}"
+        run_dir.mkdir()
+        env = LocalTestEnvironment(run_dir, "main")
+        env.configs_file.write_text(config)
+        (env.src_dir / "input.txt").write_text(input_text)
+        env.settings.StepCache.step_cache_dir = str(self.cache_dir)
+        env.settings.StepCache.step_cache_size = cache_size
+        env.run()
+        return env
+
+
+@pytest.fixture(name="cache_env")
+def fixture_cache_env(tmp_path: pathlib.Path, capsys: pytest.CaptureFixture):
+    yield StepCacheTestEnv(tmp_path, capsys)
+
+
+def test_unchanged_step_is_restored(cache_env: StepCacheTestEnv):
+    cache_env.run("initial")
+    out: str = cache_env.capsys.readouterr().out
+    assert "restored from cache" not in out
+
+    env = cache_env.run("initial")
+    out = cache_env.capsys.readouterr().out
+    assert "the result is restored from cache" in out
+    assert "step is executed" in out  # log is replayed
+    assert (env.artifact_dir / "output.txt").read_text() == "initial"
+    assert out.count("not cached step is executed") == 2  # steps without 'inputs' are always executed
+
+
+def test_changed_input_invalidates_cache(cache_env: StepCacheTestEnv):
+    cache_env.run("initial")
+    cache_env.capsys.readouterr()
+
+    env = cache_env.run("changed")
+    out: str = cache_env.capsys.readouterr().out
+    assert "restored from cache" not in out
+    assert (env.artifact_dir / "output.txt").read_text() == "changed"
+
+
+def test_cache_size_limit(cache_env: StepCacheTestEnv):
+    cache_env.run("initial", cache_size=0)
+    cache_env.capsys.readouterr()
+    assert not list(cache_env.cache_dir.iterdir())
+
+    cache_env.run("initial", cache_size=0)
+    assert "restored from cache" not in cache_env.capsys.readouterr().out
+
+
+def test_corrupted_entry_is_not_restored(cache_env: StepCacheTestEnv):
+    cache_env.run("initial")
+    cache_env.capsys.readouterr()
+    entry: pathlib.Path = next(cache_env.cache_dir.iterdir())
+    (entry / "artifacts" / "0").unlink()
+
+    env = cache_env.run("initial")
+    out: str = cache_env.capsys.readouterr().out
+    assert "Failed to restore the step result from cache, so the step is executed" in out
+    assert "the result is restored from cache" not in out
+    assert (env.artifact_dir / "output.txt").read_text() == "initial"
+
+    cache_env.run("initial")  # the corrupted entry is replaced with the new result
+    assert "the result is restored from cache" in cache_env.capsys.readouterr().out
+
+
+def test_stale_temporary_directories_removed(cache_env: StepCacheTestEnv):
+    stale: pathlib.Path = cache_env.cache_dir / ".stale"
+    stale.mkdir(parents=True)
+    (stale / "log.txt").write_text("o interrupted step\n")
+    os.utime(stale, (0, 0))
+    recent: pathlib.Path = cache_env.cache_dir / ".recent"
+    recent.mkdir()
+
+    cache_env.run("initial")
+    assert not stale.exists()
+    assert recent.exists()  # may belong to a step, that is still being executed by another run
@@ -0,0 +1,38 @@
+import json
+
+from .test_parallel_steps import run_with_config
+
+config = """
+from universum.configuration_support import Configuration, Step
+
+configs = Configuration([Step(name="Short step", command=["sleep", "0.1"]),
+                         Step(name="Long step", command=["sleep", "0.6"]),
+                         Step(name="Medium step", command=["sleep", "0.3"]),
+                         Step(name="Dependent step", command=["echo"], depends_on=["Short step"]),
+                         Step(name="New step", command=["echo"])])
+"""
+
+
+def test_longest_steps_are_started_first(tmp_path, stdout_checker):
+    history_file = tmp_path / "history.json"
+    assert run_with_config(tmp_path, config, "-j", "2", "--step-history", str(history_file)) == 0
+    stdout_checker.assert_has_calls_with_param(r"\[ 1/5 \] Short step", is_regexp=True)
+    history = json.loads(history_file.read_text())
+    assert set(history) == {"Short step", "Long step", "Medium step", "Dependent step", "New step"}
+    assert history["Long step"] >= 0.5
+
+    del history["New step"]
+    history_file.write_text(json.dumps(history))
+    stdout_checker.reset()
+    assert run_with_config(tmp_path, config, "-j", "2", "--step-history", str(history_file)) == 0
+    stdout_checker.assert_has_calls_with_param(r"\[ 1/5, ETA \d+s \] Long step", is_regexp=True)
+    # Dependent step is postponed until the step it depends on is finished, and the next steps are started meanwhile
+    for index, name in enumerate(["Long step", "Medium step", "Short step", "New step", "Dependent step"]):
+        stdout_checker.assert_has_calls_with_param(rf"\[ {index + 1}/5(, ETA \d+s)? \] {name}", is_regexp=True)
+
+
+def test_no_history_by_default(tmp_path, stdout_checker):
+    assert run_with_config(tmp_path, config, "-j", "2") == 0
+    stdout_checker.assert_absent_calls_with_param("ETA")
+    for index, name in enumerate(["Short step", "Long step", "Medium step", "Dependent step", "New step"]):
+        stdout_checker.assert_has_calls_with_param(rf"\[ {index + 1}/5 \] {name}", is_regexp=True)
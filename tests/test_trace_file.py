@@ -0,0 +1,40 @@
+import json
+
+from .test_parallel_steps import run_with_config
+
+config = """
+from universum.configuration_support import Configuration, Step
+
+configs = Configuration([Step(name="Background step", command=["sleep", "0.5"], background=True),
+                         Step(name="Foreground step", command=["sleep", "0.2"]),
+                         Step(name="Failed step", command=["ls", "not_a_file"]),
+                         Step(name="Skipped step", command=["echo"], depends_on=["Failed step"])])
+"""
+
+
+def test_trace_file(tmp_path):
+    trace_file = tmp_path / "trace.json"
+    assert run_with_config(tmp_path, config, "--trace-file", str(trace_file)) == 0
+
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    begins = [event["name"] for event in events if event["ph"] == "B"]
+    ends = [event for event in events if event["ph"] == "E"]
+    assert len(begins) == len(ends)
+    assert "1. Processing project configs" in begins
+    assert any("Foreground step" in name for name in begins)
+    assert any("Failed" == event["args"]["status"] for event in ends)
+    assert all(event["ts"] >= 0 for event in events if "ts" in event)
+    assert any("Skipped step" in event["name"] for event in events if event["ph"] == "i")
+
+    background = [event for event in events if event["ph"] == "X"]
+    assert len(background) == 1
+    assert "Background step" in background[0]["name"]
+    assert background[0]["tid"] != 0
+    # duration is the wall time of the process, measured only after Popen returns, so the command
+    # may already have been running for a while and the duration can be a bit less than its sleep
+    assert 0.4e6 <= background[0]["dur"] < 2e6
+
+
+def test_no_trace_file_by_default(tmp_path):
+    assert run_with_config(tmp_path, config) == 0
+    assert not list(tmp_path.glob("*.json"))
@@ -1,8 +1,10 @@
-# pylint: disable-msg=line-too-long
-from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar, Union
+# pylint: disable-msg=line-too-long, too-many-lines
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, \
+    Set, TextIO, Tuple, TypeVar, Union
 from warnings import warn
-import copy
+import io
 import os
+import sys
 from .lib.ci_exception import CriticalCiException
 
 
@@ -104,7 +106,8 @@ class Step:
         A flag used in case of a linear step execution, when the result of some step is critical
         for the subsequent step execution. If some step has `critical` key set to `True` and executing this step
         fails, no more steps will be executed during this run. However, all background steps, which have already
-        started will be finished regardless of critical step results.
+        started will be finished regardless of critical step results, unless ``--fail-fast`` command-line
+        parameter is set.
     background
         A flag used to signal that the current step should be executed independently in parallel with
         all other steps. All logs from such steps are written to file, and the results of execution are collected
@@ -131,6 +134,30 @@ class Step:
     if_failed
         Another Configuration, that will be executed in case of this step will fail.
         Having this parameter non-None will make the current step conditional.
+    depends_on
+        A list of names of other steps, that must be successfully finished before this step is started. Only the
+        steps preceding the current one in the configuration can be referred to. If any of the listed steps fails
+        or is skipped, the current step is skipped as well. When steps are executed in parallel (see ``--jobs``
+        command-line parameter for details), steps without dependencies are considered independent and can be
+        executed simultaneously. A step, whose dependencies are still running, is postponed, and the following
+        steps of the same group are started meanwhile; the postponed step is started as soon as its dependencies
+        are finished, and at the latest before the group ends. Critical and conditional steps, as well as the
+        steps with `finish_background` flag, are only started after all the postponed steps preceding them.
+        In child configurations the names are relative to the group: the name of the parent step is prepended
+        to each of them, so that e.g. in ``platforms * Configuration([build, test])`` the `test` step depending
+        on `build` refers to the `build` step of the same platform. To make all the steps of a group depend
+        on a step outside it, set `depends_on` for the parent step instead.
+    inputs
+        A list of paths to files and directories, that fully determine the result of the step. Can contain
+        shell-style pattern matching, same as `artifacts`. If this key is set and step cache is enabled (see
+        ``--step-cache-dir`` command-line parameter for details), the step is not executed when its `command`,
+        `environment`, `directory` and contents of all the inputs are the same as of some previous successful
+        execution. Instead, the log of that execution is printed and the `artifacts` are restored from the cache.
+    weight
+        A positive integer, estimating the share of agent resources (e.g. CPU cores or memory) used by the
+        background step. Total weight of simultaneously running background steps is limited by
+        ``--max-background`` command-line parameter; steps without this key have weight of 1. If set for a
+        group of steps, the weight applies to each of the steps, unless overridden in the step itself.
 
     Each parameter is optional, and is substituted with a falsy value, if omitted.
 
@@ -167,10 +194,49 @@ class Step:
         relative. All relative paths start from the project root (see :ref:`get_project_root`).
     """
 
+    # names of the predefined fields, in order of their representation
+    _fields: Tuple[str, ...] = ('name', 'directory', 'code_report', 'command', 'environment', 'artifacts',
+                                'report_artifacts', 'artifact_prebuild_clean', 'critical', 'background',
+                                'finish_background', 'pass_tag', 'fail_tag', 'if_env_set', 'if_succeeded',
+                                'if_failed', 'is_conditional', 'depends_on', 'inputs', 'weight', 'children')
+    # steps are created for every combination of multiplied configurations, so they are kept compact;
+    # 'command', 'environment' and '_extras' are shared between steps until modified
+    __slots__ = tuple(field for field in _fields if field not in ('command', 'environment')) + \
+        ('_command', '_environment', '_owns_environment', '_extras', '_owns_extras')
+    # custom attributes, set by the configuration files, are stored in '_extras' instead of '__dict__'
+    _attributes: FrozenSet[str] = frozenset(_fields + __slots__)
+
+    # the fields are set in constructor bypassing the check for custom attributes in __setattr__,
+    # so their types are declared here
+    name: str
+    directory: str
+    code_report: bool
+    _command: Sequence[str]
+    _environment: Dict[str, str]
+    _owns_environment: bool
+    artifacts: str
+    report_artifacts: str
+    artifact_prebuild_clean: bool
+    critical: bool
+    background: bool
+    finish_background: bool
+    pass_tag: str
+    fail_tag: str
+    if_env_set: str
+    if_succeeded: Optional['Configuration']
+    if_failed: Optional['Configuration']
+    is_conditional: bool
+    depends_on: List[str]
+    inputs: List[str]
+    weight: int
+    children: Optional['Configuration']
+    _extras: Dict[str, Any]
+    _owns_extras: bool
+
     # pylint: disable-msg=too-many-locals
     def __init__(self,
                  name: str = '',
-                 command: Optional[List[str]] = None,
+                 command: Optional[Sequence[str]] = None,
                  environment: Optional[Dict[str, str]] = None,
                  artifacts: str = '',
                  report_artifacts: str = '',
@@ -185,28 +251,125 @@ class Step:
                  if_env_set: str = '',
                  if_succeeded: Optional['Configuration'] = None,
                  if_failed: Optional['Configuration'] = None,
+                 depends_on: Optional[List[str]] = None,
+                 inputs: Optional[List[str]] = None,
+                 weight: int = 0,
                  **kwargs) -> None:
-        self.name: str = name
-        self.directory: str = directory
-        self.code_report: bool = code_report
-        self.command: List[str] = command if command else []
-        self.environment: Dict[str, str] = environment if environment else {}
-        self.artifacts: str = artifacts
-        self.report_artifacts: str = report_artifacts
-        self.artifact_prebuild_clean: bool = artifact_prebuild_clean
-        self.critical: bool = critical
-        self.background: bool = background
-        self.finish_background: bool = finish_background
-        self.pass_tag: str = pass_tag
-        self.fail_tag: str = fail_tag
-        self.if_env_set: str = if_env_set
-        self.if_succeeded: Optional['Configuration'] = if_succeeded
-        self.if_failed: Optional['Configuration'] = if_failed
-        self.is_conditional: bool = bool(self.if_succeeded or self.if_failed)
-        self.children: Optional['Configuration'] = None
-        self._extras: Dict[str, str] = {}
-        for key, value in kwargs.items():
-            self._extras[key] = value
+        set_field = object.__setattr__
+        set_field(self, 'name', sys.intern(name))
+        set_field(self, 'directory', directory)
+        set_field(self, 'code_report', code_report)
+        set_field(self, '_command', tuple(command) if command else ())
+        set_field(self, '_environment', environment if environment else {})
+        set_field(self, '_owns_environment', True)
+        set_field(self, 'artifacts', artifacts)
+        set_field(self, 'report_artifacts', report_artifacts)
+        set_field(self, 'artifact_prebuild_clean', artifact_prebuild_clean)
+        set_field(self, 'critical', critical)
+        set_field(self, 'background', background)
+        set_field(self, 'finish_background', finish_background)
+        set_field(self, 'pass_tag', pass_tag)
+        set_field(self, 'fail_tag', fail_tag)
+        set_field(self, 'if_env_set', if_env_set)
+        set_field(self, 'if_succeeded', if_succeeded)
+        set_field(self, 'if_failed', if_failed)
+        set_field(self, 'is_conditional', bool(self.if_succeeded or self.if_failed))
+        set_field(self, 'depends_on', depends_on if depends_on else [])
+        set_field(self, 'inputs', inputs if inputs else [])
+        set_field(self, 'weight', weight)
+        set_field(self, 'children', None)
+        set_field(self, '_extras', kwargs)
+        set_field(self, '_owns_extras', True)
+
+    @property
+    def command(self) -> List[str]:
+        """
+        The returned list can be modified in place; while the command is shared with other steps,
+        it is kept as a tuple and is copied to a list on first access
+
+        >>> step1 = Step(command=['foo'])
+        >>> step2 = step1._clone()
+        >>> step2.command.append('--bar')
+        >>> step2.command + ['--baz']
+        ['foo', '--bar', '--baz']
+        >>> step1.command
+        ['foo']
+        """
+        if not isinstance(self._command, list):
+            self._command = list(self._command)
+        return self._command
+
+    @command.setter
+    def command(self, value: Sequence[str]) -> None:
+        self._command = value if isinstance(value, list) else list(value)
+
+    @property
+    def environment(self) -> Dict[str, str]:
+        """
+        The returned dictionary can be modified in place; if it is shared with other steps, it is copied first
+
+        >>> step1 = Step(environment={'VAR': 'foo'})
+        >>> step2 = step1 + Step()
+        >>> step2.environment['VAR'] = 'bar'
+        >>> step1.environment
+        {'VAR': 'foo'}
+        """
+        if not self._owns_environment:
+            self._environment = dict(self._environment)
+            self._owns_environment = True
+        return self._environment
+
+    @environment.setter
+    def environment(self, value: Dict[str, str]) -> None:
+        self._environment = value
+        self._owns_environment = True
+
+    if not TYPE_CHECKING:  # custom attributes are not type-checked, so that typos in field names are reported
+        def __setattr__(self, name: str, value: Any) -> None:
+            """
+            >>> step = Step(name='foo', my_var='bar')
+            >>> step.my_attr = 'baz'
+            >>> step.my_attr
+            'baz'
+            >>> step.my_var
+            'bar'
+            >>> step['my_attr']
+            'baz'
+            >>> step.missing
+            Traceback (most recent call last):
+            ...
+            AttributeError: 'Step' object has no attribute 'missing'
+            """
+            if name in self._attributes:
+                object.__setattr__(self, name, value)
+            else:
+                self._get_own_extras()[name] = value
+
+        def __getattr__(self, name: str) -> Any:
+            # is only called for names, that are not slots or properties;
+            # '_extras' slot is not yet set while unpickling
+            try:
+                return object.__getattribute__(self, '_extras')[name]
+            except KeyError:
+                pass
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def _get_own_extras(self) -> Dict[str, Any]:
+        if not self._owns_extras:
+            self._extras = dict(self._extras)
+            self._owns_extras = True
+        return self._extras
+
+    def _get_field(self, key: str) -> Any:
+        if key == 'command':
+            return self.command
+        if key == 'environment':
+            return self._environment  # reading does not require a private copy
+        if key in self._fields:
+            return getattr(self, key)
+        if key == '_extras':
+            return self._extras
+        return None
 
     def __repr__(self) -> str:
         """
@@ -218,12 +381,38 @@ class Step:
         >>> step = Step(name='foo', command=['bar'], my_var='baz')
         >>> repr(step)
         "{'name': 'foo', 'command': 'bar', 'my_var': 'baz'}"
+        >>> step.my_attr = 'qux'
+        >>> repr(step)
+        "{'name': 'foo', 'command': 'bar', 'my_var': 'baz', 'my_attr': 'qux'}"
+        """
+        return self._format(produce_string_command=False)[0]
+
+    def _format(self, produce_string_command: bool) -> Tuple[str, bool]:
+        """
+        :param produce_string_command: print command as one string, same as after :meth:`.stringify_command()`
+        :return: `dict`-like string and `True`, if any of the command components have space inside
+
+        >>> print(*Step(name='foo', command=['foo', 'bar baz'])._format(produce_string_command=True))
+        {'name': 'foo', 'command': 'foo "bar baz"'} True
         """
-        res = {k: v for k, v in self.__dict__.items() if v and k != '_extras'}
+        res: Dict[str, Any] = {}
+        for key in self._fields:
+            value: Any = self._get_field(key)
+            if value:
+                res[key] = value
         res.update(self._extras)
-        if len(self.command) == 1:  # command should be printed as one string, instead of list
-            res['command'] = self.command[0]
-        return str(res)
+        command: Sequence[str] = self._command
+        space_found: bool = False
+        if produce_string_command and command:
+            command_line, space_found = self._join_command(command)
+            command = (command_line,) if command_line else ()
+        if len(command) == 1:  # command should be printed as one string, instead of list
+            res['command'] = command[0]
+        elif command:
+            res['command'] = list(command)
+        else:
+            res.pop('command', None)
+        return str(res), space_found
 
     def __eq__(self, other: Any) -> bool:
         """
@@ -253,7 +442,8 @@ class Step:
         False
         """
         if isinstance(other, Step):
-            return self == other.__dict__
+            # pylint: disable = protected-access
+            return self == {key: other._get_field(key) for key in other._fields + ('_extras',)}
         if isinstance(other, dict):
             for key, val in other.items():
                 if val and self[key] != val:
@@ -286,7 +476,7 @@ class Step:
         #  _extras are checked first - just in case _extras field is added manually
         # do note that __setitem__ checks predefined fields first, however it's impossible to shadow them by
         # modifying _extras
-        return self._extras.get(key, self.__dict__.get(key, None))
+        return self._extras.get(key, self._get_field(key))
 
     def __setitem__(self, key: str, value: Any) -> None:
         """
@@ -330,12 +520,12 @@ class Step:
         >>> step
         {'name': 'baz', 'directory': 'foo', 'my_var': 'bar', 'test': 42, '_extras': {'name': 'baz'}}
         """
-        if key in self.__dict__ and key != '_extras':
+        if key in self._fields:
             warn("Re-defining the value of Step field. Please use var." + key + " to set it instead of "
                  "using var['" + key + "']")
-            self.__dict__[key] = value
+            setattr(self, key, value)
         else:
-            self._extras[key] = value
+            self._get_own_extras()[key] = value
 
     def get(self, key: str, default: Any = None) -> Any:
         """
@@ -376,7 +566,7 @@ class Step:
         result = self._extras.get(key)
         if result is not None:  # for custom fields there is a distinction between None and falsy values
             return result
-        result = self.__dict__.get(key)
+        result = self._get_field(key)
         if result:  # non-custom fields initialized with falsy values
             warn("Using legacy API to access configuration values. Please use var." + key + " instead.")
             return result
@@ -386,7 +576,8 @@ class Step:
         """
         This functions defines operator ``+`` for :class:`Step` class objects by
         concatenating strings and contents of dictionaries.
-        Note that `critical` attribute is always taken from the second operand.
+        Note that `critical` attribute is always taken from the second operand, and that names in `depends_on`
+        of the second operand are treated as relative to the first one.
 
         :param other: `Step` object
         :return: new `Step` object, including all attributes from both `self` and `other` objects
@@ -397,14 +588,15 @@ class Step:
         {'name': 'foobar', 'command': ['foo', 'bar'], 'background': True, 'my_var1': 'foobar', 'my_var2': 'baz'}
         >>> step2 + step1
         {'name': 'barfoo', 'command': ['bar', 'foo'], 'critical': True, 'background': True, 'my_var1': 'barfoo', 'my_var2': 'baz'}
+        >>> (Step(name='Linux', depends_on=['prepare']) + Step(name=' test', depends_on=[' build'])).depends_on
+        ['prepare', 'Linux build']
         """
         if self.is_conditional:
             # TODO: https://github.com/Samsung/Universum/issues/709
             raise CriticalCiException("Conditional steps addition is not supported yet")
-        return Step(
+        result: Step = Step(
             name=self.name + other.name,
-            command=self.command + other.command,
-            environment=combine(self.environment, other.environment),
+            command=(*self._command, *other._command),
             artifacts=self.artifacts + other.artifacts,
             report_artifacts=self.report_artifacts + other.report_artifacts,
             artifact_prebuild_clean=self.artifact_prebuild_clean or other.artifact_prebuild_clean,
@@ -419,8 +611,25 @@ class Step:
             # FIXME: This is a dummy implementation. Define addition logic and implement it.
             if_succeeded=other.if_succeeded,
             if_failed=other.if_failed,
-            **combine(self._extras, other._extras)
+            depends_on=self.depends_on + [self.name + name for name in other.depends_on],
+            inputs=self.inputs + other.inputs,
+            weight=other.weight or self.weight
         )
+        self._combine_shared(other, '_environment', result)
+        self._combine_shared(other, '_extras', result)
+        return result
+
+    def _combine_shared(self, other: 'Step', attribute: str, result: 'Step') -> None:
+        # if one of the dictionaries is empty, the other one is shared instead of being copied
+        first: Dict[str, Any] = getattr(self, attribute)
+        second: Dict[str, Any] = getattr(other, attribute)
+        if first and second:
+            object.__setattr__(result, attribute, combine(first, second))  # 'result' owns the new dictionary
+            return
+        shared_step: Step = self if first else other
+        for step in (shared_step, result):
+            object.__setattr__(step, '_owns' + attribute, False)
+        object.__setattr__(result, attribute, getattr(shared_step, attribute))
 
     def replace_string(self, from_string: str, to_string: str) -> None:
         """
@@ -439,13 +648,39 @@ class Step:
         >>> step
         {'directory': 'bar', 'artifacts': 'bar', 'report_artifacts': 'bar'}
         """
-        self.command = [word.replace(from_string, to_string) for word in self.command]
+        self.command = [word.replace(from_string, to_string) for word in self._command]
         self.artifacts = self.artifacts.replace(from_string, to_string)
         self.report_artifacts = self.report_artifacts.replace(from_string, to_string)
         self.directory = self.directory.replace(from_string, to_string)
-        for k, v in self._extras.items():
+        extras: Dict[str, Any] = self._get_own_extras()
+        for k, v in extras.items():
             if isinstance(v, str):
-                self._extras[k] = v.replace(from_string, to_string)
+                extras[k] = v.replace(from_string, to_string)
+
+    def _clone(self) -> 'Step':
+        """
+        Copy the step, so that its lists and dictionaries can be modified independently of the original;
+        nested configurations are shared
+
+        >>> step = Step(name='foo', command=['foo'], environment={'VAR': 'foo'}, my_var='baz')
+        >>> clone = step._clone()
+        >>> clone['my_var'] = 'bar'
+        >>> clone.environment['VAR'] = 'bar'
+        >>> step
+        {'name': 'foo', 'command': 'foo', 'environment': {'VAR': 'foo'}, 'my_var': 'baz'}
+        """
+        set_field = object.__setattr__  # the check for custom attributes in __setattr__ is not needed here
+        result: Step = Step.__new__(Step)
+        for field in self.__slots__:
+            set_field(result, field, getattr(self, field))
+        command: Tuple[str, ...] = tuple(self._command)
+        for step in (self, result):
+            set_field(step, '_command', command)
+            set_field(step, '_owns_environment', False)
+            set_field(step, '_owns_extras', False)
+        set_field(result, 'depends_on', list(self.depends_on))
+        set_field(result, 'inputs', list(self.inputs))
+        return result
 
     def stringify_command(self) -> bool:
         """
@@ -461,15 +696,20 @@ class Step:
         >>> step.stringify_command()
         True
         """
+        command_line, result = self._join_command(self._command)
+        self.command = [command_line] if command_line else []
+        return result
+
+    @staticmethod
+    def _join_command(command: Sequence[str]) -> Tuple[str, bool]:
         result = False
         command_line = ""
-        for argument in self.command:
+        for argument in command:
             if " " in argument:
                 argument = "\"" + argument + "\""
                 result = True
             command_line = command_line + " " + argument if command_line else argument
-        self.command = [command_line] if command_line else []
-        return result
+        return command_line, result
 
 
 DictTypeT = TypeVar('DictTypeT', bound=dict)
@@ -563,13 +803,88 @@ class Configuration:
 
     def __init__(self, lst: Optional[Union[List[Dict[str, Any]], List[Step]]] = None):
         #  lst can be List[Dict[str, Any]] to support legacy cases - should be removed after project migration
-        self.configs: List[Step] = []  # aggregation is used instead of inheritance for type safety
+        self._configs: List[Step] = []  # aggregation is used instead of inheritance for type safety
         if lst:
             for item in lst:
                 if isinstance(item, Step):
-                    self.configs.append(item)
+                    self._configs.append(item)
                 else:
-                    self.configs.append(Step(**item))
+                    self._configs.append(Step(**item))
+        self._product: Optional[Tuple[Configuration, Configuration]] = None
+        self._origin: Optional[Configuration] = None
+
+    @property
+    def configs(self) -> List[Step]:
+        """
+        List of the top-level steps. For the result of multiplication or a lazy copy it is created on first access
+        """
+        # pylint: disable = protected-access
+        if self._origin is not None:
+            origin: Configuration = self._origin
+            self._origin = None
+            self._configs = [self._copy_step(step, Configuration._copy) for step in origin.configs]
+        if self._product is not None:
+            left, right = self._product
+            self._product = None
+            for step in left.configs:
+                step_copy: Step = step._clone()
+                step_copy.children = self._multiply(step.children, right) if step.children else right._copy()
+                self._configs.append(step_copy)
+        return self._configs
+
+    @configs.setter
+    def configs(self, value: List[Step]) -> None:
+        self._configs = value
+        self._product = None
+        self._origin = None
+
+    def _snapshot(self) -> 'Configuration':
+        """
+        Copy the step tree of the configuration, so that it is not affected by later modifications of this one.
+        Steps are cloned, but not merged, and not yet expanded products are shared, as their operands
+        are snapshots themselves
+        """
+        # pylint: disable = protected-access
+        result: Configuration = Configuration()
+        result._product = self._product
+        result._origin = self._origin
+        for step in self._configs:
+            result._configs.append(self._copy_step(step, Configuration._snapshot))
+        return result
+
+    def _copy(self) -> 'Configuration':
+        """
+        Create a lazy copy of the configuration, whose steps are cloned on first access. The configuration
+        is expected not to be modified afterwards, so it should be a snapshot or a part of one
+        """
+        result: Configuration = Configuration()
+        result._origin = self  # pylint: disable = protected-access
+        return result
+
+    @staticmethod
+    def _copy_step(step: Step, copy_nested: Callable[['Configuration'], 'Configuration']) -> Step:
+        step_copy: Step = step._clone()  # pylint: disable = protected-access
+        for field in ('children', 'if_succeeded', 'if_failed'):
+            nested: Optional[Configuration] = getattr(step, field)
+            if nested is not None:
+                setattr(step_copy, field, copy_nested(nested))
+        return step_copy
+
+    def _source(self) -> 'Configuration':
+        """
+        Configuration to be used for reading only: the steps of a lazy copy are not created,
+        as its origin has the same contents
+        """
+        result: Configuration = self
+        while result._origin is not None:  # pylint: disable = protected-access
+            result = result._origin  # pylint: disable = protected-access
+        return result
+
+    @staticmethod
+    def _multiply(left: 'Configuration', right: 'Configuration') -> 'Configuration':
+        result: Configuration = Configuration()
+        result._product = (left, right)  # pylint: disable = protected-access
+        return result
 
     def __eq__(self, other: Any) -> bool:
         """
@@ -600,9 +915,9 @@ class Configuration:
         False
         """
         if isinstance(other, Configuration):
-            return self.configs == other.configs
+            return self._source().configs == other._source().configs
         if isinstance(other, list):
-            return self.configs == other
+            return self._source().configs == other
         return super().__eq__(other)
 
     def __bool__(self) -> bool:
@@ -621,7 +936,7 @@ class Configuration:
         >>> bool(cfg3)
         True
         """
-        return len(self.configs) != 0
+        return len(self._source().configs) != 0
 
     def __getitem__(self, item: int) -> Step:
         return self.configs[item]
@@ -645,21 +960,25 @@ class Configuration:
         The resulting object is created by combining every `self` list member with
         every `other` list member using :func:`.combine()` function.
 
+        The product is lazy: each level of the resulting step tree is only created when it is accessed.
+        The steps of the operands are copied (but not merged) on multiplication, so modifying the operands
+        afterwards does not affect the result, and each step of the result gets its own copy of child steps.
+
         :param other: `Configuration` object  OR an integer value to be multiplied to `self`
         :return: new `Configuration` object, consisting of the list of combined configurations
+
+        >>> right = Configuration([Step(name=' baz')])
+        >>> cfg = Configuration([Step(name='foo'), Step(name='bar')]) * right
+        >>> right.configs[0].name = ' changed'
+        >>> [step.name for step in cfg.all()]
+        ['foo baz', 'bar baz']
+        >>> cfg.configs[0].children.configs[0].name = ' changed'
+        >>> [step.name for step in cfg.all()]
+        ['foo changed', 'bar baz']
         """
         if isinstance(other, int):
             return Configuration(list.__mul__(self.configs, other))
-        config_list: List[Step] = []
-        for obj_a in self.configs:
-            obj_a_copy = copy.deepcopy(obj_a)
-            if obj_a.children:
-                obj_a_copy.children = obj_a.children * other
-            else:
-                obj_a_copy.children = copy.deepcopy(other)
-
-            config_list.append(obj_a_copy)
-        return Configuration(config_list)
+        return self._multiply(self._snapshot(), other._snapshot())
 
     def all(self) -> Iterable[Step]:
         """
@@ -667,12 +986,16 @@ class Configuration:
 
         :return: iterable for all dictionary objects in :class:`Configuration` list
         """
-        for obj_a in self.configs:
-            if obj_a.children:
-                for obj_b in obj_a.children.all():
-                    yield obj_a + obj_b
+        return self._walk(Step())
+
+    def _walk(self, parent: Step) -> Iterator[Step]:
+        # merged steps are created one by one, so that the whole tree is never kept in memory
+        for step in self._source().configs:
+            item: Step = parent + step
+            if step.children:
+                yield from step.children._walk(item)  # pylint: disable = protected-access
             else:
-                yield copy.deepcopy(obj_a)
+                yield item
 
     def dump(self, produce_string_command: bool = True) -> str:
         """
@@ -681,62 +1004,114 @@ class Configuration:
         :param produce_string_command: if set to False, prints "command" as list instead of string
         :return: a user-friendly string representation of all configurations list
         """
-        space_found: bool = False
-        result: str = "["
-        for obj in self.all():
-            if len(result) > 1:
-                result += ",\n"
+        result: io.StringIO = io.StringIO()
+        self.write_dump(result, produce_string_command)
+        return result.getvalue()
+
+    def write_dump(self, stream: TextIO, produce_string_command: bool = True) -> None:
+        """
+        Function to write the same representation as :meth:`.dump()` returns to a file-like object
+        step by step, without keeping the whole text in memory
 
-            if produce_string_command and obj.stringify_command():
-                space_found = True
+        :param stream: text file-like object to write to
+        :param produce_string_command: if set to False, prints "command" as list instead of string
 
-            result += str(obj)
+        >>> import sys
+        >>> Configuration([Step(name='foo', command=['foo', 'bar'])]).write_dump(sys.stdout)
+        [{'name': 'foo', 'command': 'foo bar'}]
+        """
+        space_found: bool = False
+        stream.write("[")
+        for index, obj in enumerate(self.all()):
+            if index:
+                stream.write(",\n")
+            text, has_space = obj._format(produce_string_command)  # pylint: disable = protected-access
+            space_found = space_found or has_space
+            stream.write(text)
 
-        result += "]"
+        stream.write("]")
 
         if space_found:
-            result += "\n\nWARNING! We have detected space character within some of the command-line parameters.\n"
-            result += "Please make sure you are not trying to pass two or more parameters as one."
-        return result
+            stream.write("\n\nWARNING! We have detected space character within some of the command-line parameters.\n"
+                         "Please make sure you are not trying to pass two or more parameters as one.")
+
+    def defined_steps(self) -> Iterator[Step]:
+        """
+        Function to iterate over all the steps defined in this configuration and its child configurations,
+        as they are written in configuration file: steps are not merged with their parents, the multiplication
+        is not expanded, and each object is listed once even if it is a part of several products.
+
+        >>> cfg = Configuration([Step(name='foo')]) * Configuration([Step(name=' bar'), Step(name=' baz')])
+        >>> sorted(step.name for step in cfg.defined_steps())
+        [' bar', ' baz', 'foo']
+        """
+        visited: Set[int] = set()
+        pending: List[Configuration] = [self]
+        while pending:
+            configuration: Configuration = pending.pop()
+            if id(configuration) in visited:
+                continue
+            visited.add(id(configuration))
+            for step in configuration._configs:  # pylint: disable = protected-access
+                yield step
+                if step.children is not None:
+                    pending.append(step.children)
+            if configuration._product is not None:  # pylint: disable = protected-access
+                pending.extend(configuration._product)  # pylint: disable = protected-access
+            if configuration._origin is not None:  # pylint: disable = protected-access
+                pending.append(configuration._origin)  # pylint: disable = protected-access
 
     def filter(self, checker: Callable[[Step], bool],
-               parent: Optional[Step] = None) -> 'Configuration':
+               prefix_checker: Optional[Callable[[Step, 'Configuration'], bool]] = None) -> 'Configuration':
         """
         This function is supposed to be called from main script, not configuration file.
         It uses provided `checker` to find all the configurations that pass the check,
         removing those not matching conditions.
 
+        Merged steps are created one by one while the tree is traversed, and only the steps passing the check
+        are copied to the result, so that the full product of multiplied configurations is never built.
+
         :param checker: a function that returns `True` if configuration passes the filter and `False` otherwise
-        :param parent: an inner parameter for recursive usage; should be None when function is called from outside
+        :param prefix_checker: optional function, that is called for each step with children before visiting them,
+            with the step merged with its parents and its child configuration. It should return `False` only if
+            none of the steps in this subtree can pass `checker`, so that the whole subtree is skipped unexpanded
         :return: new `Configuration` object without configurations not matching `checker` conditions
-        """
 
-        if parent is None:
-            parent = Step()
-
-        filtered_configs: Configuration = Configuration()
-
-        for obj_a in self.configs:
-            item: Step = parent + obj_a
-
-            if obj_a.children:
-                active_children_configs = obj_a.children.filter(checker, item).configs
-                if active_children_configs:
-                    if len(active_children_configs) == 1:
-                        obj_a_copy = obj_a + active_children_configs[0]
-                        if active_children_configs[0].children:
-                            obj_a_copy.children = active_children_configs[0].children
-                        obj_a_copy.critical = \
-                            obj_a.critical or active_children_configs[0].critical
-                    else:
-                        obj_a_copy = copy.deepcopy(obj_a)
-                        obj_a_copy.children = Configuration(active_children_configs)
-                    filtered_configs += [obj_a_copy]
-            else:
+        >>> cfg = Configuration([Step(name='foo')]) * Configuration([Step(name=' bar'), Step(name=' baz')])
+        >>> cfg.filter(lambda step: step.name != 'foo baz').configs
+        [{'name': 'foo bar'}]
+        >>> cfg.filter(lambda step: True, lambda step, children: step.name != 'foo').configs
+        []
+        """
+        return Configuration(self._filter_steps(checker, prefix_checker, Step()))
+
+    def _filter_steps(self, checker: Callable[[Step], bool],
+                      prefix_checker: Optional[Callable[[Step, 'Configuration'], bool]], parent: Step) -> List[Step]:
+        result: List[Step] = []
+        for step in self._source().configs:
+            item: Step = parent + step
+            if not step.children:
                 if checker(item):
-                    filtered_configs += [copy.deepcopy(obj_a)]
-
-        return filtered_configs
+                    result.append(step._clone())  # pylint: disable = protected-access
+                continue
+            children: Configuration = step.children._source()  # pylint: disable = protected-access
+            if prefix_checker and not prefix_checker(item, children):
+                continue
+
+            active_children: List[Step] = children._filter_steps(  # pylint: disable = protected-access
+                checker, prefix_checker, item)
+            if not active_children:
+                continue
+            if len(active_children) == 1:
+                step_copy: Step = step + active_children[0]
+                if active_children[0].children:
+                    step_copy.children = active_children[0].children
+                step_copy.critical = step.critical or active_children[0].critical
+            else:
+                step_copy = step._clone()  # pylint: disable = protected-access
+                step_copy.children = Configuration(active_children)
+            result.append(step_copy)
+        return result
 
 
 global_project_root = os.getcwd()
@@ -0,0 +1,227 @@
+"""
+Loader of project configurations, written in JSON, YAML or TOML instead of Python.
+Such configurations are parsed and validated without executing any code, so they can be also read by other tools.
+
+The file contains a mapping with the only key ``configs``, which is a list of items. Each item is either
+
+* a mapping of :class:`~universum.configuration_support.Step` keys, that describes a single step;
+  ``steps`` key can be used to define child steps, and ``if_succeeded`` and ``if_failed`` are lists of items as well,
+* ``{"matrix": [<list of items>, <list of items>, ...]}``, that is the product of listed configurations,
+  same as ``Configuration(...) * Configuration(...)`` in Python configuration file,
+* ``{"include": "<path>"}``, that adds all the steps of another declarative configuration file;
+  the path is relative to the directory of the current file.
+
+For example, the following YAML file
+
+.. code-block:: yaml
+
+    configs:
+      - name: "Prepare"
+        command: ["./prepare.sh"]
+      - matrix:
+          - - name: "Make "
+              command: ["make"]
+          - - name: "Linux"
+              command: ["--platform", "Linux"]
+            - name: "Windows"
+              command: ["--platform", "Windows"]
+
+is equivalent to the Python configuration
+
+.. code-block:: python
+
+    configs = Configuration([Step(name="Prepare", command=["./prepare.sh"])]) + \\
+        Configuration([Step(name="Make ", command=["make"])]) * \\
+        Configuration([Step(name="Linux", command=["--platform", "Linux"]),
+                       Step(name="Windows", command=["--platform", "Windows"])])
+"""
+
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+import yaml
+
+from .configuration_support import Configuration, Step
+from .lib.ci_exception import CriticalCiException
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None  # type: ignore[assignment]
+
+__all__ = [
+    "ConfigurationError",
+    "is_declarative",
+    "load_configuration"
+]
+
+
+class ConfigurationError(CriticalCiException):
+    pass
+
+
+def _is_string(value: Any) -> bool:
+    return isinstance(value, str)
+
+
+def _is_bool(value: Any) -> bool:
+    return isinstance(value, bool)
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_string_list(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def _is_string_dict(value: Any) -> bool:
+    return isinstance(value, dict) and all(isinstance(key, str) and isinstance(item, str)
+                                           for key, item in value.items())
+
+
+# Step keys, that are passed to the constructor as is, and functions to validate their values
+_STEP_KEYS: Dict[str, Callable[[Any], bool]] = {
+    "name": _is_string,
+    "command": _is_string_list,
+    "environment": _is_string_dict,
+    "artifacts": _is_string,
+    "report_artifacts": _is_string,
+    "artifact_prebuild_clean": _is_bool,
+    "directory": _is_string,
+    "critical": _is_bool,
+    "background": _is_bool,
+    "finish_background": _is_bool,
+    "code_report": _is_bool,
+    "pass_tag": _is_string,
+    "fail_tag": _is_string,
+    "if_env_set": _is_string,
+    "depends_on": _is_string_list,
+    "inputs": _is_string_list,
+    "weight": _is_int
+}
+_TYPE_NAMES: Dict[Callable[[Any], bool], str] = {
+    _is_string: "a string",
+    _is_bool: "a boolean",
+    _is_int: "an integer",
+    _is_string_list: "a list of strings",
+    _is_string_dict: "a mapping of strings"
+}
+# Step keys containing nested lists of items
+_NESTED_KEYS: List[str] = ["steps", "if_succeeded", "if_failed"]
+
+_PARSERS: Dict[str, Callable[[bytes], Any]] = {
+    ".json": json.loads,
+    ".yaml": yaml.safe_load,
+    ".yml": yaml.safe_load
+}
+if tomllib:
+    _PARSERS[".toml"] = lambda data: tomllib.loads(data.decode("utf-8"))
+
+
+def is_declarative(path: str) -> bool:
+    """
+    >>> is_declarative("configs/.universum.yaml")
+    True
+    >>> is_declarative(".universum.py")
+    False
+    """
+    return os.path.splitext(path)[1].lower() in (".json", ".yaml", ".yml", ".toml")
+
+
+class _Loader:
+    def __init__(self) -> None:
+        self.files: List[str] = []  # stack of files being loaded, to detect recursive inclusion
+
+    def load_file(self, path: str, location: str) -> Configuration:
+        path = os.path.abspath(path)
+        if path in self.files:
+            raise ConfigurationError(f"{location}: file '{path}' includes itself")
+        extension: str = os.path.splitext(path)[1].lower()
+        parser: Optional[Callable[[bytes], Any]] = _PARSERS.get(extension)
+        if not parser:
+            if extension == ".toml":
+                raise ConfigurationError(f"{location}: TOML configuration files require Python 3.11 or newer")
+            raise ConfigurationError(f"{location}: unsupported configuration file format '{extension}'")
+
+        try:
+            with open(path, "rb") as f:
+                data: Any = parser(f.read())
+        except OSError as e:
+            raise ConfigurationError(f"{location}: failed to read configuration file: {e}") from e
+        except ValueError as e:  # includes JSON and TOML decoding errors
+            raise ConfigurationError(f"{path}: {e}") from e
+        except yaml.YAMLError as e:
+            raise ConfigurationError(f"{path}: {e}") from e
+
+        if not isinstance(data, dict) or set(data) != {"configs"}:
+            raise ConfigurationError(f"{path}: the file should contain a mapping with the only key 'configs'")
+        self.files.append(path)
+        try:
+            return self.load_items(data["configs"], f"{path}: configs")
+        finally:
+            self.files.pop()
+
+    def load_items(self, items: Any, location: str) -> Configuration:
+        if not isinstance(items, list):
+            raise ConfigurationError(f"{location}: expected a list of steps")
+        steps: List[Step] = []
+        for index, item in enumerate(items):
+            item_location: str = f"{location}[{index}]"
+            if not isinstance(item, dict):
+                raise ConfigurationError(f"{item_location}: expected a mapping")
+            if "matrix" in item:
+                steps.extend(self.load_matrix(item, item_location).configs)
+            elif "include" in item:
+                steps.extend(self.load_include(item, item_location).configs)
+            else:
+                steps.append(self.load_step(item, item_location))
+        return Configuration(steps)
+
+    def load_matrix(self, item: Dict[str, Any], location: str) -> Configuration:
+        if len(item) != 1:
+            raise ConfigurationError(f"{location}: 'matrix' can not be combined with other keys")
+        factors: Any = item["matrix"]
+        if not isinstance(factors, list) or not factors:
+            raise ConfigurationError(f"{location}.matrix: expected a non-empty list of step lists")
+        result: Configuration = self.load_items(factors[0], f"{location}.matrix[0]")
+        for index, factor in enumerate(factors[1:], start=1):
+            result = result * self.load_items(factor, f"{location}.matrix[{index}]")
+        return result
+
+    def load_include(self, item: Dict[str, Any], location: str) -> Configuration:
+        if len(item) != 1:
+            raise ConfigurationError(f"{location}: 'include' can not be combined with other keys")
+        if not isinstance(item["include"], str):
+            raise ConfigurationError(f"{location}.include: expected a string")
+        return self.load_file(os.path.join(os.path.dirname(self.files[-1]), item["include"]), location)
+
+    def load_step(self, item: Dict[str, Any], location: str) -> Step:
+        kwargs: Dict[str, Any] = {}
+        for key, value in item.items():
+            if key in _NESTED_KEYS:
+                kwargs[key] = self.load_items(value, f"{location}.{key}")
+                continue
+            validator: Optional[Callable[[Any], bool]] = _STEP_KEYS.get(key)
+            if not validator:
+                raise ConfigurationError(f"{location}: unknown key '{key}'")
+            if not validator(value):
+                raise ConfigurationError(f"{location}.{key}: expected {_TYPE_NAMES[validator]}")
+            kwargs[key] = value
+        children: Optional[Configuration] = kwargs.pop("steps", None)
+        step: Step = Step(**kwargs)
+        step.children = children
+        return step
+
+
+def load_configuration(path: str) -> Configuration:
+    """
+    Load and validate declarative project configuration
+
+    :param path: path to JSON, YAML or TOML file
+    :return: :class:`~universum.configuration_support.Configuration` object, described by the file
+    :raises ConfigurationError: if the file could not be read or does not match the schema
+    """
+    return _Loader().load_file(path, path)
@@ -0,0 +1,140 @@
+import fnmatch
+import os
+import re
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+__all__ = [
+    "ArtifactMatcher"
+]
+
+# pattern index, component index, and whether the component is '**' that has already matched some directory
+State = Tuple[int, int, bool]
+
+_MAGIC = re.compile("[*?[]")
+
+
+def _split(pattern: str) -> Tuple[str, ...]:
+    """
+    >>> _split("/home/user/**/*.log")
+    ('home', 'user', '**', '*.log')
+    """
+    return tuple(component for component in os.path.abspath(pattern).split(os.sep) if component)
+
+
+def _matches_component(name: str, component: str) -> bool:
+    """
+    Names starting with a dot are only matched by wildcards starting with a dot, the same as in ``glob2``
+
+    >>> _matches_component("build.log", "*.log")
+    True
+    >>> _matches_component(".log", "*.log")
+    False
+    >>> _matches_component(".log", ".*")
+    True
+    """
+    if not _MAGIC.search(component):
+        return name == component
+    if name.startswith(".") and not component.startswith("."):
+        return False
+    return fnmatch.fnmatchcase(name, component)
+
+
+class ArtifactMatcher:
+    """
+    Finds paths matching any of the passed glob patterns (with ``**`` for any number of nested directories,
+    as understood by ``glob2``) within a single walk of the file system. Each directory is listed at most once,
+    and only if some of the patterns can match anything inside it; directories reached by the literal parts
+    of the patterns are not listed at all.
+
+    >>> ArtifactMatcher(["/*/no such file", "/"]).match()
+    {'/*/no such file': [], '/': ['/']}
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns: List[str] = list(dict.fromkeys(patterns))
+        self.components: List[Tuple[str, ...]] = [_split(pattern) for pattern in self.patterns]
+        self._entered: Dict[Tuple[int, int], FrozenSet[State]] = {}
+
+    def _enter(self, pattern: int, component: int) -> FrozenSet[State]:
+        """
+        States of the pattern, that has matched all the components before the passed one; as '**' may
+        match no directories at all, the next components may be matched too. The last '**' never matches
+        the directory itself, but only the paths inside it
+        """
+        if (pattern, component) not in self._entered:
+            result: Set[State] = {(pattern, component, False)}
+            components: Tuple[str, ...] = self.components[pattern]
+            if components[component] == "**" and component + 1 < len(components):
+                result.update(self._enter(pattern, component + 1))
+            self._entered[(pattern, component)] = frozenset(result)
+        return self._entered[(pattern, component)]
+
+    def _advance(self, states: FrozenSet[State], name: str, is_dir: bool, is_link: bool,
+                 found: Dict[int, List[str]], path: str) -> FrozenSet[State]:
+        """
+        Match the directory entry against all the states of its parent directory
+        :return: states to match the entries of this entry, if it is a directory
+        """
+        result: Set[State] = set()
+        for pattern, component, is_nested in states:
+            components: Tuple[str, ...] = self.components[pattern]
+            is_last: bool = component + 1 == len(components)
+            if components[component] == "**":
+                # hidden entries are only matched by '**' inside a directory it has already matched, as in glob2
+                if not is_nested and name.startswith("."):
+                    continue
+                if is_dir and not is_link:
+                    result.add((pattern, component, True))
+            elif not _matches_component(name, components[component]):
+                continue
+            if is_last:
+                found[pattern].append(path)
+            elif is_dir:
+                result.update(self._enter(pattern, component + 1))
+        return frozenset(result)
+
+    def match(self) -> Dict[str, List[str]]:
+        """
+        :return: paths matching each of the patterns; matches within each directory are sorted by name
+        """
+        found: Dict[int, List[str]] = {index: [] for index in range(len(self.patterns))}
+        root: Set[State] = set()
+        for index, components in enumerate(self.components):
+            if not components:
+                found[index].append(os.sep)
+            else:
+                root.update(self._enter(index, 0))
+
+        stack: List[Tuple[str, FrozenSet[State]]] = [(os.sep, frozenset(root))] if root else []
+        while stack:
+            directory, states = stack.pop()
+            children: List[Tuple[str, FrozenSet[State]]] = []
+            for name, is_dir, is_link in self._list(directory, states):
+                path: str = os.path.join(directory, name)
+                child_states: FrozenSet[State] = self._advance(states, name, is_dir, is_link, found, path)
+                if child_states:
+                    children.append((path, child_states))
+            stack.extend(reversed(children))
+
+        # a path can be matched more than once by patterns like '**/**'
+        return {pattern: list(dict.fromkeys(found[index])) for index, pattern in enumerate(self.patterns)}
+
+    def _list(self, directory: str, states: FrozenSet[State]) -> List[Tuple[str, bool, bool]]:
+        """
+        :return: names of the directory entries, that may match the states, with flags, whether the entry
+                 is a directory (following symbolic links), and whether it is a symbolic link
+        """
+        components: List[str] = [self.components[pattern][component] for pattern, component, _ in states]
+        if any(_MAGIC.search(component) for component in components):
+            try:
+                with os.scandir(directory) as entries:
+                    return sorted((entry.name, entry.is_dir(), entry.is_symlink()) for entry in entries)
+            except OSError:
+                return []
+
+        result: List[Tuple[str, bool, bool]] = []
+        for name in sorted(set(components)):
+            path: str = os.path.join(directory, name)
+            if os.path.lexists(path):
+                result.append((name, os.path.isdir(path), os.path.islink(path)))
+        return result
@@ -0,0 +1,116 @@
+import gzip
+import struct
+import tempfile
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+
+__all__ = [
+    "OutputJournal"
+]
+
+_HEADER: struct.Struct = struct.Struct("<?I")  # is_stderr, length of the encoded line
+_Stream = Union[BinaryIO, gzip.GzipFile]
+_STDOUT: bool = False
+_STDERR: bool = True
+
+
+class OutputJournal:
+    """
+    Lines of standard and error output, stored in their original order until they can be printed.
+    Lines are kept in memory until their total size exceeds `memory_limit`; after that
+    all of them are moved to an anonymous temporary file, optionally compressed, and new lines are appended there.
+
+    >>> journal = OutputJournal(memory_limit=10)
+    >>> journal.add_stdout("first")
+    >>> journal.is_spilled()
+    False
+    >>> journal.add_stderr("second line")
+    >>> journal.is_spilled()
+    True
+    >>> list(journal.replay())
+    [(False, 'first'), (True, 'second line')]
+    >>> list(journal.replay())
+    []
+    """
+
+    def __init__(self, memory_limit: int, compress: bool = False) -> None:
+        self.memory_limit: int = memory_limit
+        self.compress: bool = compress
+        self._lines: List[Tuple[bool, str]] = []
+        self._size: int = 0
+        self._file: Optional[BinaryIO] = None
+        self._writer: Optional[_Stream] = None
+
+    def is_spilled(self) -> bool:
+        return self._file is not None
+
+    def add_stdout(self, line: str) -> None:
+        self._add(_STDOUT, line)
+
+    def add_stderr(self, line: str) -> None:
+        self._add(_STDERR, line)
+
+    def _add(self, is_stderr: bool, line: str) -> None:
+        if self._writer:
+            self._write(self._writer, is_stderr, line)
+            return
+        self._lines.append((is_stderr, line))
+        self._size += len(line)
+        if self._size > self.memory_limit:
+            self._spill()
+
+    @staticmethod
+    def _write(writer: _Stream, is_stderr: bool, line: str) -> None:
+        data: bytes = line.encode("utf-8", "surrogateescape")
+        writer.write(_HEADER.pack(is_stderr, len(data)))
+        writer.write(data)
+
+    def _spill(self) -> None:
+        self._file = tempfile.TemporaryFile()  # pylint: disable = consider-using-with
+        writer: _Stream = self._file
+        if self.compress:
+            writer = gzip.GzipFile(fileobj=self._file, mode="wb", compresslevel=1)
+        for is_stderr, line in self._lines:
+            self._write(writer, is_stderr, line)
+        self._writer = writer
+        self._lines = []
+        self._size = 0
+
+    def replay(self) -> Iterator[Tuple[bool, str]]:
+        """
+        Yield stored lines in their original order and clear the journal
+        :return: pairs of `is_stderr` flag and the line itself
+        """
+        if not self._file:
+            lines: List[Tuple[bool, str]] = self._lines
+            self._lines = []
+            self._size = 0
+            yield from lines
+            return
+
+        assert self._writer
+        if self._writer is not self._file:
+            self._writer.close()  # flushes compressed data, but keeps the underlying file open
+        self._writer = None
+        file: BinaryIO = self._file
+        self._file = None
+        try:
+            file.seek(0)
+            reader: _Stream = gzip.GzipFile(fileobj=file, mode="rb") if self.compress else file
+            while True:
+                header: bytes = reader.read(_HEADER.size)
+                if not header:
+                    break
+                is_stderr, length = _HEADER.unpack(header)
+                yield is_stderr, reader.read(length).decode("utf-8", "surrogateescape")
+        finally:
+            file.close()
+
+    def close(self) -> None:
+        if self._writer and self._writer is not self._file:
+            self._writer.close()
+        if self._file:
+            self._file.close()
+        self._writer = None
+        self._file = None
+        self._lines = []
+        self._size = 0
@@ -0,0 +1,289 @@
+import asyncio
+import atexit
+import concurrent.futures
+import os
+import resource
+import shlex
+import signal
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from typing_extensions import TypedDict
+
+__all__ = [
+    "ResourceUsage",
+    "RunningProcess",
+    "quote_command",
+    "start_process"
+]
+
+OutputHandler = Callable[[str], None]
+
+_CHUNK_SIZE: int = 64 * 1024
+_POLLING_INTERVAL: float = 0.05
+# signals, that terminate Universum, but do not reach processes started in separate sessions
+_TERMINATING_SIGNALS: Tuple[signal.Signals, ...] = (signal.SIGINT, signal.SIGTERM, signal.SIGHUP)
+
+
+class ResourceUsage(TypedDict):
+    wall_time: float  # seconds
+    user_time: float  # seconds
+    system_time: float  # seconds
+    # kilobytes, for the largest process of the tree; as the process is forked from Universum, the kernel also
+    # counts memory used by Universum itself at the moment of launch, so this is only an upper bound for the step
+    max_rss_upper_bound: int
+    blocks_read: int
+    blocks_written: int
+
+
+def quote_command(args: List[str]) -> str:
+    """
+    >>> quote_command(["bash", "-c", "exit 3"])
+    "bash -c 'exit 3'"
+    """
+    return " ".join(shlex.quote(arg) for arg in args)
+
+
+def _get_exit_code(status: int) -> int:
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+class RunningProcess:
+    """
+    Handle of the external process, launched via :func:`start_process`.
+    Output of the process is read by the shared event loop and passed to handlers line by line.
+    The process is reaped with `os.wait4`, so resources used by it and its waited-for descendants are known.
+    """
+
+    def __init__(self, args: List[str], process: subprocess.Popen, has_own_group: bool = False) -> None:
+        self.ran: str = quote_command(args)
+        self.pid: int = process.pid
+        self.has_own_group: bool = has_own_group
+        self.resource_usage: Optional[ResourceUsage] = None
+        self.result: concurrent.futures.Future = concurrent.futures.Future()
+        self._process: subprocess.Popen = process
+        self._start_time: float = time.monotonic()
+        self._handler_error: Optional[BaseException] = None
+        self._task: Optional[asyncio.Future] = None
+
+    def is_alive(self) -> bool:
+        return not self.result.done()
+
+    def add_done_callback(self, callback: Callable[[], None]) -> None:
+        """
+        Call the function from the event loop thread as soon as the process exits and all its output is handled;
+        if it is already so, the function is called at once
+        """
+        self.result.add_done_callback(lambda _: callback())
+
+    def wait(self) -> int:
+        """
+        Block until the process exits and all its output is handled
+        :return: exit code of the process; negative if the process was killed by a signal
+        """
+        return self.result.result()
+
+    def _send_signal(self, signal_number: int) -> None:
+        try:
+            if self.has_own_group:
+                os.killpg(self.pid, signal_number)
+            elif self.is_alive():
+                os.kill(self.pid, signal_number)
+        except ProcessLookupError:  # already finished
+            pass
+
+    def cancel(self, grace_period: float) -> None:
+        """
+        Terminate the process (and its process group, if it was started in a separate one)
+        and block until it is finished
+        :param grace_period: time in seconds given to the process to exit after SIGTERM before SIGKILL is sent
+        """
+        if not self.is_alive():
+            return
+        self._send_signal(signal.SIGTERM)
+        try:
+            self.result.exception(timeout=grace_period)
+        except concurrent.futures.TimeoutError:
+            self._send_signal(signal.SIGKILL)
+            self.result.exception()
+
+    def _handle(self, handler: OutputHandler, line: bytes) -> None:
+        try:
+            handler(line.decode("utf-8", "replace"))
+        except Exception as e:  # pylint: disable = broad-except
+            # the process output must still be drained, so the error is only reported on wait()
+            if self._handler_error is None:
+                self._handler_error = e
+
+    async def _read_stream(self, pipe, handler: OutputHandler) -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        stream: asyncio.StreamReader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(stream), pipe)
+
+        remainder: bytes = b""
+        while True:
+            chunk: bytes = await stream.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            lines: List[bytes] = (remainder + chunk).split(b"\n")
+            remainder = lines.pop()
+            for line in lines:
+                self._handle(handler, line)
+        if remainder:
+            self._handle(handler, remainder)
+
+    async def _wait_for_exit(self) -> Tuple[int, resource.struct_rusage]:
+        pidfd: Optional[int]
+        try:
+            pidfd = os.pidfd_open(self.pid)
+        except (AttributeError, OSError):  # not supported by Python or OS, polling is used instead
+            pidfd = None
+        if pidfd is not None:
+            loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+            exited: asyncio.Future = loop.create_future()
+
+            def on_exit() -> None:
+                if not exited.done():
+                    exited.set_result(None)
+
+            loop.add_reader(pidfd, on_exit)
+            try:
+                await exited
+            finally:
+                loop.remove_reader(pidfd)
+                os.close(pidfd)
+
+        while True:
+            pid, status, rusage = os.wait4(self.pid, os.WNOHANG)
+            if pid:
+                return status, rusage
+            await asyncio.sleep(_POLLING_INTERVAL)
+
+    async def _communicate(self, stdout_handler: OutputHandler, stderr_handler: OutputHandler) -> None:
+        try:
+            readers: List = []
+            if self._process.stdout:
+                readers.append(self._read_stream(self._process.stdout, stdout_handler))
+            if self._process.stderr:
+                readers.append(self._read_stream(self._process.stderr, stderr_handler))
+            await asyncio.gather(*readers)
+            status, rusage = await self._wait_for_exit()
+        except BaseException as e:  # pylint: disable = broad-except
+            self.result.set_exception(e)
+            return
+
+        self._process.returncode = _get_exit_code(status)  # the process is already reaped
+        self.resource_usage = {"wall_time": time.monotonic() - self._start_time,
+                               "user_time": rusage.ru_utime,
+                               "system_time": rusage.ru_stime,
+                               "max_rss_upper_bound": rusage.ru_maxrss,
+                               "blocks_read": rusage.ru_inblock,
+                               "blocks_written": rusage.ru_oublock}
+        if self._handler_error is not None:
+            self.result.set_exception(self._handler_error)
+        else:
+            self.result.set_result(self._process.returncode)
+
+    def _start_communication(self, stdout_handler: OutputHandler, stderr_handler: OutputHandler) -> None:
+        # must be called in the event loop thread
+        self._task = asyncio.ensure_future(self._communicate(stdout_handler, stderr_handler))
+
+
+class _ProcessEngine:
+    """
+    Single event loop, running in a separate thread and multiplexing output of all launched processes
+    """
+
+    def __init__(self) -> None:
+        self._lock: threading.Lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # is only replaced by the main thread, so that signal handlers can read it without locking
+        self._process_groups: List[RunningProcess] = []
+        self._previous_handlers: Dict[int, Any] = {}
+        self._is_exit_handler_registered: bool = False
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="process-engine", daemon=True).start()
+            return self._loop
+
+    def start(self, args: List[str], cwd: str, env: Dict[str, str],
+              stdout_handler: OutputHandler, stderr_handler: OutputHandler,
+              output_fd: Optional[int], new_process_group: bool) -> RunningProcess:
+        output: int = subprocess.PIPE if output_fd is None else output_fd
+        process: subprocess.Popen = subprocess.Popen(args, cwd=cwd, env=env,  # pylint: disable = consider-using-with
+                                                     stdin=subprocess.DEVNULL, stdout=output, stderr=output,
+                                                     start_new_session=new_process_group)
+        result: RunningProcess = RunningProcess(args, process, new_process_group)
+        if new_process_group:
+            self._track_process_group(result)
+        # pylint: disable = protected-access
+        self._get_loop().call_soon_threadsafe(result._start_communication, stdout_handler, stderr_handler)
+        return result
+
+    def _track_process_group(self, process: RunningProcess) -> None:
+        """
+        Processes in separate sessions do not get signals sent to Universum from terminal,
+        so they are killed on exit or on receiving such signals, not to be left running after Universum
+        """
+        self._process_groups = [item for item in self._process_groups if item.is_alive()] + [process]
+        if not self._is_exit_handler_registered:
+            atexit.register(self.kill_process_groups)
+            self._is_exit_handler_registered = True
+        if threading.current_thread() is not threading.main_thread():
+            return  # signal handlers can only be set from the main thread
+        for signal_number in _TERMINATING_SIGNALS:
+            handler = signal.getsignal(signal_number)
+            # the handlers set by Python code are replaced in turn, as they can be changed after the previous call
+            if handler not in (signal.SIG_IGN, None, self._on_signal):
+                self._previous_handlers[signal_number] = handler
+                signal.signal(signal_number, self._on_signal)
+
+    def _on_signal(self, signal_number: int, frame: Any) -> None:
+        self.kill_process_groups()
+        handler = self._previous_handlers.get(signal_number, signal.SIG_DFL)
+        if callable(handler):
+            handler(signal_number, frame)
+        else:  # default action, e.g. termination
+            signal.signal(signal_number, handler)
+            os.kill(os.getpid(), signal_number)
+
+    def kill_process_groups(self) -> None:
+        """
+        Kill all the processes started in separate sessions, that are still running, with all their descendants
+        """
+        for process in self._process_groups:
+            if process.is_alive():
+                process._send_signal(signal.SIGKILL)  # pylint: disable = protected-access
+
+
+_engine: _ProcessEngine = _ProcessEngine()
+
+
+def start_process(args: List[str], cwd: str, env: Dict[str, str],
+                  stdout_handler: OutputHandler, stderr_handler: OutputHandler,
+                  output_fd: Optional[int] = None, new_process_group: bool = False) -> RunningProcess:
+    """
+    Launch the external process without waiting for it to finish.
+    Handlers are called from the event loop thread for each line of output, without trailing newline.
+
+    :param args: executable path and its arguments
+    :param cwd: working directory of the process
+    :param env: full environment of the process
+    :param stdout_handler: function to handle lines of standard output
+    :param stderr_handler: function to handle lines of error output
+    :param output_fd: file descriptor to attach both standard and error output of the process to;
+        if set, output is written there by the process itself and handlers are never called
+    :param new_process_group: start the process in a new session, so that it and all its descendants
+        can be terminated by :meth:`RunningProcess.cancel`; such processes are also killed if Universum
+        exits or is interrupted while they are running
+    :return: handle of the running process
+    :raises OSError: if the process could not be started
+    """
+    return _engine.start(args, cwd, env, stdout_handler, stderr_handler, output_fd, new_process_group)
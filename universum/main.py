@@ -81,6 +81,7 @@ class Main(HasOutput):
         self.launcher.launch_project()
         if afterall_configs:
             if not self.settings.no_diff:
+                self.artifacts.wait_for_step_artifacts()  # artifacts are collected from the files being reverted
                 try:
                     repo_diff = self.vcs.revert_repository()
                 except NotImplementedError:
@@ -89,12 +90,16 @@ class Main(HasOutput):
                     self.launcher.launch_custom_configs(afterall_configs)
                     self.code_report_collector.repo_diff = repo_diff
             self.code_report_collector.report_code_report_results()
+        self.artifacts.wait_for_step_artifacts()
+        self.artifacts.save_step_timings()
         self.artifacts.report_artifacts()
         result = self.reporter.report_build_result()
         if self.settings.fail_unsuccessful and not result:
             raise SilentAbortException(1)
 
     def finalize(self) -> None:
+        # Sources must not be cleaned while step artifacts are still being collected from them
+        self.artifacts.wait_for_step_artifacts()
         if self.settings.no_finalize:
             self.out.log("Cleaning skipped because of '--no-finalize' option")
             return
@@ -1,21 +1,30 @@
 import codecs
+import concurrent.futures
+import gzip
+import importlib
+import importlib.util
+import itertools
+import json
+import multiprocessing
 import os
+import re
 import shutil
+import tarfile
 import zipfile
-from typing import List, Optional, Dict, Union, TypedDict
-
-import glob2
+from typing import Callable, FrozenSet, Iterator, List, NamedTuple, Optional, Dict, Set, Tuple, Union, TypedDict
 
 from ..configuration_support import Configuration, Step
+from ..lib.artifact_matcher import ArtifactMatcher
 from ..lib.ci_exception import CriticalCiException, CiException
 from ..lib.gravity import Dependency
 from ..lib.utils import make_block
 from ..lib import utils
 from .automation_server import AutomationServerForHostingBuild
+from .error_state import HasErrorState
 from .output import HasOutput
 from .project_directory import ProjectDirectory
 from .reporter import Reporter
-from .structure_handler import HasStructure
+from .structure_handler import Block, HasStructure
 from .output.html_output import HtmlOutput
 
 
@@ -24,36 +33,127 @@ __all__ = [
 ]
 
 
-def make_big_archive(target, source):
-    save_cwd = os.getcwd()
-    if source is not None:
-        target = os.path.abspath(target)
-        os.chdir(source)
-    base_dir = os.curdir
-
-    try:
-        filename = target + ".zip"
-        archive_dir = os.path.dirname(target)
-
-        if archive_dir and not os.path.exists(archive_dir):
-            os.makedirs(archive_dir)
-
-        with zipfile.ZipFile(filename, "w", compression=zipfile.ZIP_DEFLATED,
-                             allowZip64=True) as zf:
-            path = os.path.normpath(base_dir)
-            zf.write(path, path)
-            for dirpath, dirnames, filenames in os.walk(base_dir):
-                for name in sorted(dirnames):
-                    path = os.path.normpath(os.path.join(dirpath, name))
-                    zf.write(path, path)
-                for name in filenames:
-                    path = os.path.normpath(os.path.join(dirpath, name))
-                    if os.path.isfile(path):
-                        zf.write(path, path)
-    finally:
-        if source is not None:
-            os.chdir(save_cwd)
-
+# files of these types are already compressed, so they are stored to ZIP archives as is
+_COMPRESSED_EXTENSIONS: FrozenSet[str] = frozenset([
+    ".7z", ".aab", ".aar", ".apk", ".br", ".bz2", ".cab", ".deb", ".docx", ".ear", ".gif", ".gz", ".ipa", ".jar",
+    ".jpeg", ".jpg", ".lz4", ".lzma", ".mkv", ".mp3", ".mp4", ".nupkg", ".odt", ".png", ".pptx", ".rar", ".rpm",
+    ".tgz", ".war", ".webm", ".webp", ".whl", ".xlsx", ".xz", ".zip", ".zst"
+])
+
+
+class ArchiveFormat(NamedTuple):
+    """
+    Format of archives, created from directories noted as artifacts
+    """
+    extension: str
+    tar_compression: Optional[str] = None  #: `None` for ZIP archives; empty string for uncompressed TAR archives
+    zip_compression: int = zipfile.ZIP_DEFLATED
+    level: Optional[int] = None  #: compression level of ZIP archives; `None` for default one
+
+
+def parse_archive_format(name: str) -> ArchiveFormat:
+    """
+    :param name: 'zip', 'zip-store', 'zip-deflate-N' (N is from 0 to 9), 'tar', 'tar.gz' or 'tar.zst'
+    :raises ValueError: if the format is unknown
+
+    >>> parse_archive_format("zip-deflate-9")
+    ArchiveFormat(extension='.zip', tar_compression=None, zip_compression=8, level=9)
+    >>> parse_archive_format("tar.gz")
+    ArchiveFormat(extension='.tar.gz', tar_compression='gz', zip_compression=8, level=None)
+    """
+    if name in ("zip", "zip-deflate"):
+        return ArchiveFormat(".zip")
+    if name == "zip-store":
+        return ArchiveFormat(".zip", zip_compression=zipfile.ZIP_STORED)
+    match = re.fullmatch(r"zip-deflate-([0-9])", name)
+    if match:
+        return ArchiveFormat(".zip", level=int(match.group(1)))
+    if name in ("tar", "tar.gz", "tar.zst"):
+        return ArchiveFormat("." + name, tar_compression=name[len("tar."):])
+    raise ValueError(f"Unknown archive format '{name}'; supported formats are 'zip', 'zip-store', "
+                     "'zip-deflate-N' (N is compression level from 0 to 9), 'tar', 'tar.gz' and 'tar.zst'")
+
+
+DEFAULT_ARCHIVE_FORMAT: ArchiveFormat = parse_archive_format("zip")
+
+
+def _sorted_entries(path: str) -> List[os.DirEntry]:
+    with os.scandir(path) as entries:
+        return sorted(entries, key=lambda entry: entry.name)
+
+
+def _list_directory(entries: List[os.DirEntry], prefix: str) -> Iterator[Tuple[str, str]]:
+    # same order as of 'os.walk': subdirectories and files of the directory, then contents of each subdirectory
+    subdirectories: List[os.DirEntry] = []
+    for entry in entries:
+        if entry.is_dir():
+            yield entry.path, prefix + entry.name
+            if not entry.is_symlink():
+                subdirectories.append(entry)
+    for entry in entries:
+        if not entry.is_dir() and entry.is_file():
+            yield entry.path, prefix + entry.name
+    for entry in subdirectories:
+        try:
+            children: List[os.DirEntry] = _sorted_entries(entry.path)
+        except OSError:  # unreadable subdirectories are skipped, as by 'os.walk'
+            continue
+        yield from _list_directory(children, prefix + entry.name + "/")
+
+
+def _write_zip(filename: str, paths: Iterator[Tuple[str, str]], archive_format: ArchiveFormat) -> None:
+    with zipfile.ZipFile(filename, "w", compression=archive_format.zip_compression,
+                         compresslevel=archive_format.level, allowZip64=True) as zf:
+        for path, name in paths:
+            compress_type: Optional[int] = None  # default one of the archive
+            if os.path.splitext(name)[1].lower() in _COMPRESSED_EXTENSIONS:
+                compress_type = zipfile.ZIP_STORED
+            zf.write(path, name, compress_type=compress_type)
+
+
+def _add_to_tar(tar: tarfile.TarFile, paths: Iterator[Tuple[str, str]]) -> None:
+    for path, name in paths:
+        tar.add(path, name, recursive=False)
+
+
+def _write_tar(filename: str, paths: Iterator[Tuple[str, str]], archive_format: ArchiveFormat) -> None:
+    if archive_format.tar_compression == "zst":
+        zstandard = importlib.import_module("zstandard")
+        with open(filename, "wb") as f, zstandard.ZstdCompressor().stream_writer(f) as stream, \
+                tarfile.open(fileobj=stream, mode="w|") as tar:
+            _add_to_tar(tar, paths)
+    elif archive_format.tar_compression == "gz":
+        with tarfile.open(filename, "w:gz") as tar:
+            _add_to_tar(tar, paths)
+    else:
+        with tarfile.open(filename, "w") as tar:
+            _add_to_tar(tar, paths)
+
+
+def make_big_archive(target: str, source: Optional[str],
+                     archive_format: ArchiveFormat = DEFAULT_ARCHIVE_FORMAT) -> str:
+    """
+    Create archive of a directory, with paths relative to this directory.
+    Current working directory is not changed, so several archives can be created simultaneously
+    :param target: path to the archive without extension
+    :param source: directory to archive; current working directory if `None`
+    :param archive_format: format of the archive; ZIP with default compression level if not specified
+    :return: path to created archive
+    :raises OSError: if `source` is not a directory; the archive is not created in this case
+    """
+    root: str = source if source is not None else os.curdir
+    entries: List[os.DirEntry] = _sorted_entries(root)
+
+    filename = target + archive_format.extension
+    archive_dir = os.path.dirname(target)
+    if archive_dir:
+        os.makedirs(archive_dir, exist_ok=True)
+
+    paths: Iterator[Tuple[str, str]] = itertools.chain([(root, os.curdir)], _list_directory(entries, ""))
+    if archive_format.tar_compression is None:
+        _write_zip(filename, paths, archive_format)
+    else:
+        _write_tar(filename, paths, archive_format)
     return filename
 
 
@@ -62,7 +162,14 @@ class ArtifactInfo(TypedDict):
     clean: bool
 
 
-class ArtifactCollector(ProjectDirectory, HasOutput, HasStructure):
+class QueuedArtifacts(TypedDict):
+    name: str
+    block: Block
+    future: concurrent.futures.Future
+    messages: List[str]
+
+
+class ArtifactCollector(ProjectDirectory, HasOutput, HasStructure, HasErrorState):
     reporter_factory = Dependency(Reporter)
     automation_server_factory = Dependency(AutomationServerForHostingBuild)
     html_output_factory = Dependency(HtmlOutput)
@@ -79,15 +186,33 @@ class ArtifactCollector(ProjectDirectory, HasOutput, HasStructure):
                             help="By default all directories noted as artifacts are copied as .zip archives. "
                                  "This option turn archiving off to copy bare directories to artifact directory")
 
-    def __init__(self, *args, **kwargs):
+        parser.add_argument("--archive-format", dest="archive_format", default="zip", metavar="ARCHIVE_FORMAT",
+                            help="Format of archives, created from directories noted as artifacts: 'zip', "
+                                 "'zip-store' (no compression), 'zip-deflate-N' (N is compression level "
+                                 "from 0 to 9), 'tar', 'tar.gz' or 'tar.zst' (requires 'zstandard' Python package). "
+                                 "Already compressed files, such as .zip, .gz, .jar, .apk or .png, are stored to "
+                                 "ZIP archives without compression. Default is 'zip'")
+
+        parser.add_argument("--archive-jobs", dest="archive_jobs", type=int, metavar="ARCHIVE_JOBS",
+                            help="Maximum number of directories, matching artifact paths of a step, that are "
+                                 "archived simultaneously in separate processes. "
+                                 "Default is the number of CPUs of the machine")
+
+        parser.add_argument("--async-artifacts", action="store_true", dest="async_artifacts",
+                            help="Collect artifacts of finished steps in background, while the next steps are "
+                                 "executed. Collection results are reported after all steps are finished; "
+                                 "failures are attributed to the steps the artifacts belong to. Steps should not "
+                                 "modify artifacts of previous steps when this option is used")
+
+    def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         self.reporter = self.reporter_factory()
         self.automation_server = self.automation_server_factory()
 
         # Needed because of wildcards
-        self.collected_report_artifacts = set()
+        self.collected_report_artifacts: Set[str] = set()
 
-        self.file_list = set()
+        self.file_list: Set[str] = set()
         self.artifact_dir = self.settings.artifact_dir
 
         if not self.artifact_dir:
@@ -99,11 +224,29 @@ class ArtifactCollector(ProjectDirectory, HasOutput, HasStructure):
         self.html_output.set_artifact_dir(self.artifact_dir)
         self.html_output.artifact_dir_ready = False
 
+        self.archive_jobs = self.settings.archive_jobs or os.cpu_count() or 1
+        if self.archive_jobs < 1:
+            self.error(f"Number of simultaneously archived artifacts should be positive, got '{self.archive_jobs}'")
+
+        self.archive_format = DEFAULT_ARCHIVE_FORMAT
+        try:
+            self.archive_format = parse_archive_format(self.settings.archive_format or "zip")
+        except ValueError as e:
+            self.error(str(e))
+        if self.archive_format.tar_compression == "zst" and not importlib.util.find_spec("zstandard"):
+            self.error("Archive format 'tar.zst' requires Python package 'zstandard' to be installed")
+
+        self.structure.async_artifacts = self.settings.async_artifacts
+        self.artifact_queue: List[QueuedArtifacts] = []
+        self.artifact_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
     def make_file_name(self, name):
         return utils.calculate_file_absolute_path(self.artifact_dir, name)
 
     # TODO: using codecs is legacy from Python2; this function needs to be refactored
-    def create_text_file(self, name):
+    def create_text_file(self, name, compress=False):
+        if compress:
+            name += ".gz"
         try:
             file_name = self.make_file_name(name)
             if file_name not in self.file_list:
@@ -115,6 +258,8 @@ class ArtifactCollector(ProjectDirectory, HasOutput, HasStructure):
             self.file_list.add(file_name)
             file_path = self.automation_server.artifact_path(self.artifact_dir, os.path.basename(file_name))
             self.out.log("Adding file " + file_path + " to artifacts...")
+            if compress:
+                return gzip.open(file_name, "at", encoding="utf-8")   # pylint: disable = consider-using-with
             return codecs.open(file_name, "a", encoding="utf-8")          # pylint: disable = consider-using-with
 
         except IOError as e:
@@ -127,9 +272,11 @@ class ArtifactCollector(ProjectDirectory, HasOutput, HasStructure):
         :param ignore_already_existing: will not check existence of artifacts when set to 'True'
         :return: sorted list of checked paths (including duplicates and wildcards)
         """
+        # All the paths are matched within a single walk of the file system
+        found = ArtifactMatcher(item["path"] for item in artifact_list).match()
         for item in artifact_list:
-            # Check existence in place: wildcards applied
-            matches = glob2.glob(item["path"])
+            # Check existence in place: wildcards applied; matches could be cleaned up along with previous items
+            matches = [matching_path for matching_path in found[item["path"]] if os.path.lexists(matching_path)]
             if matches:
                 if item["clean"]:
                     for matching_path in matches:
@@ -153,8 +300,7 @@ class ArtifactCollector(ProjectDirectory, HasOutput, HasStructure):
             self._check_artifact_absent(artifact_file)
 
             if not self.settings.no_archive:
-                artifact_zip_archive = os.path.join(artifact_file + ".zip")
-                self._check_artifact_absent(artifact_zip_archive)
+                self._check_artifact_absent(artifact_file + self.archive_format.extension)
 
     @make_block("Preprocessing artifact lists")
     def set_and_clean_artifacts(self, project_configs: Configuration, ignore_existing_artifacts: bool = False) -> None:
@@ -203,9 +349,16 @@ class ArtifactCollector(ProjectDirectory, HasOutput, HasStructure):
         path: str = utils.parse_path(artifact, self.settings.project_root)
         return dict(path=path, clean=step.artifact_prebuild_clean)
 
-    def move_artifact(self, path, is_report=False):
-        self.out.log("Processing '" + path + "'")
-        matches = glob2.glob(path)
+    def find_artifact_matches(self, path: str, is_report: bool = False,
+                              log: Optional[Callable[[str], None]] = None,
+                              found: Optional[Dict[str, List[str]]] = None) -> List[str]:
+        """
+        :param found: matches of the paths, already found by :class:`ArtifactMatcher`; the file system is searched
+                      for the path if it is not passed
+        """
+        log = log or self.out.log
+        log("Processing '" + path + "'")
+        matches = (found or ArtifactMatcher([path]).match())[path]
         if not matches:
             if not is_report:
                 text = "No artifacts found!" + "\nPossible reasons of this error:\n" + \
@@ -213,43 +366,148 @@ class ArtifactCollector(ProjectDirectory, HasOutput, HasStructure):
                        " * Artifact path was not specified correctly in 'configs.py'"
                 raise CiException(text)
 
-            self.out.log("No artifacts found.")
+            log("No artifacts found.")
+        return matches
+
+    def archive_matches(self, matches: List[str]) -> List[Optional[OSError]]:
+        """
+        Archive all the matching paths to artifact directory; directories are archived simultaneously
+        in a pool of up to `archive_jobs` processes
+        :param matches: paths to archive
+        :return: errors of archiving each of the paths, `None` for successfully archived ones
+        """
+        results: List[Optional[OSError]] = [None] * len(matches)
+        destinations: List[str] = [os.path.join(self.artifact_dir, os.path.basename(path)) for path in matches]
+        directories: List[int] = [index for index, path in enumerate(matches) if os.path.isdir(path)]
+        futures: Dict[int, concurrent.futures.Future] = {}
+        if self.archive_jobs > 1 and len(directories) > 1:
+            # forking a process with running threads is not safe, so the workers are started by a separate server
+            context = multiprocessing.get_context("forkserver") \
+                if "forkserver" in multiprocessing.get_all_start_methods() else None
+            with concurrent.futures.ProcessPoolExecutor(max_workers=min(self.archive_jobs, len(directories)),
+                                                        mp_context=context) as pool:
+                for index in directories:
+                    futures[index] = pool.submit(make_big_archive, destinations[index], matches[index],
+                                                 self.archive_format)
+                for index, future in futures.items():
+                    try:
+                        future.result()
+                    except OSError as e:
+                        results[index] = e
+        for index, matching_path in enumerate(matches):
+            if index in futures:
+                continue
+            try:
+                make_big_archive(destinations[index], matching_path, self.archive_format)
+            except OSError as e:
+                results[index] = e
+        return results
+
+    def move_matches(self, matches: List[Tuple[str, bool]], log: Optional[Callable[[str], None]] = None) -> None:
+        """
+        Copy or archive found artifacts to artifact directory
+        :param matches: pairs of matching path and flag, whether it is a report artifact
+        :param log: function to log messages with, `self.out.log` by default
+        """
+        log = log or self.out.log
+        archive_errors: List[Optional[OSError]] = []
+        if not self.settings.no_archive:
+            archive_errors = self.archive_matches([matching_path for matching_path, _ in matches])
 
-        for matching_path in matches:
+        for index, (matching_path, is_report) in enumerate(matches):
             artifact_name = os.path.basename(matching_path)
             destination = os.path.join(self.artifact_dir, artifact_name)
-            if not self.settings.no_archive:
-                try:
-                    make_big_archive(destination, matching_path)
-                    if is_report:
-                        artifact_path = self.automation_server.artifact_path(self.artifact_dir, artifact_name + ".zip")
-                        self.collected_report_artifacts.add(artifact_path)
-                    continue
-                except OSError:
-                    # Single file archiving is not implemented at the moment
-                    pass
+            # Single file archiving is not implemented at the moment
+            if not self.settings.no_archive and archive_errors[index] is None:
+                if is_report:
+                    artifact_path = self.automation_server.artifact_path(self.artifact_dir,
+                                                                         artifact_name + self.archive_format.extension)
+                    self.collected_report_artifacts.add(artifact_path)
+                continue
             try:
                 shutil.copytree(matching_path, destination)
                 if is_report:
                     text = "'" + artifact_name + "' is not a file and cannot be reported as an artifact"
-                    self.out.log(text)
+                    log(text)
             except NotADirectoryError:
                 shutil.copyfile(matching_path, destination)
                 if is_report:
                     artifact_path = self.automation_server.artifact_path(self.artifact_dir, artifact_name)
                     self.collected_report_artifacts.add(artifact_path)
 
-    def collect_step_artifacts(self, step_artifacts, step_report_artifacts):
-        if step_artifacts:
-            path = utils.parse_path(step_artifacts, self.settings.project_root)
-            self.move_artifact(path, is_report=False)
-        if step_report_artifacts:
-            path = utils.parse_path(step_report_artifacts, self.settings.project_root)
-            self.move_artifact(path, is_report=True)
+    def move_artifact(self, path, is_report=False):
+        self.move_matches([(matching_path, is_report) for matching_path in self.find_artifact_matches(path, is_report)])
+
+    def collect_step_artifacts(self, step_artifacts: str, step_report_artifacts: str,
+                               log: Optional[Callable[[str], None]] = None) -> None:
+        matches: List[Tuple[str, bool]] = []
+        paths: List[Tuple[str, bool]] = [(utils.parse_path(artifact, self.settings.project_root), is_report)
+                                         for artifact, is_report in [(step_artifacts, False),
+                                                                     (step_report_artifacts, True)] if artifact]
+        found: Dict[str, List[str]] = ArtifactMatcher(path for path, _ in paths).match()
+        for path, is_report in paths:
+            matches.extend((matching_path, is_report)
+                           for matching_path in self.find_artifact_matches(path, is_report, log, found))
+        self.move_matches(matches, log)
+
+    def queue_step_artifacts(self, name: str, block: Block, step_artifacts: str, step_report_artifacts: str) -> None:
+        """
+        Start collecting step artifacts in background thread; artifacts are collected one step after another,
+        in the order the steps are finished. Output is postponed until :meth:`wait_for_step_artifacts` is called
+        :param name: name of the step, used in logs
+        :param block: block of the step, that is reported as failed if the artifacts can not be collected
+        """
+        if self.artifact_executor is None:
+            self.artifact_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1,
+                                                                           thread_name_prefix="artifacts")
+        messages: List[str] = []
+        future: concurrent.futures.Future = self.artifact_executor.submit(
+            self.collect_step_artifacts, step_artifacts, step_report_artifacts, messages.append)
+        self.artifact_queue.append({'name': name, 'block': block, 'future': future, 'messages': messages})
+        self.out.log("Artifacts of this step are collected in background")
+
+    def wait_for_step_artifacts(self) -> None:
+        """
+        Wait for all artifacts, queued by :meth:`queue_step_artifacts`, to be collected and report the results
+        """
+        if not self.artifact_queue:
+            return
+        with self.structure.block(block_name="Waiting for step artifacts to be collected", pass_errors=False):
+            while self.artifact_queue:
+                item: QueuedArtifacts = self.artifact_queue.pop(0)
+                with self.structure.block(block_name=f"Collecting artifacts for the '{item['name']}' step",
+                                          pass_errors=False):
+                    error: Optional[BaseException] = item['future'].exception()
+                    for message in item['messages']:
+                        self.out.log(message)
+                    if error is not None:
+                        self.structure.fail_block(item['block'])
+                        raise error
+        if self.artifact_executor is not None:
+            self.artifact_executor.shutdown()
+            self.artifact_executor = None
 
     def report_artifacts(self):
         self.reporter.report_artifacts(list(self.collected_report_artifacts))
 
+    def save_step_timings(self) -> None:
+        """
+        Write resources used by all executed steps to 'STEP_TIMINGS.json' in artifact directory
+        """
+        timings: List[Dict] = []
+        for block in self.structure.root_block.walk():
+            if block.resource_usage is not None:
+                timings.append({"number": block.number, "name": block.name.strip(), "status": block.status,
+                                **block.resource_usage})
+        if not timings:
+            return
+        file_name: str = self.make_file_name("STEP_TIMINGS.json")
+        file_path: str = self.automation_server.artifact_path(self.artifact_dir, os.path.basename(file_name))
+        self.out.log("Adding file " + file_path + " to artifacts...")
+        # Unlike step logs, the file from previous build is not considered an error and is simply overwritten
+        with open(file_name, "w", encoding="utf-8") as f:
+            json.dump(timings, f, indent=2)
+
     def clean_artifacts_silently(self):
         try:
             shutil.rmtree(self.artifact_dir)
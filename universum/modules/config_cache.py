@@ -0,0 +1,272 @@
+import builtins
+import collections.abc
+import hashlib
+import marshal
+import os
+import pickle
+import sys
+from types import CodeType, ModuleType
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from typing_extensions import TypedDict
+
+from .output import HasOutput
+from .project_directory import ProjectDirectory
+from .. import __version__
+from ..configuration_support import Configuration
+from ..lib import utils
+
+__all__ = [
+    "ConfigCache"
+]
+
+
+class _CacheEntry(TypedDict):
+    modules: Dict[str, Optional[str]]  # path -> hash of contents
+    environment: Dict[str, Optional[str]]  # name -> value, None for unset variables
+    configs: Configuration
+
+
+class _RecordingEnviron(collections.abc.MutableMapping):
+    """
+    Wrapper of `os.environ`, recording all the variables read by the project configuration
+    """
+
+    def __init__(self, environ) -> None:
+        self.environ = environ
+        self.read: Dict[str, Optional[str]] = {}
+        self.is_fully_read: bool = False
+        self.is_modified: bool = False
+
+    def __getitem__(self, key: str) -> str:
+        value: Optional[str] = self.environ.get(key)
+        self.read[key] = value
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: str) -> None:
+        self.is_modified = True
+        self.environ[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        self.is_modified = True
+        del self.environ[key]
+
+    def __iter__(self) -> Iterator[str]:
+        self.is_fully_read = True
+        return iter(self.environ)
+
+    def __len__(self) -> int:
+        self.is_fully_read = True
+        return len(self.environ)
+
+    def copy(self) -> Dict[str, str]:
+        self.is_fully_read = True
+        return self.environ.copy()
+
+
+class _RecordingOs(ModuleType):
+    """
+    Copy of `os` module, that is imported by the project configuration instead of the original one,
+    so that the environment variables it reads are recorded without replacing the process-wide `os.environ`
+    """
+
+    _bytes_environment_attributes = ("environb", "getenvb")
+
+    def __init__(self, environ: _RecordingEnviron) -> None:
+        super().__init__(os.__name__, os.__doc__)
+        self.__dict__.update(os.__dict__)
+        self.environ = environ
+        for name in ("getenv",) + self._bytes_environment_attributes:
+            self.__dict__.pop(name, None)  # class attributes are used instead
+
+    def getenv(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        return self.environ.get(key, default)
+
+    def __getattr__(self, name: str) -> Any:
+        # is only called for the removed attributes: the variables read via bytes interface are not recorded
+        if name in self._bytes_environment_attributes:
+            self.environ.is_fully_read = True
+        return getattr(os, name)
+
+
+def _refers_to_environment(module: ModuleType) -> bool:
+    environment_objects: List[Any] = [os, os.environ, os.getenv]
+    return any(value is item for value in vars(module).values() for item in environment_objects)
+
+
+def _hash_file(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+class ConfigCache(ProjectDirectory, HasOutput):
+    """
+    Stores evaluated project configuration, so that the configuration file is not executed again
+    until it, any of the modules it imports from the project, or any of the environment variables it reads change
+    """
+
+    max_entries: int = 20
+
+    @staticmethod
+    def define_arguments(argument_parser):
+        parser = argument_parser.get_or_create_group("Configuration execution",
+                                                     "External command launching and reporting parameters")
+
+        parser.add_argument("--config-cache-dir", dest="config_cache_dir", metavar="CONFIG_CACHE_DIR",
+                            help="Directory to store evaluated project configuration to. The configuration file "
+                                 "is not executed again while neither the file itself, nor the modules it "
+                                 "imports from the project directory, nor the values of environment variables "
+                                 "it reads are changed. Note that other files read by the configuration are not "
+                                 "tracked. Configurations modifying environment variables, or importing project "
+                                 "modules that refer to them, are never cached. "
+                                 "By default, the configuration is evaluated on every run")
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.cache_dir: Optional[str] = None
+        if self.settings.config_cache_dir:
+            self.cache_dir = utils.parse_path(self.settings.config_cache_dir, os.getcwd())
+
+    def _get_key(self, config_path: str, source: bytes) -> str:
+        digest = hashlib.sha256()
+        for item in (__version__, sys.version, config_path, self.settings.project_root):
+            digest.update(item.encode("utf-8", "surrogateescape") + b"\0")
+        digest.update(source)
+        return digest.hexdigest()
+
+    def _is_valid(self, entry: _CacheEntry) -> bool:
+        for name, value in entry["environment"].items():
+            if os.environ.get(name) != value:
+                return False
+        return all(_hash_file(path) == file_hash for path, file_hash in entry["modules"].items())
+
+    def _load(self, key: str) -> Optional[Configuration]:
+        assert self.cache_dir
+        entry_path: str = os.path.join(self.cache_dir, key + ".pickle")
+        try:
+            with open(entry_path, "rb") as f:
+                entry: _CacheEntry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:  # pylint: disable = broad-except
+            self.out.log(f"Cached project configuration is ignored, as it could not be read: {e}")
+            return None
+        if not self._is_valid(entry):
+            return None
+        try:
+            os.utime(entry_path)  # recently used entries are the last to be removed
+        except OSError:
+            pass
+        return entry["configs"]
+
+    def _compile(self, key: str, config_path: str, source: bytes) -> CodeType:
+        code_path: Optional[str] = os.path.join(self.cache_dir, key + ".code") if self.cache_dir else None
+        if code_path:
+            try:
+                with open(code_path, "rb") as f:
+                    code: Any = marshal.load(f)
+                if isinstance(code, CodeType):
+                    return code
+            except (OSError, EOFError, ValueError, TypeError):
+                pass
+        result: CodeType = compile(source, config_path, "exec")
+        if code_path:
+            try:
+                with open(code_path, "wb") as f:
+                    marshal.dump(result, f)
+            except OSError:
+                pass
+        return result
+
+    def _get_imported_modules(self, config_path: str, previous_modules: Set[str]) -> Dict[str, ModuleType]:
+        # only the modules imported for the first time are detected, that is always the case for a new process
+        roots = [os.path.join(os.path.abspath(self.settings.project_root), ""),
+                 os.path.join(os.path.dirname(config_path), "")]
+        result: Dict[str, ModuleType] = {}
+        for name, module in list(sys.modules.items()):
+            path: Optional[str] = getattr(module, "__file__", None)
+            if name in previous_modules or not path:
+                continue
+            path = os.path.abspath(path)
+            if any(path.startswith(root) for root in roots):
+                result[path] = module
+        return result
+
+    def _save(self, key: str, entry: _CacheEntry) -> None:
+        assert self.cache_dir
+        entry_path: str = os.path.join(self.cache_dir, key + ".pickle")
+        try:
+            with open(entry_path + ".tmp", "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(entry_path + ".tmp", entry_path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            self.out.log(f"Failed to store project configuration to cache: {e}")
+            try:
+                os.remove(entry_path + ".tmp")
+            except OSError:
+                pass
+            return
+
+        entries = sorted((os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                          if name.endswith(".pickle")), key=os.path.getmtime, reverse=True)
+        for path in entries[self.max_entries:]:
+            for file_path in (path, path[:-len(".pickle")] + ".code"):
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    pass
+
+    def evaluate(self, config_path: str) -> Configuration:
+        """
+        Execute project configuration file, or load the result of its previous execution from cache
+        :param config_path: absolute path to the configuration file
+        :return: the value of `configs` variable, defined by the configuration file
+        :raises OSError: if the configuration file could not be read
+        :raises KeyError: if `configs` variable is not defined
+        """
+        with open(config_path, "rb") as f:
+            source: bytes = f.read()
+        key: str = self._get_key(config_path, source)
+        if self.cache_dir:
+            configs: Optional[Configuration] = self._load(key)
+            if configs is not None:
+                self.out.log("Project configuration is loaded from cache")
+                return configs
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        code: CodeType = self._compile(key, config_path, source)
+        config_globals: Dict[str, Any] = {}
+        if not self.cache_dir:
+            exec(code, config_globals)  # pylint: disable = exec-used
+            return config_globals["configs"]
+
+        previous_modules: Set[str] = set(sys.modules)
+        environ = _RecordingEnviron(os.environ)
+        recording_os = _RecordingOs(environ)
+
+        def import_module(name, *args, **kwargs):
+            module = builtins.__import__(name, *args, **kwargs)
+            return recording_os if module is os else module
+
+        config_globals["__builtins__"] = dict(vars(builtins), __import__=import_module)
+        exec(code, config_globals)  # pylint: disable = exec-used
+
+        result: Configuration = config_globals["configs"]
+        modules: Dict[str, ModuleType] = self._get_imported_modules(config_path, previous_modules)
+        if environ.is_modified:
+            self.out.log("Project configuration is not cached, as it modifies environment variables")
+        elif environ.is_fully_read:
+            self.out.log("Project configuration is not cached, as it reads the whole environment")
+        elif any(_refers_to_environment(module) for module in modules.values()):
+            # only the configuration file itself gets the copy of 'os' module, recording the variables read
+            self.out.log("Project configuration is not cached, as the modules it imports may read environment")
+        else:
+            self._save(key, {"modules": {path: _hash_file(path) for path in modules},
+                             "environment": environ.read,
+                             "configs": result})
+        return result
@@ -1,19 +1,23 @@
+import fnmatch
+import functools
 import os
 import re
+import shutil
 import sys
 from inspect import cleandoc
-from typing import Callable, Dict, List, Optional, TextIO, Tuple, Union
+from typing import Callable, ClassVar, Dict, List, Optional, Pattern, Set, TextIO, Tuple, Union
 
-import sh
 from requests import Response
 
-from . import automation_server, api_support, artifact_collector, reporter, code_report_collector
+from . import automation_server, api_support, artifact_collector, reporter, code_report_collector, step_cache, \
+    config_cache
 from .error_state import HasErrorState
 from .output import HasOutput, Output
 from .project_directory import ProjectDirectory
-from .structure_handler import HasStructure, RunningStepBase
-from .. import configuration_support
-from ..lib import utils
+from .structure_handler import Block, HasStructure, RunningStepBase
+from .. import configuration_support, declarative_config
+from ..lib import utils, process_engine
+from ..lib.output_journal import OutputJournal
 from ..lib.ci_exception import CiException, CriticalCiException
 from ..lib.gravity import Dependency
 from ..lib.utils import make_block
@@ -24,11 +28,191 @@ __all__ = [
 ]
 
 
-def make_command(name: str) -> sh.Command:
-    try:
-        return sh.Command(name)
-    except sh.CommandNotFound as e:
-        raise CiException(f"No such file or command as '{name}'") from e
+def make_command(name: str) -> str:
+    path: Optional[str] = shutil.which(name)
+    if not path:
+        raise CiException(f"No such file or command as '{name}'")
+    return os.path.abspath(path)
+
+
+_TRUE_VALUES: Tuple[str, ...] = ("True", "true", "Yes", "yes", "Y", "y")
+_Getenv = Callable[[str], Optional[str]]
+
+
+class _EnvCondition:
+    """
+    Single clause of `if_env_set` expression: 'NAME', 'NAME == value' or 'NAME != value'
+    """
+
+    def __init__(self, text: str) -> None:
+        self.name: str = text.strip()
+        self.operator: Optional[str] = None
+        self.value: str = ""
+        match = re.match(r"\s*([A-Za-z_]\w*)\s*(!=|==)\s*(.*?)\s*$", text)
+        if match:
+            self.name, self.operator, self.value = match.groups()
+
+    def evaluate(self, getenv: _Getenv) -> bool:
+        if not self.name:  # empty clauses, e.g. in 'VAR &&', are ignored
+            return True
+        value: Optional[str] = getenv(self.name)
+        # With no operator variable should be obligatory set to any positive value
+        if self.operator is None:
+            return value in _TRUE_VALUES
+        # In "==" case variable should be obligatory set to 'value'
+        if self.operator == "==":
+            return value == self.value
+        # In "!=" case variable can be unset or set to any value not matching 'value'
+        return value != self.value
+
+
+class _EnvExpression:
+    """
+    Clauses or groups, joined with either '&&' (`is_any` is False) or '||' (`is_any` is True)
+    """
+
+    def __init__(self, is_any: bool, items: List[Union['_EnvExpression', _EnvCondition]]) -> None:
+        self.is_any: bool = is_any
+        self.items: List[Union[_EnvExpression, _EnvCondition]] = items
+
+    def evaluate(self, getenv: _Getenv) -> bool:
+        if self.is_any:
+            return any(item.evaluate(getenv) for item in self.items)
+        return all(item.evaluate(getenv) for item in self.items)
+
+
+class _EnvExpressionParser:
+    # '(' starts a group only at the beginning of a clause, and ')' ends it only inside a group,
+    # so that parentheses can still be used in values of the top-level clauses
+    _clause_end = re.compile(r"&&|\|\|")
+    _group_clause_end = re.compile(r"&&|\|\||\)")
+
+    def __init__(self, text: str) -> None:
+        self.text: str = text
+        self.position: int = 0
+        self.depth: int = 0
+
+    def error(self, message: str) -> ValueError:
+        return ValueError(f"Invalid 'if_env_set' expression '{self.text}': {message}")
+
+    def skip_spaces(self) -> None:
+        while self.position < len(self.text) and self.text[self.position].isspace():
+            self.position += 1
+
+    def consume(self, token: str) -> bool:
+        self.skip_spaces()
+        if self.text.startswith(token, self.position):
+            self.position += len(token)
+            return True
+        return False
+
+    def parse(self) -> Union[_EnvExpression, _EnvCondition]:
+        result = self.parse_any()
+        self.skip_spaces()
+        if self.position != len(self.text):
+            raise self.error(f"unexpected '{self.text[self.position]}' at position {self.position}")
+        return result
+
+    def parse_any(self) -> Union[_EnvExpression, _EnvCondition]:
+        items = [self.parse_all()]
+        while self.consume("||"):
+            items.append(self.parse_all())
+        return items[0] if len(items) == 1 else _EnvExpression(True, items)
+
+    def parse_all(self) -> Union[_EnvExpression, _EnvCondition]:
+        items = [self.parse_item()]
+        while self.consume("&&"):
+            items.append(self.parse_item())
+        return items[0] if len(items) == 1 else _EnvExpression(False, items)
+
+    def parse_item(self) -> Union[_EnvExpression, _EnvCondition]:
+        if self.consume("("):
+            self.depth += 1
+            result = self.parse_any()
+            if not self.consume(")"):
+                raise self.error("missing ')'")
+            self.depth -= 1
+            return result
+        pattern = self._group_clause_end if self.depth else self._clause_end
+        match = pattern.search(self.text, self.position)
+        end: int = match.start() if match else len(self.text)
+        result = _EnvCondition(self.text[self.position:end])
+        self.position = end
+        return result
+
+
+@functools.lru_cache(maxsize=None)
+def _parse_env_expression(text: str) -> Union[_EnvExpression, _EnvCondition]:
+    return _EnvExpressionParser(text).parse()
+
+
+class EnvConditionChecker:
+    """
+    Predicate for :func:`universum.configuration_support.Configuration.filter`, same as :func:`check_if_env_set`,
+    but evaluating each unique `if_env_set` expression only once. Therefore it should only be used
+    while the environment is not changed, e.g. for a single filtering pass.
+
+    >>> from universum.configuration_support import Step
+    >>> os.environ["MY_VAR"] = "some value"
+    >>> checker = EnvConditionChecker()
+    >>> checker(Step(if_env_set="MY_VAR == some value"))
+    True
+    >>> os.environ["MY_VAR"] = "other value"
+    >>> checker(Step(if_env_set="MY_VAR == some value"))
+    True
+    >>> del os.environ["MY_VAR"]
+    """
+
+    def __init__(self) -> None:
+        self._results: Dict[str, bool] = {}
+        self._variables: Dict[str, Optional[str]] = {}
+        self._appendable: Dict[int, Tuple[configuration_support.Configuration, bool]] = {}
+
+    @staticmethod
+    def _is_appended_condition(expression: str) -> bool:
+        # 'PREFIX' + '&& CONDITION' is false whenever 'PREFIX' is false, unless 'CONDITION' contains '||'
+        return not expression or (expression.lstrip().startswith("&&") and "||" not in expression)
+
+    def _are_appended_conditions(self, children: configuration_support.Configuration) -> bool:
+        cached = self._appendable.get(id(children))
+        if cached is None:
+            cached = (children, all(self._is_appended_condition(step.if_env_set) for step in children.defined_steps()))
+            self._appendable[id(children)] = cached  # configuration is stored to keep its id unique
+        return cached[1]
+
+    def may_match(self, prefix: configuration_support.Step, children: configuration_support.Configuration) -> bool:
+        """
+        Check whether any of the steps, which are combined from `prefix` step and steps
+        from `children` configuration, can pass the check
+
+        >>> from universum.configuration_support import Configuration, Step
+        >>> checker = EnvConditionChecker()
+        >>> checker.may_match(Step(if_env_set="UNSET_VAR"), Configuration([Step(if_env_set=" && OTHER_VAR")]))
+        False
+        >>> checker.may_match(Step(if_env_set="UNSET_VAR"), Configuration([Step(if_env_set=" || OTHER_VAR")]))
+        True
+        """
+        if not prefix.if_env_set or not self._are_appended_conditions(children):
+            return True
+        try:
+            return self(prefix)
+        except ValueError:  # e.g. unclosed parenthesis, that could be closed by child steps
+            return True
+
+    def _getenv(self, name: str) -> Optional[str]:
+        if name not in self._variables:
+            self._variables[name] = os.getenv(name)
+        return self._variables[name]
+
+    def __call__(self, configuration: configuration_support.Step) -> bool:
+        expression: str = configuration.if_env_set
+        if not expression:
+            return True
+        result: Optional[bool] = self._results.get(expression)
+        if result is None:
+            result = _parse_env_expression(expression).evaluate(self._getenv)
+            self._results[expression] = result
+        return result
 
 
 def check_if_env_set(configuration: configuration_support.Step) -> bool:  # TODO move to configuration
@@ -51,43 +235,128 @@ def check_if_env_set(configuration: configuration_support.Step) -> bool:  # TODO
     >>> check_if_env_set(c[0])
     True
 
+    >>> c = Configuration([dict(if_env_set="(OTHER_VAR || MY_VAR == some value) && MY_VAR != other value")])
+    >>> check_if_env_set(c[0])
+    True
+
     :param configuration: :class:`~universum.configuration_support.Step` object
     :return: True if environment satisfies described requirements; False otherwise
+    :raises ValueError: if `if_env_set` expression has unbalanced parentheses
     """
 
     if configuration.if_env_set:
-        variables = configuration.if_env_set.split("&&")
-        for var in variables:
-            if var.strip():
-                match = re.match(r"\s*([A-Za-z_]\w*)\s*(!=|==)\s*(.*?)\s*$", var)
-
-                # With no operator 'match' is None
-                # In this case variable should be obligatory set to any positive value
-                if not match:
-                    if not os.getenv(var.strip()):
-                        return False
-                    if os.getenv(var.strip()) not in ["True", "true", "Yes", "yes", "Y", "y"]:
-                        return False
-                    continue
-
-                name, operator, value = match.groups()
-                # In "==" case variable should be obligatory set to 'value'
-                if operator == "==":
-                    if os.getenv(name) is None:
-                        return False
-                    if os.getenv(name) != value:
-                        return False
-
-                # In "!=" case variable can be unset or set to any value not matching 'value'
-                elif os.getenv(name) is not None:
-                    if os.getenv(name) == value:
-                        return False
+        return _parse_env_expression(configuration.if_env_set).evaluate(os.getenv)
     return True
 
 
+def _is_substring_pattern(pattern: str) -> bool:
+    if len(pattern) > 1 and pattern.startswith("/") and pattern.endswith("/"):
+        return False
+    return "*" not in pattern and "?" not in pattern
+
+
+def compile_match_pattern(patterns: List[str]) -> Optional[Pattern[str]]:
+    """The function to combine step filters into a single regular expression.
+    A filter is a substring of step name by default; a filter containing '*' or '?' is a glob pattern,
+    that should match the whole step name; and a filter enclosed in slashes is a regular expression,
+    searched for in step name.
+
+    >>> compile_match_pattern([]) is None
+    True
+
+    >>> compile_match_pattern(["step 1", "test*", "/[0-9]$/"]).pattern
+    '(?:step\\\\ 1)|(?:\\\\A(?s:test.*)\\\\Z)|(?:[0-9]$)'
+
+    :raises re.error: if any of the regular expressions is not valid
+    """
+    if not patterns:
+        return None
+    parts: List[str] = []
+    for pattern in patterns:
+        if _is_substring_pattern(pattern):
+            part: str = re.escape(pattern)
+        elif "*" in pattern or "?" in pattern:
+            part = r"\A" + fnmatch.translate(pattern)
+        else:
+            part = pattern[1:-1]
+            re.compile(part)  # to report the invalid pattern itself, not the combined one
+        parts.append(f"(?:{part})")
+    return re.compile("|".join(parts))
+
+
+class StepNameMatcher:
+    """
+    Predicate for :func:`universum.configuration_support.Configuration.filter`, selecting steps by their names.
+    Include and exclude patterns are compiled once into a single regular expression each.
+    Results are stored by step name, so that each name is checked only once.
+
+    >>> matcher = StepNameMatcher(["step", "/^test [0-9]+$/"], ["*2"])
+    >>> [matcher.match(name) for name in ["step 1", "step 2", "test 10", "test 10a", "other"]]
+    [True, False, True, False, False]
+
+    Substring patterns are also checked for groups of steps by :meth:`may_match`:
+
+    >>> from universum.configuration_support import Configuration, Step
+    >>> matcher = StepNameMatcher(["Linux"], ["slow"])
+    >>> platform = Configuration([Step(name=" build"), Step(name=" test")])
+    >>> [matcher.may_match(Step(name=name), platform) for name in ["Linux", "Windows", "Linux slow"]]
+    [True, False, False]
+    """
+
+    def __init__(self, include_patterns: List[str], exclude_patterns: List[str]) -> None:
+        self.include: Optional[Pattern[str]] = compile_match_pattern(include_patterns)
+        self.exclude: Optional[Pattern[str]] = compile_match_pattern(exclude_patterns)
+        self._results: Dict[str, bool] = {}
+        # only substring patterns can be checked for the beginning of step name
+        self.include_substrings: Optional[List[str]] = None
+        if include_patterns and all(_is_substring_pattern(pattern) for pattern in include_patterns):
+            self.include_substrings = include_patterns
+        self.exclude_substrings: List[str] = [pattern for pattern in exclude_patterns
+                                              if _is_substring_pattern(pattern)]
+        self._child_names: Dict[int, Tuple[configuration_support.Configuration, Set[str]]] = {}
+
+    def _get_child_names(self, children: configuration_support.Configuration) -> Set[str]:
+        cached = self._child_names.get(id(children))
+        if cached is None:
+            cached = (children, {step.name for step in children.defined_steps()})
+            self._child_names[id(children)] = cached  # configuration is stored to keep its id unique
+        return cached[1]
+
+    def may_match(self, prefix: configuration_support.Step, children: configuration_support.Configuration) -> bool:
+        """
+        Check whether any of the steps, which names start with name of `prefix` step
+        and continue with names of steps from `children` configuration, can match the patterns
+        """
+        if any(pattern in prefix.name for pattern in self.exclude_substrings):
+            return False
+        if self.include_substrings is None or \
+                any(pattern in prefix.name for pattern in self.include_substrings):
+            return True
+        names: Set[str] = self._get_child_names(children)
+        for pattern in self.include_substrings:
+            if any(pattern in name for name in names):
+                return True
+            # pattern can also be split between the names of parent and child steps
+            heads: List[str] = [pattern[:length] for length in range(1, len(pattern))]
+            if any(prefix.name.endswith(head) or any(name.endswith(head) for name in names) for head in heads):
+                return True
+        return False
+
+    def match(self, name: str) -> bool:
+        result: Optional[bool] = self._results.get(name)
+        if result is None:
+            result = (not self.include or self.include.search(name) is not None) and \
+                (not self.exclude or self.exclude.search(name) is None)
+            self._results[name] = result
+        return result
+
+    def __call__(self, step: configuration_support.Step) -> bool:
+        return self.match(step.name)
+
+
 def check_str_match(string: str, include_substrings: List[str], exclude_substrings: List[str]) -> bool:
-    """The function to check whether specified string contains 'include' and
-    does NOT contain 'exclude' substrings.
+    """The function to check whether specified string matches any of 'include' and
+    does NOT match any of 'exclude' patterns. See :class:`StepNameMatcher` for pattern syntax.
 
     >>> check_str_match("step 1", [], [])
     True
@@ -106,17 +375,7 @@ def check_str_match(string: str, include_substrings: List[str], exclude_substrin
 
     :rtype: bool
     """
-    result = not include_substrings
-    for substr in include_substrings:
-        if substr in string:
-            result = True
-            break
-
-    for substr in exclude_substrings:
-        if substr in string:
-            result = False
-            break
-    return result
+    return StepNameMatcher(include_substrings, exclude_substrings).match(string)
 
 
 def get_match_patterns(filters: Union[str, List[str]]) -> Tuple[List[str], List[str]]:
@@ -161,6 +420,8 @@ def get_match_patterns(filters: Union[str, List[str]]) -> Tuple[List[str], List[
 
 
 class RunningStep(RunningStepBase):
+    cancel_grace_period: ClassVar[float] = 5.0
+
     # TODO: change to non-singleton module and get all dependencies by ourselves
     def __init__(self, item: configuration_support.Step,
                  out: Output,
@@ -169,7 +430,10 @@ class RunningStep(RunningStepBase):
                  working_directory: str,
                  additional_environment: Dict[str, str],
                  background: bool,
-                 artifact_collector_obj: artifact_collector.ArtifactCollector) -> None:
+                 artifact_collector_obj: artifact_collector.ArtifactCollector,
+                 step_cache_obj: step_cache.StepCache,
+                 cancellable: bool = False,
+                 postponed_out: Optional[OutputJournal] = None) -> None:
         super().__init__()
         self.configuration: configuration_support.Step = item
         self.out: Output = out
@@ -181,14 +445,20 @@ class RunningStep(RunningStepBase):
         self.environment.update(item.environment)
         self.environment.update(additional_environment)
 
-        self.cmd: sh.Command
-        self.process: sh.RunningCommand
+        self.cmd: str
+        self.process: process_engine.RunningProcess
         self._is_background = background
-        self._postponed_out: List[Tuple[Callable[[str], None], str]] = []
+        self._is_cancellable: bool = cancellable
+        # output of background steps is stored until the step is finalized, and spilled to disk if too large
+        self._postponed_out: OutputJournal = postponed_out or OutputJournal(memory_limit=1024 * 1024)
         self._needs_finalization: bool = True
         self._error: Optional[str] = None
 
         self.artifact_collector = artifact_collector_obj
+        self.step_cache = step_cache_obj
+        self._is_restored_from_cache: bool = False
+        self._cache_record: Optional[step_cache.StepRecord] = None
+        self._resource_usage: Optional[process_engine.ResourceUsage] = None
 
     def prepare_command(self) -> bool:  # FIXME: refactor
         if not self.configuration.command:
@@ -204,7 +474,7 @@ class RunningStep(RunningStepBase):
 
         return True
 
-    def start(self):
+    def start(self) -> None:
         self._error = None
         try:
             if not self.prepare_command():
@@ -214,37 +484,57 @@ class RunningStep(RunningStepBase):
             self._error = str(ex)
             return
 
-        self._postponed_out = []
-        self.process = self.cmd(*self.configuration.command[1:],
-                                _iter=True,
-                                _bg_exc=False,
-                                _cwd=self.working_directory,
-                                _env=self.environment,
-                                _bg=self._is_background,
-                                _out=self.handle_stdout,
-                                _err=self.handle_stderr)
-
-        log_cmd = utils.trim_and_convert_to_unicode(self.process.ran)
+        self._postponed_out.close()
+        cache_key: Optional[str] = self.step_cache.calculate_key(self.configuration)
+        if cache_key:
+            self._is_restored_from_cache = self.step_cache.restore(cache_key, self.handle_stdout, self.handle_stderr)
+            if self._is_restored_from_cache:
+                return
+            self._cache_record = self.step_cache.start_recording(cache_key)
+
+        args: List[str] = [self.cmd] + list(self.configuration.command[1:])
+        log_cmd: str = process_engine.quote_command(args)
         self.out.log_external_command(log_cmd)
+        output_fd: Optional[int] = None
         if self.file:
             self.file.write("$ " + log_cmd + "\n")
+            if not self._cache_record:  # recorded output has to pass through handlers
+                # the process writes its output to the log file directly, without copying it line by line
+                self.file.flush()
+                output_fd = self.file.fileno()
+
+        try:
+            self.process = process_engine.start_process(args,
+                                                        cwd=self.working_directory,
+                                                        env=self.environment,
+                                                        stdout_handler=self.handle_stdout,
+                                                        stderr_handler=self.handle_stderr,
+                                                        output_fd=output_fd,
+                                                        new_process_group=self._is_cancellable)
+        except OSError as ex:
+            self._error = f"Failed to start '{self.cmd}': {ex}"
+            self._finalize_cache_record()
 
     def handle_stdout(self, line: str = "") -> None:
         line = utils.trim_and_convert_to_unicode(line)
+        if self._cache_record:
+            self._cache_record.write_stdout(line)
 
         if self.file:
             self.file.write(line + "\n")
         elif self._is_background:
-            self._postponed_out.append((self.out.log_stdout, line))
+            self._postponed_out.add_stdout(line)
         else:
             self.out.log_stdout(line)
 
     def handle_stderr(self, line: str) -> None:
         line = utils.trim_and_convert_to_unicode(line)
+        if self._cache_record:
+            self._cache_record.write_stderr(line)
         if self.file:
             self.file.write("stderr: " + line + "\n")
         elif self._is_background:
-            self._postponed_out.append((self.out.log_stderr, line))
+            self._postponed_out.add_stderr(line)
         else:
             self.out.log_stderr(line)
 
@@ -258,14 +548,13 @@ class RunningStep(RunningStepBase):
         try:
             text = ""
             try:
-                self.process.wait()
+                if not self._is_restored_from_cache:
+                    exit_code: int = self.process.wait()
+                    self._resource_usage = self.process.resource_usage
+                    if exit_code:
+                        text = f"Process got exit code {exit_code}\n"
             except Exception as e:
-                if isinstance(e, sh.ErrorReturnCode):
-                    text = f"Module sh got exit code {e.exit_code}\n"
-                    if e.stderr:
-                        text += utils.trim_and_convert_to_unicode(e.stderr) + "\n"
-                else:
-                    text = str(e) + '\n'
+                text = str(e) + '\n'
 
             self._handle_postponed_out()
             if text:
@@ -275,6 +564,8 @@ class RunningStep(RunningStepBase):
                 self._error = text
 
         finally:
+            self._postponed_out.close()
+            self._finalize_cache_record()
             tag: Optional[str] = self._get_teamcity_build_tag()
             if tag:
                 self._assign_teamcity_build_tag(tag)
@@ -286,14 +577,50 @@ class RunningStep(RunningStepBase):
     def get_error(self) -> Optional[str]:
         return self._error
 
+    def get_resource_usage(self) -> Optional[process_engine.ResourceUsage]:
+        return self._resource_usage
+
+    def cancel(self) -> None:
+        if self._needs_finalization and not self._is_restored_from_cache:
+            self.process.cancel(self.cancel_grace_period)
+
+    def is_running(self) -> bool:
+        return self._needs_finalization and not self._is_restored_from_cache and self.process.is_alive()
+
+    def add_done_callback(self, callback: Callable[[], None]) -> None:
+        if self._needs_finalization and not self._is_restored_from_cache:
+            self.process.add_done_callback(callback)
+        else:
+            callback()
+
     def collect_artifacts(self) -> None:
         self.artifact_collector.collect_step_artifacts(self.configuration.artifacts,
                                                        self.configuration.report_artifacts)
 
+    def queue_artifacts(self, block: Block) -> None:
+        self.artifact_collector.queue_step_artifacts(self.configuration.name, block, self.configuration.artifacts,
+                                                     self.configuration.report_artifacts)
+
+    def _finalize_cache_record(self) -> None:
+        if not self._cache_record:
+            return
+        record: step_cache.StepRecord = self._cache_record
+        self._cache_record = None
+        if self._error is not None:
+            record.discard()
+            return
+        try:
+            self.step_cache.save(record, self.configuration)
+        except OSError as e:
+            record.discard()
+            self.out.log(f"Failed to store the step result to cache: {e}")
+
     def _handle_postponed_out(self) -> None:
-        for item in self._postponed_out:
-            item[0](item[1])
-        self._postponed_out = []
+        for is_stderr, line in self._postponed_out.replay():
+            if is_stderr:
+                self.out.log_stderr(line)
+            else:
+                self.out.log_stdout(line)
 
     def _get_teamcity_build_tag(self) -> Optional[str]:
         if self.configuration.is_conditional:
@@ -315,6 +642,8 @@ class Launcher(ProjectDirectory, HasOutput, HasStructure, HasErrorState):
     reporter_factory = Dependency(reporter.Reporter)
     server_factory = Dependency(automation_server.AutomationServerForHostingBuild)
     code_report_collector_factory = Dependency(code_report_collector.CodeReportCollector)
+    step_cache_factory = Dependency(step_cache.StepCache)
+    config_cache_factory = Dependency(config_cache.ConfigCache)
 
     @staticmethod
     def define_arguments(argument_parser):
@@ -322,6 +651,8 @@ class Launcher(ProjectDirectory, HasOutput, HasStructure, HasErrorState):
         output_parser.add_argument("--out", "-o", dest="output", choices=["console", "file"],
                                    help="Define whether to print build logs to console or file. "
                                         "Log file names are generated based on the names of build steps. "
+                                        "When logs are written to files, output of the steps is redirected "
+                                        "there directly, so error output is not marked with 'stderr:' prefix. "
                                         "By default, logs are printed to console when the build is launched on "
                                         "Jenkins or TeamCity agent")
 
@@ -330,14 +661,49 @@ class Launcher(ProjectDirectory, HasOutput, HasStructure, HasErrorState):
 
         parser.add_argument("--config", "-cfg", dest="config_path", metavar="CONFIG_PATH",
                             help="Path to project configuration file (example: -cfg=my/project/my_conf.py). "
+                                 "Files with '.json', '.yaml', '.yml' or '.toml' extension are loaded as "
+                                 "declarative configurations instead of being executed. "
                                  "Default is ``.universum.py``")
 
         parser.add_argument("--filter", "-f", dest="step_filter", action='append', metavar="STEP_FILTER",
                             help="Filter steps to execute. A single filter or a set of filters separated by ':'. "
-                                 "Exclude using '!' symbol before filter. "
+                                 "Exclude using '!' symbol before filter. A filter is a substring of step name, "
+                                 "a glob pattern matching the whole name if it contains '*' or '?', "
+                                 "or a regular expression if it is enclosed in slashes ('/.../'). "
                                  "Example: -f='str1:!not str2' OR -f='str1' -f='!not str2'. "
                                  "See online documentation for more details")
 
+        parser.add_argument("--jobs", "-j", dest="jobs", type=int, default=1, metavar="JOBS",
+                            help="Maximum number of build steps executed simultaneously. Steps are considered "
+                                 "independent unless 'depends_on' key is set; 'critical' and conditional steps "
+                                 "are always executed one by one. Default is 1, that means sequential execution")
+        parser.add_argument("--max-background", dest="max_background", type=int, default=0,
+                            metavar="MAX_BACKGROUND",
+                            help="Maximum total 'weight' of background steps running simultaneously. Each step "
+                                 "has weight of 1 unless the 'weight' key is set. Background steps exceeding "
+                                 "the limit are queued and started as soon as running ones finish. "
+                                 "Default is 0, that means no limit")
+        parser.add_argument("--fail-fast", action="store_true", dest="fail_fast",
+                            help="When a critical step fails, terminate all background and parallel steps that "
+                                 "are still running (with SIGTERM, and then SIGKILL, sent to their whole process "
+                                 "groups) and report them as cancelled, instead of waiting for them to finish")
+
+        parser.add_argument("--background-output-buffer", dest="background_output_buffer", type=int, default=1024,
+                            metavar="BACKGROUND_OUTPUT_BUFFER",
+                            help="Output of background and parallel steps is printed only when they are finished. "
+                                 "This parameter sets the size (in kilobytes) of output kept in memory for each "
+                                 "of such steps; output exceeding it is moved to a temporary file. "
+                                 "Default is 1024")
+        parser.add_argument("--compress-background-output", action="store_true", dest="compress_background_output",
+                            help="Compress output of background and parallel steps moved to temporary files. "
+                                 "Reduces disk usage for very verbose steps at the cost of CPU time")
+        parser.add_argument("--no-config-dump", action="store_true", dest="no_config_dump",
+                            help="Do not write the list of all configured steps to 'CONFIGS_DUMP.txt' artifact. "
+                                 "Saves time and disk space for projects with very large configurations")
+        parser.add_argument("--compress-config-dump", action="store_true", dest="compress_config_dump",
+                            help="Write the list of all configured steps to compressed 'CONFIGS_DUMP.txt.gz' "
+                                 "artifact instead of plain text one")
+
         parser.add_hidden_argument("--launcher-output", "-lo", dest="output", choices=["console", "file"],
                                    help="Deprecated option. Please use '--out' instead", is_hidden=True)
         parser.add_hidden_argument("--launcher-config-path", "-lcp", dest="config_path", is_hidden=True,
@@ -364,28 +730,52 @@ class Launcher(ProjectDirectory, HasOutput, HasStructure, HasErrorState):
         self.reporter = self.reporter_factory()
         self.server = self.server_factory()
         self.code_report_collector = self.code_report_collector_factory()
+        self.step_cache = self.step_cache_factory()
+        self.config_cache = self.config_cache_factory()
         self.include_patterns, self.exclude_patterns = get_match_patterns(self.settings.step_filter)
+        self.step_name_matcher: StepNameMatcher = StepNameMatcher([], [])
+        try:
+            self.step_name_matcher = StepNameMatcher(self.include_patterns, self.exclude_patterns)
+        except re.error as e:
+            self.error(f"Step filter contains invalid regular expression: {e}")
+
+        if self.settings.jobs < 1:
+            self.error(f"Number of simultaneously executed steps should be positive, got '{self.settings.jobs}'")
+        self.structure.max_jobs = self.settings.jobs
+        if self.settings.max_background < 0:
+            self.error("Maximum weight of background steps should not be negative, "
+                       f"got '{self.settings.max_background}'")
+        self.structure.max_background = self.settings.max_background
+        self.structure.fail_fast = self.settings.fail_fast
+        if self.settings.background_output_buffer < 0:
+            self.error("Size of background step output buffer should not be negative, "
+                       f"got '{self.settings.background_output_buffer}'")
 
     @make_block("Processing project configs")
     def process_project_configs(self) -> configuration_support.Configuration:
         config_path = utils.parse_path(self.config_path, self.settings.project_root)
         configuration_support.set_project_root(self.settings.project_root)
         configuration_support.set_config_path(self.settings.config_path)
-        config_globals: Dict[str, configuration_support.Configuration] = {}
         sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
         sys.path.append(os.path.join(os.path.dirname(config_path)))
 
         try:
-            with open(config_path, encoding="utf-8") as config_file:
-                exec(config_file.read(), config_globals)  # pylint: disable=exec-used
-            self.source_project_configs = config_globals["configs"]
-            dump_file: TextIO = self.artifact_collector.create_text_file("CONFIGS_DUMP.txt")
-            dump_file.write(self.source_project_configs.dump())
-            dump_file.close()
-            config = self.source_project_configs.filter(check_if_env_set)
-            self.project_config = config.filter(
-                lambda cfg: check_str_match(cfg.name, self.include_patterns, self.exclude_patterns))
-
+            if declarative_config.is_declarative(config_path):
+                self.source_project_configs = declarative_config.load_configuration(config_path)
+            else:
+                self.source_project_configs = self.config_cache.evaluate(config_path)
+            if not self.settings.no_config_dump:
+                with self.artifact_collector.create_text_file("CONFIGS_DUMP.txt",
+                                                              self.settings.compress_config_dump) as dump_file:
+                    self.source_project_configs.write_dump(dump_file)
+            env_checker: EnvConditionChecker = EnvConditionChecker()
+            self.project_config = self.source_project_configs.filter(
+                lambda cfg: env_checker(cfg) and self.step_name_matcher(cfg),
+                lambda cfg, children: env_checker.may_match(cfg, children) and
+                self.step_name_matcher.may_match(cfg, children))
+
+        except declarative_config.ConfigurationError:
+            raise
         except IOError as e:
             text = f"""{e}\n
                 Possible reasons of this error:\n
@@ -416,11 +806,12 @@ class Launcher(ProjectDirectory, HasOutput, HasStructure, HasErrorState):
 
         if self._is_conditional_step_with_children_present(self.project_config):
             raise CriticalCiException("Conditional steps with child configurations are not supported")
+        self._check_step_dependencies(self.source_project_configs)
         self._warn_if_critical_conditional_steps_present(self.project_config)
 
         return self.project_config
 
-    def create_process(self, item: configuration_support.Step) -> RunningStep:
+    def create_process(self, item: configuration_support.Step, run_in_parallel: bool = False) -> RunningStep:
         working_directory = utils.parse_path(utils.strip_path_start(item.directory.rstrip("/")),
                                              self.settings.project_root)
 
@@ -430,8 +821,12 @@ class Launcher(ProjectDirectory, HasOutput, HasStructure, HasErrorState):
             self.out.log("Execution log is redirected to file")
 
         additional_environment = self.api_support.get_environment_settings()
+        is_deferred: bool = item.background or run_in_parallel
         return RunningStep(item, self.out, self.server.add_build_tag, log_file, working_directory,
-                           additional_environment, item.background, self.artifact_collector)
+                           additional_environment, is_deferred, self.artifact_collector,
+                           self.step_cache, cancellable=is_deferred and self.settings.fail_fast,
+                           postponed_out=OutputJournal(self.settings.background_output_buffer * 1024,
+                                                       self.settings.compress_background_output))
 
     def launch_custom_configs(self, custom_configs: configuration_support.Configuration) -> None:
         self.structure.execute_step_structure(custom_configs, self.create_process)
@@ -441,6 +836,33 @@ class Launcher(ProjectDirectory, HasOutput, HasStructure, HasErrorState):
         self.reporter.add_block_to_report(self.structure.get_current_block())
         self.structure.execute_step_structure(self.project_config, self.create_process)
 
+    @staticmethod
+    def _check_step_dependencies(configuration: configuration_support.Configuration) -> None:
+        if not Launcher._has_step_dependencies(configuration):
+            return  # expanding all the steps of large configurations takes longer than filtering them
+        known_names: Set[str] = set()
+
+        def check_recursively(steps: Optional[configuration_support.Configuration]) -> None:
+            if not steps:
+                return
+            for step in steps.all():
+                for name in step.depends_on:
+                    if name not in known_names:
+                        raise CriticalCiException(f"Step '{step.name}' depends on step '{name}', "
+                                                  "that is not defined before it in project configuration")
+                known_names.add(step.name)
+                check_recursively(step.if_succeeded)
+                check_recursively(step.if_failed)
+
+        check_recursively(configuration)
+
+    @staticmethod
+    def _has_step_dependencies(configuration: Optional[configuration_support.Configuration]) -> bool:
+        if not configuration:
+            return False
+        return any(step.depends_on or Launcher._has_step_dependencies(step.if_succeeded) or
+                   Launcher._has_step_dependencies(step.if_failed) for step in configuration.defined_steps())
+
     # TODO: implement support of conditional step with children
     #  https://github.com/Samsung/Universum/issues/709
     @staticmethod
@@ -93,7 +93,7 @@ class BaseOutput(Module):
 
         :param num_str: the string that represents the block number
         :param name: the title of the block
-        :param status: the completion status of the block: "Passed" or "Failed"
+        :param status: the completion status of the block: "Passed", "Failed" or "Cancelled"
         """
         raise NotImplementedError
 
@@ -113,7 +113,7 @@ class BaseOutput(Module):
         :param step_title: the title of the step
         :param has_children: whether the step has children or not. Typically, if step has children, the status is not
             included in the summary.
-        :param status: the status of the step: "Passed", "Failed" or "Skipped"
+        :param status: the status of the step: "Passed", "Failed", "Skipped" or "Cancelled"
         """
         raise NotImplementedError
 
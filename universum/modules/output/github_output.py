@@ -42,8 +42,8 @@ class GithubOutput(TerminalBasedOutput):
             self._block_opened = False
             self._print_lines("::endgroup::")
 
-        if status == "Failed":
-            self._print_lines(f"::error::{num_str} {name} - Failed")
+        if status in ("Failed", "Cancelled"):
+            self._print_lines(f"::error::{num_str} {name} - {status}")
 
     def log_skipped(self, message: str) -> None:
         self._print_lines(message, prefix="::warning::")
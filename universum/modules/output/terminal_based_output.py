@@ -70,8 +70,8 @@ class TerminalBasedOutput(BaseOutput):
         else:
             block_end = " | "
 
-        if status == "Failed":
-            self._stdout(self.block_level * "  ", block_end, Colors.red, "[Failed]", Colors.reset)
+        if status in ("Failed", "Cancelled"):
+            self._stdout(self.block_level * "  ", block_end, Colors.red, f"[{status}]", Colors.reset)
         else:
             self._stdout(self.block_level * "  ", block_end, Colors.green, "[Success]", Colors.reset)
         self._indent()
@@ -7,6 +7,7 @@ from .output import HasOutput
 from .structure_handler import HasStructure, Block
 from ..lib.ci_exception import CiException
 from ..lib.gravity import Dependency
+from ..lib.process_engine import ResourceUsage
 from ..lib.utils import make_block
 
 __all__ = [
@@ -17,6 +18,21 @@ __all__ = [
 ReportMessage = TypedDict('ReportMessage', {'message': str, 'line': int})
 
 
+def _format_resource_usage(usage: ResourceUsage) -> str:
+    """
+    Memory usage of the step can not be measured separately from Universum, that started it, so it is reported
+    as an upper bound
+
+    >>> _format_resource_usage({"wall_time": 61.5, "user_time": 30.25, "system_time": 2, "max_rss_upper_bound": 2048,
+    ...                        "blocks_read": 0, "blocks_written": 16})
+    'wall 61.50 s, CPU 30.25 s user + 2.00 s system, max RSS <= 2.0 MB, I/O 0 blocks read + 16 blocks written'
+    """
+    return f"wall {usage['wall_time']:.2f} s, " \
+           f"CPU {usage['user_time']:.2f} s user + {usage['system_time']:.2f} s system, " \
+           f"max RSS <= {usage['max_rss_upper_bound'] / 1024:.1f} MB, " \
+           f"I/O {usage['blocks_read']} blocks read + {usage['blocks_written']} blocks written"
+
+
 class ReportObserver:
     """
     Abstract base class for reporting modules
@@ -115,6 +131,8 @@ class Reporter(HasOutput, HasStructure):
         if self.settings.only_fails and is_successful:
             text += "  All steps succeeded"
             self.out.log("  All steps succeeded")
+        if not self.settings.only_fails:
+            self._report_resource_usage()
 
         if not self.observers:
             self.out.log("Nowhere to report. Skipping...")
@@ -159,6 +177,16 @@ class Reporter(HasOutput, HasStructure):
             self.structure.fail_current_block()
             return False
 
+    def _report_resource_usage(self) -> None:
+        blocks: List[Block] = [block for step in self.blocks_to_report for block in step.walk()
+                               if block.resource_usage is not None]
+        if not blocks:
+            return
+        self.out.log("Resources used by the executed steps:")
+        for block in blocks:
+            assert block.resource_usage is not None
+            self.out.log(f"  {block.number} {block.name.strip()}: {_format_resource_usage(block.resource_usage)}")
+
     def _report_steps_recursively(self, block: Block, text: str, indent: str) -> Tuple[str, bool]:
         has_children: bool = bool(block.children)
         block_title: str = block.number + ' ' + block.name
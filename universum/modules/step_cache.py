@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable, ClassVar, Dict, List, Optional, TextIO, Tuple
+
+import glob2
+
+from .output import HasOutput
+from .project_directory import ProjectDirectory
+from ..configuration_support import Step
+from ..lib import utils
+
+__all__ = [
+    "StepCache",
+    "StepRecord"
+]
+
+
+def _hash_path(digest, path: str, root: str) -> None:
+    if os.path.isdir(path):
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for name in sorted(filenames):
+                _hash_path(digest, os.path.join(dirpath, name), root)
+        return
+
+    digest.update(os.path.relpath(path, root).encode("utf-8", "surrogateescape") + b"\0")
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    except OSError:  # broken symlinks, sockets, etc. only contribute their names
+        pass
+    digest.update(b"\0")
+
+
+def _get_size(path: str) -> int:
+    result: int = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                result += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return result
+
+
+class StepRecord:
+    """
+    Output of the step being executed, that is going to be stored to cache if the step succeeds
+    """
+
+    def __init__(self, key: str, directory: str) -> None:
+        self.key: str = key
+        self.directory: str = directory
+        self.log: TextIO = open(os.path.join(directory, "log.txt"), "w",  # pylint: disable = consider-using-with
+                                encoding="utf-8")
+
+    def write_stdout(self, line: str) -> None:
+        self.log.write("o " + line + "\n")
+
+    def write_stderr(self, line: str) -> None:
+        self.log.write("e " + line + "\n")
+
+    def discard(self) -> None:
+        self.log.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class StepCache(ProjectDirectory, HasOutput):
+    # temporary directories of the steps, that are not finished for so long, are left by interrupted runs
+    stale_record_age: ClassVar[float] = 24 * 60 * 60  # seconds
+
+    @staticmethod
+    def define_arguments(argument_parser):
+        parser = argument_parser.get_or_create_group("Configuration execution",
+                                                     "External command launching and reporting parameters")
+
+        parser.add_argument("--step-cache-dir", dest="step_cache_dir", metavar="STEP_CACHE_DIR",
+                            help="Directory to store results of the steps with 'inputs' key set. If a step with "
+                                 "the same command, environment, directory and contents of input files was "
+                                 "already executed successfully, its log and artifacts are restored from this "
+                                 "directory instead of executing it again. By default, results are not cached")
+        parser.add_argument("--step-cache-size", dest="step_cache_size", type=int, default=1024,
+                            metavar="STEP_CACHE_SIZE",
+                            help="Maximum size of the step cache directory in megabytes. When exceeded, "
+                                 "least recently used results are removed. Default is 1024")
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.cache_dir: Optional[str] = None
+        if self.settings.step_cache_dir:
+            self.cache_dir = utils.parse_path(self.settings.step_cache_dir, os.getcwd())
+        # last usage time and size of each cache entry, by entry name; read from the cache directory once per run
+        self._entries: Optional[Dict[str, Tuple[float, int]]] = None
+        self._total_size: int = 0
+
+    def calculate_key(self, step: Step) -> Optional[str]:
+        """
+        :param step: step to be executed
+        :return: hash of everything that affects the step result, or None if the step should not be cached
+        """
+        if not self.cache_dir or not step.inputs:
+            return None
+
+        digest = hashlib.sha256()
+        description: Dict = {"command": step.command,
+                             "environment": sorted(step.environment.items()),
+                             "directory": step.directory,
+                             "artifacts": step.artifacts,
+                             "report_artifacts": step.report_artifacts,
+                             "inputs": step.inputs}
+        digest.update(json.dumps(description).encode("utf-8"))
+        for pattern in step.inputs:
+            for path in sorted(glob2.glob(utils.parse_path(pattern, self.settings.project_root))):
+                _hash_path(digest, path, self.settings.project_root)
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        assert self.cache_dir
+        return os.path.join(self.cache_dir, key)
+
+    def restore(self, key: str, stdout_handler: Callable[[str], None], stderr_handler: Callable[[str], None]) -> bool:
+        """
+        Replay the stored log of the step and restore its artifacts to the project directory
+        :return: True if the result was found in cache, False otherwise
+        """
+        entry: str = self._entry_path(key)
+        if not os.path.isdir(entry):
+            return False
+        try:
+            self._restore_artifacts(entry)
+            with open(os.path.join(entry, "log.txt"), encoding="utf-8") as log:
+                self.out.log("Identical step was already executed successfully, the result is restored from cache")
+                for line in log:
+                    handler = stderr_handler if line.startswith("e ") else stdout_handler
+                    handler(line[2:].rstrip("\n"))
+        except (OSError, ValueError) as e:  # UnicodeDecodeError is also a ValueError
+            self.out.log(f"Failed to restore the step result from cache, so the step is executed: {e}")
+            self._remove_entry(key)
+            return False
+
+        now: float = time.time()
+        os.utime(entry, (now, now))  # mark entry as recently used
+        if self._entries is not None and key in self._entries:
+            self._entries[key] = (now, self._entries[key][1])
+        return True
+
+    def _restore_artifacts(self, entry: str) -> None:
+        with open(os.path.join(entry, "artifacts.json"), encoding="utf-8") as f:
+            artifacts: List[str] = json.load(f)
+        for index, relative_path in enumerate(artifacts):
+            source: str = os.path.join(entry, "artifacts", str(index))
+            destination: str = os.path.join(self.settings.project_root, relative_path)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            if os.path.isdir(source):
+                shutil.copytree(source, destination, symlinks=True, dirs_exist_ok=True)
+            else:
+                shutil.copy2(source, destination)
+
+    def start_recording(self, key: str) -> StepRecord:
+        assert self.cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return StepRecord(key, tempfile.mkdtemp(prefix="." + key, dir=self.cache_dir))
+
+    def save(self, record: StepRecord, step: Step) -> None:
+        record.log.close()
+        artifacts: List[str] = []
+        for pattern in (step.artifacts, step.report_artifacts):
+            if not pattern:
+                continue
+            for path in sorted(glob2.glob(utils.parse_path(pattern, self.settings.project_root))):
+                relative_path: str = os.path.relpath(path, self.settings.project_root)
+                if relative_path.startswith(os.pardir) or relative_path in artifacts:
+                    continue  # only files inside project can be restored
+                destination: str = os.path.join(record.directory, "artifacts", str(len(artifacts)))
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                if os.path.isdir(path):
+                    shutil.copytree(path, destination, symlinks=True)
+                else:
+                    shutil.copy2(path, destination)
+                artifacts.append(relative_path)
+
+        with open(os.path.join(record.directory, "artifacts.json"), "w", encoding="utf-8") as f:
+            json.dump(artifacts, f)
+        size: int = _get_size(record.directory)
+        with open(os.path.join(record.directory, "size"), "w", encoding="utf-8") as f:
+            f.write(str(size))
+
+        entries: Dict[str, Tuple[float, int]] = self._get_entries()
+        self._remove_entry(record.key)
+        os.replace(record.directory, self._entry_path(record.key))
+        entries[record.key] = (time.time(), size)
+        self._total_size += size
+        self._evict()
+
+    def _get_entries(self) -> Dict[str, Tuple[float, int]]:
+        """
+        Scan the cache directory on first call; temporary directories left by interrupted runs are removed meanwhile
+        """
+        assert self.cache_dir
+        if self._entries is not None:
+            return self._entries
+        self._entries = {}
+        now: float = time.time()
+        for entry in os.scandir(self.cache_dir):
+            try:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                last_used: float = entry.stat().st_mtime
+                if entry.name.startswith("."):
+                    if now - last_used > self.stale_record_age:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                    continue
+                size: int
+                try:
+                    with open(os.path.join(entry.path, "size"), encoding="utf-8") as f:
+                        size = int(f.read())
+                except (OSError, ValueError):
+                    size = _get_size(entry.path)
+            except OSError:  # removed by another run meanwhile
+                continue
+            self._entries[entry.name] = (last_used, size)
+            self._total_size += size
+        return self._entries
+
+    def _remove_entry(self, key: str) -> None:
+        shutil.rmtree(self._entry_path(key), ignore_errors=True)
+        if self._entries is not None and key in self._entries:
+            self._total_size -= self._entries.pop(key)[1]
+
+    def _evict(self) -> None:
+        limit: int = self.settings.step_cache_size * 1024 * 1024
+        if self._total_size <= limit:
+            return
+        entries: Dict[str, Tuple[float, int]] = self._get_entries()
+        for key in sorted(entries, key=lambda name: entries[name][0]):  # least recently used first
+            if self._total_size <= limit:
+                break
+            self._remove_entry(key)
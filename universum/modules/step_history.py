@@ -0,0 +1,92 @@
+import json
+import os
+from typing import ClassVar, Dict, Optional
+
+from .output import HasOutput
+from ..lib import utils
+
+__all__ = [
+    "StepHistory",
+    "format_duration"
+]
+
+
+def format_duration(seconds: float) -> str:
+    """
+    >>> format_duration(5.4)
+    '5s'
+    >>> format_duration(80)
+    '1m 20s'
+    >>> format_duration(3725)
+    '1h 02m'
+    """
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02}m"
+
+
+class StepHistory(HasOutput):
+    """
+    Durations of the steps from previous runs, stored in a local file and keyed by step name
+    """
+
+    max_entries: ClassVar[int] = 10000
+
+    @staticmethod
+    def define_arguments(argument_parser):
+        parser = argument_parser.get_or_create_group("Configuration execution",
+                                                     "External command launching and reporting parameters")
+
+        parser.add_argument("--step-history", dest="step_history", metavar="STEP_HISTORY",
+                            help="File to store durations of executed steps to. If durations of previous runs "
+                                 "are known, background and parallel steps, that do not depend on each other, "
+                                 "are started in order of decreasing expected duration, and estimated time "
+                                 "left is shown for each step. Steps executed for the first time are "
+                                 "considered the longest ones")
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.file_name: Optional[str] = None
+        self.durations: Dict[str, float] = {}
+        if self.settings.step_history:
+            self.file_name = utils.parse_path(self.settings.step_history, os.getcwd())
+            self._load()
+
+    def _load(self) -> None:
+        assert self.file_name
+        if not os.path.exists(self.file_name):
+            return
+        try:
+            with open(self.file_name, encoding="utf-8") as f:
+                data = json.load(f)
+            self.durations = {str(name): float(duration) for name, duration in data.items()}
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            self.out.log(f"Step history file '{self.file_name}' is ignored, as it could not be read: {e}")
+
+    def is_enabled(self) -> bool:
+        return self.file_name is not None
+
+    def get(self, name: str) -> Optional[float]:
+        return self.durations.get(name)
+
+    def record(self, name: str, duration: float) -> None:
+        if not self.is_enabled():
+            return
+        # Recently executed steps are kept at the end, so that the oldest ones are dropped first
+        self.durations.pop(name, None)
+        self.durations[name] = round(duration, 3)
+
+    def save(self) -> None:
+        if not self.file_name:
+            return
+        names = list(self.durations)
+        for name in names[:max(0, len(names) - self.max_entries)]:
+            del self.durations[name]
+        try:
+            with open(self.file_name, "w", encoding="utf-8") as f:
+                json.dump(self.durations, f, indent=1)
+        except OSError as e:
+            self.out.log(f"Failed to save step history: {e}")
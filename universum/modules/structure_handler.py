@@ -1,15 +1,20 @@
 from __future__ import annotations
 
 import contextlib
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Callable, ClassVar, List, Optional, TypeVar, Generator
+from typing import Callable, ClassVar, Dict, Iterator, List, Optional, Set, Tuple, TypeVar, Generator
 
 from typing_extensions import TypedDict
 
 from .output import HasOutput
+from .step_history import StepHistory, format_duration
+from .tracer import Tracer
 from ..configuration_support import Step, Configuration
 from ..lib.ci_exception import SilentAbortException, CriticalCiException
 from ..lib.gravity import Dependency, Module
+from ..lib.process_engine import ResourceUsage
 
 __all__ = [
     "HasStructure",
@@ -45,12 +50,15 @@ class Block:
     True
     >>> b2 is b4.parent
     True
+    >>> [str(b) for b in b2.walk()]
+    ['1. Build Android', '1.1. Run tests - Success']
     """
 
     def __init__(self, name: str, parent: Optional[Block] = None) -> None:
         self.name: str = name
         self.status: str = "Success"
         self.children: List[Block] = []
+        self.resource_usage: Optional[ResourceUsage] = None
 
         self.parent: Optional[Block] = parent
         self.number: str = ''
@@ -65,6 +73,11 @@ class Block:
     def is_successful(self) -> bool:
         return self.status == "Success"
 
+    def walk(self) -> Iterator[Block]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
 
 class BackgroundStepInfo(TypedDict):
     name: str
@@ -72,6 +85,12 @@ class BackgroundStepInfo(TypedDict):
     process: RunningStepBase
     is_critical: bool
     has_artifacts: bool
+    start_time: float
+    weight: int
+
+
+class ParallelStepInfo(BackgroundStepInfo):
+    index: int
 
 
 class RunningStepBase(ABC):
@@ -88,41 +107,90 @@ class RunningStepBase(ABC):
     def get_error(self) -> Optional[str]:
         pass
 
+    @abstractmethod
+    def is_running(self) -> bool:
+        pass
+
+    @abstractmethod
+    def cancel(self) -> None:
+        pass
+
     @abstractmethod
     def collect_artifacts(self) -> None:
         pass
 
+    @abstractmethod
+    def queue_artifacts(self, block: Block) -> None:
+        """
+        Start collecting step artifacts in background; collection errors are to be reported to the passed block
+        """
+
+    def get_resource_usage(self) -> Optional[ResourceUsage]:
+        """
+        :return: resources used by the finalized step process, or None if no process was executed
+        """
+        return None
+
+    def add_done_callback(self, callback: Callable[[], None]) -> None:
+        """
+        Call the function as soon as the started step is finished, possibly from another thread;
+        the function is called at once, if the step is not running
+        """
+        callback()
+
 
 class StructureHandler(HasOutput):
+    tracer_factory: ClassVar = Dependency(Tracer)
+    step_history_factory: ClassVar = Dependency(StepHistory)
+
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
-        self.current_block: Optional[Block] = Block("Universum")
+        self.tracer: Tracer = self.tracer_factory()
+        self.step_history: StepHistory = self.step_history_factory()
+        self.root_block: Block = Block("Universum")
+        self.current_block: Optional[Block] = self.root_block
         self.configs_current_number: int = 0
         self.configs_total_count: int = 0
         self.active_background_steps: List[BackgroundStepInfo] = []
         self.step_num_len: int = 0
         self.group_numbering: str = ""
+        self.max_jobs: int = 1
+        self.max_background: int = 0
+        self.queued_background_steps: List[BackgroundStepInfo] = []
+        self.fail_fast: bool = False
+        self.active_parallel_steps: List[ParallelStepInfo] = []
+        self.parallel_steps_started: int = 0
+        self.failed_parallel_steps: List[int] = []
+        self.planned_step_names: Set[str] = set()
+        self.step_results: Dict[str, bool] = {}
+        self.expected_time_left: float = 0.0
+        self.async_artifacts: bool = False
+        # is set whenever any of the background or parallel steps finishes
+        self.step_finished: threading.Event = threading.Event()
 
     def open_block(self, name: str) -> None:
         new_block = Block(name, self.current_block)
         self.current_block = new_block
 
         self.out.open_block(new_block.number, name)
+        self.tracer.begin_block(new_block.number + " " + name)
 
     def close_block(self) -> None:
         if self.current_block is not None:
             block: Block = self.current_block
             self.current_block = self.current_block.parent
             self.out.close_block(block.number, block.name, block.status)
+            self.tracer.end_block(block.number + " " + block.name, block.status, dict(block.resource_usage or {}))
 
     def log_critical_block_failure(self) -> None:
         self.out.log_skipped("Critical step failed. All further configurations will be skipped")
 
-    def log_skipped_block(self, name):
+    def log_skipped_block(self, name, reason: str = "critical step failure"):
         new_skipped_block = Block(name, self.current_block)
         new_skipped_block.status = "Skipped"
 
-        self.out.log_skipped(new_skipped_block.number + name + " skipped because of critical step failure")
+        self.out.log_skipped(new_skipped_block.number + name + " skipped because of " + reason)
+        self.tracer.mark(new_skipped_block.number + " " + name, reason)
 
     def fail_current_block(self, error: str = ""):
         block: Block = self.get_current_block()
@@ -134,6 +202,10 @@ class StructureHandler(HasOutput):
         block.status = "Failed"
         self.out.report_build_problem(block.name + " " + block.status)
 
+    def cancel_block(self, block: Block) -> None:
+        block.status = "Cancelled"
+        self.out.report_build_problem(block.name + " " + block.status)
+
     def get_current_block(self):
         return self.current_block
 
@@ -159,26 +231,111 @@ class StructureHandler(HasOutput):
             self.close_block()
 
     def execute_one_step(self, configuration: Step,
-                         step_executor: Callable[[Step], RunningStepBase]) -> RunningStepBase:
-        process: RunningStepBase = step_executor(configuration)
+                         step_executor: Callable[[Step, bool], RunningStepBase],
+                         run_in_parallel: bool = False) -> RunningStepBase:
+        process: RunningStepBase = step_executor(configuration, run_in_parallel)
+        has_artifacts: bool = bool(configuration.artifacts) or bool(configuration.report_artifacts)
+        weight: int = max(configuration.weight, 1)
+        if configuration.background and (self.queued_background_steps or not self._can_start_background(weight)):
+            self.out.log("This step is queued, as the limit of simultaneously running background steps is reached")
+            self.queued_background_steps.append({'name': configuration.name,
+                                                 'block': self.get_current_block(),
+                                                 'process': process,
+                                                 'is_critical': configuration.critical,
+                                                 'has_artifacts': has_artifacts,
+                                                 'start_time': 0.0,
+                                                 'weight': weight})
+            return process
+
+        start_time: float = time.monotonic()
         process.start()
         if process.get_error() is not None:
             return process
-        if not configuration.background:
+        if not configuration.background and not run_in_parallel:
+            self._wait_for_foreground_step(process)
             process.finalize()
+            self._record_resource_usage(self.get_current_block(), configuration.name, process)
+            return process
+        process.add_done_callback(self.step_finished.set)
+        if run_in_parallel:
+            self.out.log("This step is executed in parallel with other steps")
+            self.active_parallel_steps.append({'name': configuration.name,
+                                               'block': self.get_current_block(),
+                                               'process': process,
+                                               'is_critical': configuration.critical,
+                                               'has_artifacts': has_artifacts,
+                                               'start_time': start_time,
+                                               'weight': weight,
+                                               'index': self.parallel_steps_started})
+            self.parallel_steps_started += 1
             return process
         self.out.log("This step is marked to be executed in background")
-        has_artifacts: bool = bool(configuration.artifacts) or bool(configuration.report_artifacts)
         self.active_background_steps.append({'name': configuration.name,
                                              'block': self.get_current_block(),
                                              'process': process,
                                              'is_critical': configuration.critical,
-                                             'has_artifacts': has_artifacts})
+                                             'has_artifacts': has_artifacts,
+                                             'start_time': start_time,
+                                             'weight': weight})
         return process
 
+    def _can_start_background(self, weight: int) -> bool:
+        if not self.max_background:
+            return True
+        running_weight: int = sum(item['weight'] for item in self.active_background_steps
+                                  if item['process'].is_running())
+        # A step heavier than the limit is still started when nothing else is running
+        return not running_weight or running_weight + weight <= self.max_background
+
+    def _start_queued_background_steps(self) -> None:
+        while self.queued_background_steps and self._can_start_background(self.queued_background_steps[0]['weight']):
+            item: BackgroundStepInfo = self.queued_background_steps.pop(0)
+            # No block is opened, as the steps can also be started while a foreground step is running
+            self.out.log(f"Starting queued background step '{item['name']}'")
+            item['start_time'] = time.monotonic()
+            item['process'].start()
+            error: Optional[str] = item['process'].get_error()
+            if error is None:
+                item['process'].add_done_callback(self.step_finished.set)
+                self.active_background_steps.append(item)
+            else:
+                self.fail_block(item['block'], error)
+                self._register_step_result(item['name'], False)
+
+    def _wait_for_foreground_step(self, process: RunningStepBase) -> None:
+        """
+        While the foreground step is running, start the queued background steps as soon as the running ones finish
+        """
+        if not self.queued_background_steps:
+            return
+        process.add_done_callback(self.step_finished.set)
+        while process.is_running() and self.queued_background_steps:
+            self._wait_for_finished_step()
+            self._start_queued_background_steps()
+
+    def _wait_for_finished_step(self) -> None:
+        """
+        Block until some of the background or parallel steps finishes, unless it has already finished
+        since the previous call; the callers are to check which of the steps are still running afterwards
+        """
+        self.step_finished.wait()
+        self.step_finished.clear()
+
+    def _start_all_queued_background_steps(self) -> None:
+        self._start_queued_background_steps()
+        while self.queued_background_steps:
+            self._wait_for_finished_step()
+            self._start_queued_background_steps()
+
+    def _record_resource_usage(self, block: Block, name: str, process: RunningStepBase) -> None:
+        block.resource_usage = process.get_resource_usage()
+        if block.resource_usage is not None:
+            self.step_history.record(name, block.resource_usage['wall_time'])
+
     def finalize_background_step(self, background_step: BackgroundStepInfo) -> bool:
         process: RunningStepBase = background_step['process']
         process.finalize()
+        self._record_resource_usage(background_step['block'], background_step['name'], process)
         error: Optional[str] = process.get_error()
         if error is not None:
             self.fail_block(background_step['block'], error)
@@ -187,6 +344,206 @@ class StructureHandler(HasOutput):
 
         return True
 
+    def _finish_deferred_step(self, item: BackgroundStepInfo, kind: str) -> bool:
+        """
+        Wait for the background or parallel step to finish, report its result and collect its artifacts.
+        :param item: Information on the step, stored when the step was started.
+        :param kind: Kind of the step ("background" or "parallel") to be mentioned in logs.
+        :return: True if the step was successful, False otherwise.
+        """
+        result: bool = False
+        with self.block(block_name=f"Waiting for {kind} step '{item['name']}' to finish...", pass_errors=True):
+            result = self.finalize_background_step(item)
+            self._trace_deferred_step(item)
+            if not result and item['is_critical']:
+                self.out.log_skipped(f"The {kind} step '{item['name']}' failed, and as it is critical, "
+                                     "all further steps will be skipped")
+                self._cancel_deferred_steps()
+        if item['has_artifacts']:
+            self._collect_artifacts(item['name'], item['block'], item['process'])
+
+        self._register_step_result(item['name'], result)
+        return result
+
+    def _collect_artifacts(self, name: str, block: Block, process: RunningStepBase) -> None:
+        if self.async_artifacts:
+            process.queue_artifacts(block)
+            return
+        with self.block(block_name=f"Collecting artifacts for the '{name}' step", pass_errors=False):
+            process.collect_artifacts()
+
+    def _cancel_deferred_steps(self) -> None:
+        """
+        In fail-fast mode, stop all running and queued background and parallel steps, as their results
+        no longer matter after a critical failure. Steps that have already finished are reported as usual.
+        """
+        if not self.fail_fast:
+            return
+        to_cancel: List[BackgroundStepInfo] = list(self.queued_background_steps)
+        to_cancel.extend(item for item in self.active_background_steps if item['process'].is_running())
+        to_cancel.extend(item for item in self.active_parallel_steps if item['process'].is_running())
+        if not to_cancel:
+            return
+
+        with self.block(block_name="Cancelling background and parallel steps", pass_errors=False):
+            for item in to_cancel:
+                # The step block is already closed, so the cancellation is reported in a separate one
+                with self.block(block_name=f"Cancelling step '{item['name']}'", pass_errors=False):
+                    self.cancel_block(item['block'])
+                    self.get_current_block().status = "Cancelled"
+                    if item in self.queued_background_steps:
+                        self.queued_background_steps.remove(item)
+                        self.out.log(f"Step '{item['name']}' is cancelled before start")
+                    else:
+                        item['process'].cancel()
+                        item['process'].finalize()
+                        self._trace_deferred_step(item)
+                        self.out.log(f"Step '{item['name']}' is cancelled")
+                if item in self.active_background_steps:
+                    self.active_background_steps.remove(item)
+                for parallel_step in [step for step in self.active_parallel_steps if step is item]:
+                    self.active_parallel_steps.remove(parallel_step)
+                    self.failed_parallel_steps.append(parallel_step['index'])
+                self._register_step_result(item['name'], False)
+
+    def _trace_deferred_step(self, item: BackgroundStepInfo) -> None:
+        block: Block = item['block']
+        finish_time: float = time.monotonic()
+        if block.resource_usage is not None:  # the step could finish long before it is reported
+            finish_time = min(finish_time, item['start_time'] + block.resource_usage['wall_time'])
+        self.tracer.add_deferred_step(block.number + " " + block.name, item['start_time'], finish_time, block.status,
+                                      dict(block.resource_usage or {}))
+
+    def _finish_parallel_step(self, item: ParallelStepInfo) -> bool:
+        self.active_parallel_steps.remove(item)
+        result: bool = self._finish_deferred_step(item, "parallel")
+        if not result:
+            self.failed_parallel_steps.append(item['index'])
+        return result
+
+    def _finish_completed_parallel_steps(self) -> None:
+        for item in [step for step in self.active_parallel_steps if not step['process'].is_running()]:
+            if item in self.active_parallel_steps:  # could be cancelled because of previous one failure
+                self._finish_parallel_step(item)
+
+    def _wait_for_free_job_slot(self) -> None:
+        self._finish_completed_parallel_steps()
+        while len(self.active_parallel_steps) >= self.max_jobs:
+            self._wait_for_finished_step()
+            self._start_queued_background_steps()
+            self._finish_completed_parallel_steps()
+
+    def _register_step_result(self, name: str, is_successful: bool) -> None:
+        self.step_results[name] = self.step_results.get(name, True) and is_successful
+
+    def _finish_dependencies(self, configuration: Step) -> bool:
+        """
+        Wait for all the running steps, that the passed step depends on, to finish.
+        :param configuration: Step to check dependencies of.
+        :return: False if some critical background dependency failed, True otherwise.
+        """
+        result: bool = True
+        if any(step['name'] in configuration.depends_on for step in self.queued_background_steps):
+            self._start_all_queued_background_steps()
+        for name in configuration.depends_on:
+            for parallel_step in [step for step in self.active_parallel_steps if step['name'] == name]:
+                if parallel_step in self.active_parallel_steps:
+                    self._finish_parallel_step(parallel_step)
+            for background_step in [step for step in self.active_background_steps if step['name'] == name]:
+                if background_step not in self.active_background_steps:
+                    continue  # cancelled because of critical failure of previous one
+                self.active_background_steps.remove(background_step)
+                if not self._finish_deferred_step(background_step, "background") and background_step['is_critical']:
+                    result = False
+        return result
+
+    def _is_waiting_for_dependencies(self, configuration: Step, postponed: List[Tuple[Step, bool]]) -> bool:
+        """
+        :param postponed: steps, that are postponed before the passed one and are not started yet
+        :return: True if some of the steps, that the passed step depends on, are not finished yet
+        """
+        names: Set[str] = set(configuration.depends_on)
+        if any(step.name in names for step, _ in postponed):
+            return True
+        if any(step['name'] in names for step in self.queued_background_steps):
+            return True
+        return any(step['name'] in names and step['process'].is_running()
+                   for step in [*self.active_parallel_steps, *self.active_background_steps])
+
+    def _process_postponed_steps(self, postponed: List[Tuple[Step, bool]], step_executor: Callable,
+                                 wait: bool) -> bool:
+        """
+        Process postponed steps, whose dependencies are finished, in the order they are defined in configuration.
+        :param postponed: pairs of postponed step and its skip_execution flag; processed steps are removed from it.
+        :param step_executor: Function that executes one step.
+        :param wait: If True, wait for dependencies of all the postponed steps to finish and process all of them.
+        :return: False if some of the processed steps failed, True otherwise.
+        """
+        result: bool = True
+        while postponed:
+            ready: Optional[int] = next((index for index, (step, _) in enumerate(postponed)
+                                         if not self._is_waiting_for_dependencies(step, postponed[:index])), None)
+            if ready is None:
+                if not wait:
+                    break
+                self._wait_for_finished_step()
+                self._start_queued_background_steps()
+                continue
+            merged_item, skip_execution = postponed.pop(ready)
+            if not self._finish_dependencies(merged_item):
+                skip_execution = True
+            if not self.process_one_step(merged_item, step_executor, skip_execution):
+                result = False
+        return result
+
+    def _get_failed_dependency(self, configuration: Step) -> Optional[str]:
+        for name in configuration.depends_on:
+            # Dependencies excluded from current run (e.g. by filters) are not considered
+            if name in self.planned_step_names and not self.step_results.get(name, False):
+                return name
+        return None
+
+    def _get_expected_duration(self, item: Step) -> float:
+        # Background steps do not affect total execution time
+        return 0.0 if item.background else self.step_history.get(item.name) or 0.0
+
+    def _get_eta(self, item: Step) -> str:
+        if not self.step_history.is_enabled() or not self.expected_time_left:
+            return ""
+        time_left: float = self.expected_time_left / max(self.max_jobs, 1)
+        self.expected_time_left = max(self.expected_time_left - self._get_expected_duration(item), 0.0)
+        return f", ETA {format_duration(time_left)}"
+
+    def _is_reorderable(self, item: Step) -> bool:
+        # Only steps, that are started without waiting for previous ones to finish, may be reordered
+        return not item.children and not item.is_conditional and not item.critical and \
+            not item.finish_background and not item.depends_on and (item.background or self.max_jobs > 1)
+
+    def _get_sort_key(self, item: Tuple[Step, Step]) -> float:
+        duration: Optional[float] = self.step_history.get(item[1].name)
+        return -duration if duration is not None else float("-inf")  # new steps are considered the longest
+
+    def _schedule_children(self, parent: Step, children: Configuration) -> List[Tuple[Step, Step]]:
+        """
+        Merge child steps with parent, and reorder independent background and parallel steps so that
+        the longest ones (according to the step history) are started first.
+        :return: list of (child step, merged step) pairs in execution order.
+        """
+        items: List[Tuple[Step, Step]] = [(child, parent + child) for child in children.configs]
+        if not self.step_history.is_enabled():
+            return items
+        result: List[Tuple[Step, Step]] = []
+        segment: List[Tuple[Step, Step]] = []
+        for item in items:
+            if self._is_reorderable(item[1]):
+                segment.append(item)
+                continue
+            result.extend(sorted(segment, key=self._get_sort_key))
+            segment = []
+            result.append(item)
+        result.extend(sorted(segment, key=self._get_sort_key))
+        return result
+
     def process_one_step(self, merged_item: Step, step_executor: Callable, skip_execution: bool) -> bool:
         """
         Process one step: either execute it or skip if the skip_execution flag is set.
@@ -195,27 +552,47 @@ class StructureHandler(HasOutput):
         :param skip_execution: If True, the step will be skipped, but reported to the output.
         :return: True if step was successfully executed, False otherwise. Skipping is considered success.
         """
+        self._start_queued_background_steps()
         self.configs_current_number += 1
-        numbering: str = f" [ {self.configs_current_number:>{self.step_num_len}}/{self.configs_total_count} ] "
+        eta: str = self._get_eta(merged_item)
+        numbering: str = f" [ {self.configs_current_number:>{self.step_num_len}}/{self.configs_total_count}{eta} ] "
         step_label: str = numbering + merged_item.name
 
         if skip_execution:
             self.log_skipped_block(numbering + "'" + merged_item.name + "'")
+            self._register_step_result(merged_item.name, False)
             return True
 
+        failed_dependency: Optional[str] = self._get_failed_dependency(merged_item)
+        if failed_dependency is not None:
+            self.log_skipped_block(numbering + "'" + merged_item.name + "'",
+                                   reason=f"unsuccessful step '{failed_dependency}' it depends on")
+            self._register_step_result(merged_item.name, False)
+            return True
+
+        # Critical and conditional steps affect further steps execution, so they are never executed in parallel
+        run_in_parallel: bool = self.max_jobs > 1 and not merged_item.background and \
+            not merged_item.critical and not merged_item.is_conditional
+        if run_in_parallel:
+            self._wait_for_free_job_slot()
+
         process: Optional[RunningStepBase] = None
         error: Optional[str] = None
+        step_block: Optional[Block] = None
         # Here pass_errors=False, because any exception while executing build step
         # can be step-related and may not affect other steps
         with self.block(block_name=step_label, pass_errors=False):
-            process = self.execute_one_step(merged_item, step_executor)
+            step_block = self.get_current_block()
+            process = self.execute_one_step(merged_item, step_executor, run_in_parallel)
             error = process.get_error()
             if error and not merged_item.is_conditional:
                 self.fail_current_block(error)
+        is_deferred: bool = merged_item.background or run_in_parallel
+        if error is not None or not is_deferred:
+            self._register_step_result(merged_item.name, error is None)
         has_artifacts: bool = bool(merged_item.artifacts) or bool(merged_item.report_artifacts)
-        if not merged_item.background and has_artifacts:
-            with self.block(block_name=f"Collecting artifacts for the '{merged_item.name}' step", pass_errors=False):
-                process.collect_artifacts()
+        if not is_deferred and has_artifacts and process is not None and step_block is not None:
+            self._collect_artifacts(merged_item.name, step_block, process)
 
         return error is None
 
@@ -233,18 +610,33 @@ class StructureHandler(HasOutput):
         # step_executor is [[Step], Step], but referring to Step creates circular dependency
 
         some_step_failed: bool = False
-        for child in children.configs:
-            merged_item: Step = parent + child
+        # Steps waiting for their dependencies, that do not block the following independent steps
+        postponed: List[Tuple[Step, bool]] = []
+        merged_item: Step
+        for child, merged_item in self._schedule_children(parent, children):
+            # Critical and conditional steps, as well as ones finishing background steps, are executed
+            # only after all the preceding steps are started, same as without dependencies
+            is_barrier: bool = merged_item.critical or child.is_conditional or merged_item.finish_background
+            if not self._process_postponed_steps(postponed, step_executor, wait=is_barrier):
+                some_step_failed = True
+
             current_step_failed: bool
             if child.children:
                 step_label: str = self.group_numbering + merged_item.name
+                first_parallel_step: int = self.parallel_steps_started
 
                 # Here pass_errors=True, because any exception outside executing build step
                 # is not step-related and should stop script executing
                 with self.block(block_name=step_label, pass_errors=True):
                     current_step_failed = not self.execute_steps_recursively(merged_item, child.children, step_executor,
                                                                              skip_execution)
+                if child.critical and self.parallel_steps_started > first_parallel_step:
+                    # Result of the critical group is unknown until all its parallel steps are finished
+                    if not self.report_parallel_steps(since=first_parallel_step):
+                        current_step_failed = True
             elif child.is_conditional:
+                if merged_item.depends_on and not self._finish_dependencies(merged_item):
+                    skip_execution = True
                 conditional_step_succeeded: bool = self.process_one_step(merged_item, step_executor,
                                                                          skip_execution=False)
                 step_to_execute: Optional[Configuration] = merged_item.if_succeeded if conditional_step_succeeded \
@@ -256,10 +648,19 @@ class StructureHandler(HasOutput):
                                                    skip_execution=False)
                 current_step_failed = False  # conditional step should be always successful
             else:
-                if merged_item.finish_background and self.active_background_steps:
+                if merged_item.finish_background and (self.active_background_steps or self.active_parallel_steps or
+                                                      self.queued_background_steps):
                     self.out.log("All ongoing background steps should be finished before next step execution")
+                    self.report_parallel_steps()  # parallel steps are never critical
                     if not self.report_background_steps():
                         skip_execution = True
+                if merged_item.depends_on and not merged_item.critical and \
+                        self._is_waiting_for_dependencies(merged_item, postponed):
+                    self.out.log(f"Step '{merged_item.name}' is postponed until the steps it depends on are finished")
+                    postponed.append((merged_item, skip_execution))
+                    continue
+                if merged_item.depends_on and not self._finish_dependencies(merged_item):
+                    skip_execution = True
                 current_step_failed = not self.process_one_step(merged_item, step_executor, skip_execution)
 
             if current_step_failed:
@@ -267,8 +668,12 @@ class StructureHandler(HasOutput):
 
                 if child.critical:
                     self.log_critical_block_failure()
+                    self._cancel_deferred_steps()
                     skip_execution = True
 
+        if not self._process_postponed_steps(postponed, step_executor, wait=True):
+            some_step_failed = True
+
         if some_step_failed:
             self.fail_current_block()
 
@@ -276,35 +681,58 @@ class StructureHandler(HasOutput):
 
     def report_background_steps(self) -> bool:
         result: bool = True
-        for item in self.active_background_steps:
-            with self.block(block_name="Waiting for background step '" + item['name'] + "' to finish...",
-                            pass_errors=True):
-                if not self.finalize_background_step(item) and item['is_critical']:
-                    result = False
-                    self.out.log_skipped("The background step '" + item['name'] + "' failed, and as it is critical, "
-                                                                                  "all further steps will be skipped")
-            if item['has_artifacts']:
-                with self.block(block_name=f"Collecting artifacts for the '{item['name']}' step", pass_errors=False):
-                    item['process'].collect_artifacts()
+        self._start_all_queued_background_steps()
+        for item in list(self.active_background_steps):
+            if item not in self.active_background_steps:
+                continue  # cancelled because of critical failure of previous one
+            if not self._finish_deferred_step(item, "background") and item['is_critical']:
+                result = False
 
         self.out.log("All ongoing background steps completed")
         self.active_background_steps = []
         return result
 
+    def report_parallel_steps(self, since: int = 0) -> bool:
+        """
+        Wait for the parallel steps to finish and report their results.
+        :param since: Only the steps started after the step with this index are reported.
+        :return: True if all the reported steps (including those already finished before) were successful.
+        """
+        for item in [step for step in self.active_parallel_steps if step['index'] >= since]:
+            if item in self.active_parallel_steps:  # could be cancelled because of critical failure
+                self._finish_parallel_step(item)
+        return not any(index >= since for index in self.failed_parallel_steps)
+
+    def _collect_planned_step_names(self, configs: Optional[Configuration]) -> None:
+        if not configs:
+            return
+        for config in configs.all():
+            self.planned_step_names.add(config.name)
+            self._collect_planned_step_names(config.if_succeeded)
+            self._collect_planned_step_names(config.if_failed)
+
     def execute_step_structure(self, configs: Configuration, step_executor) -> None:
         for config in configs.all():
             self.configs_total_count += 1
             if config.is_conditional:
                 self.configs_total_count += 1
+            self.expected_time_left += self._get_expected_duration(config)
         self.step_num_len = len(str(self.configs_total_count))
         self.group_numbering = f" [ {'':{self.step_num_len}}+{'':{self.step_num_len}} ] "
+        self._collect_planned_step_names(configs)
 
         self.execute_steps_recursively(Step(), configs, step_executor, False)
 
-        if self.active_background_steps:
+        if self.active_parallel_steps:
+            with self.block(block_name="Reporting parallel steps", pass_errors=False):
+                self.report_parallel_steps()
+
+        if self.active_background_steps or self.queued_background_steps:
             with self.block(block_name="Reporting background steps", pass_errors=False):
                 self.report_background_steps()
 
+        self.step_history.save()
+
     def _build_step_name(self, name):
         step_num_len = len(str(self.configs_total_count))
         numbering = f" [ {self.configs_current_number:>{step_num_len}}/{self.configs_total_count} ] "
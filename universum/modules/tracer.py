@@ -0,0 +1,102 @@
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .output import HasOutput
+from ..lib import utils
+
+__all__ = [
+    "Tracer"
+]
+
+
+class Tracer(HasOutput):
+    """
+    Records timeline of the run in Chrome trace event format.
+    Blocks are recorded as nested events of the main track; background and parallel steps, that overlap
+    with the blocks, are placed to additional tracks, so that each track only contains non-overlapping steps.
+    """
+
+    main_track: int = 0
+
+    @staticmethod
+    def define_arguments(argument_parser):
+        parser = argument_parser.get_or_create_group("Output")
+        parser.add_argument("--trace-file", dest="trace_file", metavar="TRACE_FILE",
+                            help="Write timeline of the run, including all background and parallel steps, "
+                                 "to the specified file in Chrome trace event format. The file can be opened "
+                                 "in 'chrome://tracing' or Perfetto UI")
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.file_name: Optional[str] = None
+        if self.settings.trace_file:
+            self.file_name = utils.parse_path(self.settings.trace_file, os.getcwd())
+        self.start_time: float = time.monotonic()
+        self.events: List[Dict] = [self._track_name_event(self.main_track, "Universum")]
+        self.tracks: List[List[Tuple[float, float]]] = []
+        self.open_blocks: int = 0
+
+    def is_enabled(self) -> bool:
+        return self.file_name is not None
+
+    def _timestamp(self, moment: float) -> float:
+        return round((moment - self.start_time) * 1e6, 3)  # microseconds
+
+    def _track_name_event(self, track: int, name: str) -> Dict:
+        return {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": track, "args": {"name": name}}
+
+    def _add_event(self, event_type: str, name: str, moment: float, track: int, **kwargs) -> None:
+        self.events.append({"name": name, "cat": "universum", "ph": event_type, "ts": self._timestamp(moment),
+                            "pid": os.getpid(), "tid": track, **kwargs})
+
+    def begin_block(self, name: str) -> None:
+        if not self.is_enabled():
+            return
+        self.open_blocks += 1
+        self._add_event("B", name.strip(), time.monotonic(), self.main_track)
+
+    def end_block(self, name: str, status: str, details: Optional[Dict] = None) -> None:
+        if not self.is_enabled():
+            return
+        self.open_blocks -= 1
+        self._add_event("E", name.strip(), time.monotonic(), self.main_track,
+                        args={"status": status, **(details or {})})
+        if not self.open_blocks:
+            self.save()  # top-level blocks are rare, so the whole timeline is rewritten after each of them
+
+    def mark(self, name: str, reason: str) -> None:
+        if not self.is_enabled():
+            return
+        self._add_event("i", name.strip(), time.monotonic(), self.main_track, s="t", args={"reason": reason})
+
+    def add_deferred_step(self, name: str, start: float, finish: float, status: str,
+                          details: Optional[Dict] = None) -> None:
+        """
+        Record the step, executed in background or in parallel with other steps
+        :param start: result of `time.monotonic()` when the step was started
+        :param finish: result of `time.monotonic()` when the step finished
+        """
+        if not self.is_enabled():
+            return
+        for index, track in enumerate(self.tracks):
+            if all(finish <= begin or start >= end for begin, end in track):
+                break
+        else:
+            index = len(self.tracks)
+            self.tracks.append([])
+            self.events.append(self._track_name_event(index + 1, f"Deferred steps {index + 1}"))
+        self.tracks[index].append((start, finish))
+        self._add_event("X", name.strip(), start, index + 1, dur=self._timestamp(finish) - self._timestamp(start),
+                        args={"status": status, **(details or {})})
+
+    def save(self) -> None:
+        if not self.file_name:
+            return
+        try:
+            with open(self.file_name, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+        except OSError as e:
+            self.out.log_error(f"Failed to write trace file: {e}")
+            self.file_name = None
@@ -25,6 +25,8 @@ class Nonci(Launcher):
 
         self.launch_project()
         self.reporter.report_initialized = True
+        self.artifact_collector.wait_for_step_artifacts()
+        self.artifact_collector.save_step_timings()
         self.artifact_collector.report_artifacts()
         self.reporter.report_build_result()
 